@@ -0,0 +1,113 @@
+"""
+Compare BatchSimulation with one DeliverySimulation per replica.
+
+Both run the same configuration (50 drivers, NearestNeighborPolicy,
+DecisionTreeRule, rate 2). The throughput is reported in replica-ticks
+per second. For accuracy, the mean results of the separate simulations
+and of the largest batch are printed with their 95% confidence
+intervals; the replicas use their own random streams, so the means
+should agree within the intervals, not exactly.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch
+
+(python benchmarks/bench_batch.py works as well.)
+
+Results of one run (500 ticks). Over four runs the speed-up was 7-10x
+at B=10, 20-23x at B=100 and 23-28x at B=1000:
+
+    DeliverySimulation             1606 replica-ticks/s
+    BatchSimulation B=10          12254 replica-ticks/s  (7.6x)
+    BatchSimulation B=100         36703 replica-ticks/s  (22.8x)
+    BatchSimulation B=1000        44282 replica-ticks/s  (27.6x)
+
+    metric        DeliverySimulation n=20     BatchSimulation B=1000  overlap
+    served               943.8 +-     9.3           944.7 +-     1.7  yes
+    expired               18.4 +-     3.1            18.9 +-     0.4  yes
+    avg_wait              17.9 +-     0.3            17.9 +-     0.0  yes
+    earnings           29314.3 +-   375.7         29317.5 +-    55.5  yes
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+import numpy
+
+if __package__ in (None, ""):
+    # Started as a script: make the phase2 package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+from phase2.batch_simulation import BatchSimulation
+from phase2.branching import summarize
+from phase2.replications import Estimate
+
+BEHAVIOURS = (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive)
+
+
+def _drivers(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [
+        Driver(
+            i + 1,
+            Point(rng.uniform(0, Point.GRID_WIDTH), rng.uniform(0, Point.GRID_HEIGHT)),
+            rng.uniform(0.5, 3.0),
+            "IDLE",
+            None,
+            BEHAVIOURS[i % len(BEHAVIOURS)](),
+        )
+        for i in range(n)
+    ]
+
+
+def _config():
+    return NearestNeighborPolicy(), RequestGenerator(2.0), DecisionTreeRule(MutationThresholds())
+
+
+METRICS = ("served", "expired", "avg_wait", "earnings")
+
+
+def bench(n_drivers: int = 50, ticks: int = 500, replicas=(10, 100, 1000), single_runs: int = 20) -> None:
+    singles = []
+    start = time.perf_counter()
+    for seed in range(single_runs):
+        numpy.random.seed(seed)
+        random.seed(seed)
+        sim = DeliverySimulation(_drivers(n_drivers), *_config(), 20)
+        for _ in range(ticks):
+            sim.tick()
+        singles.append(summarize(sim))
+    single = single_runs * ticks / (time.perf_counter() - start)
+    print(f"{'DeliverySimulation':<24} {single:10.0f} replica-ticks/s")
+
+    for b in replicas:
+        batch = BatchSimulation(_drivers(n_drivers), b, *_config(), 20, seed=1)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            batch.tick()
+        rate = b * ticks / (time.perf_counter() - start)
+        print(f"{f'BatchSimulation B={b}':<24} {rate:10.0f} replica-ticks/s  ({rate / single:.1f}x)")
+
+    batched = batch.summaries()
+    print()
+    print(f"{'metric':<10} {f'DeliverySimulation n={single_runs}':>26} {f'BatchSimulation B={len(batched)}':>26}  overlap")
+    for name in METRICS:
+        a = Estimate([s[name] for s in singles])
+        c = Estimate([s[name] for s in batched])
+        overlap = "yes" if a.low <= c.high and c.low <= a.high else "NO"
+        print(f"{name:<10} {a.mean:15.1f} +- {a.half_width:7.1f} {c.mean:15.1f} +- {c.half_width:7.1f}  {overlap}")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark for decide-heavy workloads.
+
+Offers every waiting request to every driver the way GlobalGreedyPolicy
+does on a busy tick and times how long the built-in behaviours take to
+decide.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_decide
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.offer import Offer
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour
+
+
+def _make_world(n_drivers: int, n_requests: int, seed: int = 1):
+    rng = random.Random(seed)
+
+    def rand_point() -> Point:
+        return Point(rng.uniform(0, Point.GRID_WIDTH), rng.uniform(0, Point.GRID_HEIGHT))
+
+    drivers = [
+        Driver(i + 1, rand_point(), rng.uniform(0.5, 3.0), "IDLE", None, None)
+        for i in range(n_drivers)
+    ]
+    requests = [Request(i + 1, rand_point(), rand_point()) for i in range(n_requests)]
+    return drivers, requests
+
+
+def bench(n_drivers: int = 200, n_requests: int = 100, repeats: int = 5) -> None:
+    drivers, requests = _make_world(n_drivers, n_requests)
+    offers = [Offer(d, r, 0.0, 0.0) for d in drivers for r in requests]
+
+    for behaviour in (GreedyDistanceBehaviour(), EarningsMaxBehaviour()):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for offer in offers:
+                behaviour.decide(offer.driver, offer, 0)
+            best = min(best, time.perf_counter() - start)
+        print(f"{type(behaviour).__name__:<24} {len(offers)} decides  best {best * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    bench()
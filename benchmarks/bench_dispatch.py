@@ -0,0 +1,99 @@
+"""
+Benchmark GlobalGreedyPolicy on a mixed fleet.
+
+The drivers are spread over a 400 x 200 map. Most of them have a
+finite acceptance radius (Greedy, Lazy), a few have none (Naive, and
+EarningsMax drivers with speed >= 1.5, for whom long trips always
+pay). Before the range query handled those drivers separately, one of
+them made the largest radius infinite and the policy fell back to the
+full driver x request loop, which is what the "loop" column times. The
+"grid" column is the range query plus the drivers without a radius.
+Both must give the same offers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dispatch
+
+(python benchmarks/bench_dispatch.py works as well.)
+
+Results of seven runs (best of 5 each; the timings are noisy here):
+
+    drivers  requests  unbounded        loop          grid  speed-up
+       2000       300        150  0.40-0.51 s  0.15-0.27 s   1.7-3.1x
+
+The drivers without a radius are still paired with every request, so
+they bound the gain.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import DispatchPolicy, GlobalGreedyPolicy
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+
+
+def _make_world(n_drivers: int, n_requests: int, seed: int = 1):
+    rng = random.Random(seed)
+    Point.set_grid_size(400.0, 200.0)
+
+    def rand_point() -> Point:
+        return Point(rng.uniform(0, Point.GRID_WIDTH), rng.uniform(0, Point.GRID_HEIGHT))
+
+    drivers = []
+    for i in range(n_drivers):
+        kind = rng.random()
+        speed = rng.uniform(0.5, 3.0)
+        if kind < 0.03:
+            behaviour = Naive()
+        elif kind < 0.08:
+            behaviour = EarningsMaxBehaviour()
+            speed = rng.uniform(1.5, 3.0)
+        elif kind < 0.55:
+            behaviour = GreedyDistanceBehaviour()
+        else:
+            behaviour = LazyBehaviour()
+        drivers.append(Driver(i + 1, rand_point(), speed, "IDLE", None, behaviour))
+    requests = [Request(i + 1, rand_point(), rand_point()) for i in range(n_requests)]
+    return drivers, requests
+
+
+def _time_assign(drivers, requests, min_drivers: int, repeats: int):
+    DispatchPolicy.GRID_MIN_DRIVERS = min_drivers
+    policy = GlobalGreedyPolicy()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        offers = policy.assign(drivers, requests, 0)
+        best = min(best, time.perf_counter() - start)
+    return best, [(o.driver.did, o.request.rid) for o in offers]
+
+
+def bench(n_drivers: int = 2000, n_requests: int = 300, repeats: int = 5) -> None:
+    width, height = Point.GRID_WIDTH, Point.GRID_HEIGHT
+    default = DispatchPolicy.GRID_MIN_DRIVERS
+    try:
+        drivers, requests = _make_world(n_drivers, n_requests)
+        loop, plain = _time_assign(drivers, requests, 10 ** 9, repeats)
+        grid, pruned = _time_assign(drivers, requests, default, repeats)
+    finally:
+        DispatchPolicy.GRID_MIN_DRIVERS = default
+        Point.set_grid_size(width, height)
+    unbounded = sum(1 for d in drivers if d.behaviour.acceptance_radius(d) == float("inf"))
+    if pruned != plain:
+        raise AssertionError("the range query changed the offers")
+    print(f"{'drivers':>7} {'requests':>9} {'unbounded':>10} {'loop':>9} {'grid':>9} {'speed-up':>9}")
+    print(f"{n_drivers:>7} {n_requests:>9} {unbounded:>10} {loop:>8.2f}s {grid:>8.3f}s {loop / grid:>8.1f}x")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,64 @@
+"""
+Measure how long a fresh worker process needs to import the adapter.
+
+Each sample starts a new interpreter, so the numbers include the whole
+import chain (numpy, Phase 1 io_mod, the Phase 2 modules). The "gui"
+variant also imports dearpygui, which is what every process paid before
+the GUI import was made lazy; "headless" is what a batch worker pays now.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+
+The child interpreters run in the repository root, so the script also
+works when started from elsewhere.
+
+Results of three runs with the default of 10 samples (median of each):
+
+    interpreter   13-18 ms
+    headless     135-171 ms
+
+The gain of the lazy GUI import was not measured: dearpygui is not
+installed here, so the "gui" variant fails with ModuleNotFoundError.
+
+python -X importtime shows that about 70 ms of the headless import is
+numpy, which the adapter pulls in through phase2.request_generator.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = {
+    "headless": "import phase2.adapter as a; a.set_error_reporter('log')",
+    "gui": "import phase2.adapter; import dearpygui.dearpygui",
+}
+
+
+def _sample(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start
+
+
+def bench(repeats: int = 10) -> None:
+    baseline = statistics.median(_sample("pass") for _ in range(repeats))
+    print(f"{'interpreter':<12} {baseline * 1e3:8.1f} ms")
+    for name, code in VARIANTS.items():
+        try:
+            samples = [_sample(code) for _ in range(repeats)]
+        except subprocess.CalledProcessError as e:
+            reason = e.stderr.strip().splitlines()[-1] if e.stderr.strip() else f"exit code {e.returncode}"
+            print(f"{name:<12} failed: {reason}")
+            continue
+        print(f"{name:<12} {statistics.median(samples) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,138 @@
+"""
+Accuracy and speed of coarse time steps (DeliverySimulation dt > 1).
+
+Each scenario is run for the same number of ticks with dt = 1 (exact)
+and with larger steps, over several seeds. For every dt the wall time,
+the speed-up and the mean headline results are printed, with the
+relative difference from dt = 1.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_timestep
+
+(python benchmarks/bench_timestep.py works as well.)
+
+Results of one run (1000 ticks, 5 seeds, timeout 20; mean per run and
+difference from dt = 1). The results do not depend on the machine; the
+timings do, and over three runs the speed-up ranged 1.2-1.8x, 2.1-2.8x
+and 2.6-3.9x for nearest at dt = 2, 5, 10, 1.3-1.6x, 1.2-1.8x and
+1.2-1.8x for greedy, and 1.5-1.7x, 2.0-2.4x and 2.7-3.5x for
+nearest-busy:
+
+    scenario       dt     time  speed-up          served         expired        avg_wait        earnings
+    nearest         1    3.57s      1.0x   1934.8  +0.0%     33.0  +0.0%     17.0  +0.0%  60103.8  +0.0%
+    nearest         2    1.94s      1.8x   1935.2  +0.0%     26.4 -20.0%     18.0  +5.9%  60253.8  +0.2%
+    nearest         5    1.29s      2.8x   1889.2  -2.4%     73.2    +2x     21.6 +27.6%  58776.5  -2.2%
+    nearest        10    0.91s      3.9x   1618.2 -16.4%    331.6   +10x     25.2 +48.8%  49996.3 -16.8%
+    greedy          1    2.85s      1.0x   1940.8  +0.0%     25.8  +0.0%     16.7  +0.0%  60273.7  +0.0%
+    greedy          2    2.09s      1.4x   1935.0  -0.3%     28.0  +8.5%     17.5  +4.8%  60231.8  -0.1%
+    greedy          5    2.32s      1.2x   1822.4  -6.1%    145.2    +6x     19.6 +17.5%  56738.7  -5.9%
+    greedy         10    2.37s      1.2x   1567.2 -19.2%    388.8   +15x     21.9 +31.1%  48399.8 -19.7%
+    nearest-busy    1   15.23s      1.0x   7798.4  +0.0%      3.8  +0.0%     14.8  +0.0% 243289.9  +0.0%
+    nearest-busy    2    9.07s      1.7x   7884.6  +1.1%      1.8 -52.6%     15.9  +6.9% 246122.3  +1.2%
+    nearest-busy    5    7.55s      2.0x   7658.4  -1.8%    160.0   +42x     20.2 +36.4% 237936.0  -2.2%
+    nearest-busy   10    5.72s      2.7x   6691.0 -14.2%   1134.2  +298x     23.8 +60.4% 207658.9 -14.6%
+
+dt = 2 is within about 1% for served and earnings; the average wait
+grows by about one tick, the time a new request or an idle driver waits
+for the end of the step. At dt = 5 served and earnings are off by 2-6%
+and the wait by a fifth or more. At dt = 10 drivers that become idle
+during a step stay idle for most of it and many requests expire that
+would have been served, so such steps are only good for rough
+exploration. GlobalGreedyPolicy gains little from large steps, because
+the number of waiting requests it matches per step grows with dt.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+import numpy
+
+if __package__ in (None, ""):
+    # Started as a script: make the phase2 package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy, GlobalGreedyPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+from phase2.branching import summarize
+
+BEHAVIOURS = (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive)
+
+# name -> (number of drivers, request rate, dispatch policy class)
+SCENARIOS = {
+    "nearest": (50, 2.0, NearestNeighborPolicy),
+    "greedy": (50, 2.0, GlobalGreedyPolicy),
+    "nearest-busy": (200, 8.0, NearestNeighborPolicy),
+}
+
+METRICS = ("served", "expired", "avg_wait", "earnings")
+
+
+def _drivers(n: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        Driver(
+            i + 1,
+            Point(rng.uniform(0, Point.GRID_WIDTH), rng.uniform(0, Point.GRID_HEIGHT)),
+            rng.uniform(0.5, 3.0),
+            "IDLE",
+            None,
+            BEHAVIOURS[i % len(BEHAVIOURS)](),
+        )
+        for i in range(n)
+    ]
+
+
+def _run(scenario: str, dt: int, ticks: int, seeds: int):
+    n_drivers, rate, policy = SCENARIOS[scenario]
+    totals = dict.fromkeys(METRICS, 0.0)
+    elapsed = 0.0
+    for seed in range(seeds):
+        numpy.random.seed(seed)
+        random.seed(seed)
+        sim = DeliverySimulation(
+            _drivers(n_drivers, seed), policy(), RequestGenerator(rate),
+            DecisionTreeRule(MutationThresholds()), 20, dt=dt,
+        )
+        start = time.perf_counter()
+        while sim.time < ticks:
+            sim.tick()
+        elapsed += time.perf_counter() - start
+        for name, value in summarize(sim).items():
+            if name in totals:
+                totals[name] += value / seeds
+    return elapsed, totals
+
+
+def _difference(value: float, exact: float) -> str:
+    if exact == 0:
+        return "n/a"
+    ratio = value / exact
+    if ratio >= 2:
+        return f"+{ratio:.0f}x"
+    return f"{(ratio - 1) * 100:+.1f}%"
+
+
+def bench(ticks: int = 1000, seeds: int = 5, dts=(1, 2, 5, 10)) -> None:
+    print(f"{'scenario':<13} {'dt':>3} {'time':>8} {'speed-up':>9}" + "".join(f"{m:>16}" for m in METRICS))
+    for scenario in SCENARIOS:
+        exact_time, exact = _run(scenario, 1, ticks, seeds)
+        for dt in dts:
+            elapsed, results = (exact_time, exact) if dt == 1 else _run(scenario, dt, ticks, seeds)
+            cells = "".join(
+                f"{results[m]:>9.1f} {_difference(results[m], exact[m]):>6}" for m in METRICS
+            )
+            print(f"{scenario:<13} {dt:>3} {elapsed:7.2f}s {exact_time / elapsed:8.1f}x{cells}")
+
+
+if __name__ == "__main__":
+    bench()
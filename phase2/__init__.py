@@ -0,0 +1,99 @@
+"""
+Phase 2 of the food delivery simulation.
+
+The public classes are available as attributes of the package, for example
+phase2.Point or phase2.DeliverySimulation. They are loaded lazily (PEP 562):
+a module is only imported the first time one of its names is used, so a
+process that only needs Point, Request and Driver does not import numpy,
+the Phase 1 code or the GUI library.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .point import Point
+    from .request import Request
+    from .offer import Offer
+    from .driver import Driver, HistoryEvent
+    from .driver_behaviour import (
+        DriverBehaviour,
+        GreedyDistanceBehaviour,
+        EarningsMaxBehaviour,
+        LazyBehaviour,
+        Naive,
+    )
+    from .dispatch_policies import DispatchPolicy, NearestNeighborPolicy, GlobalGreedyPolicy, AnytimePolicy
+    from .mutation_rules import MutationRule, DecisionTreeRule, MutationThresholds
+    from .request_generator import RequestGenerator
+    from .delivery_simulation import DeliverySimulation
+    from .metrics_collector import MetricsCollector
+    from .distance_cache import DistanceCache
+    from .change_tracker import ChangeTracker
+    from .dispatch_index import DispatchIndex
+    from .rejection_memo import RejectionMemo
+    from .mutation_scheduler import MutationScheduler
+    from .trips import Trip, TripSchedule
+    from .status import DriverStatus, RequestStatus
+    from .array_snapshot import ArraySnapshot
+    from .sim_runner import SimulationRunner
+    from .event_log import EventLog, Replayer
+    from .batch_simulation import BatchSimulation
+    from .partitioned_simulation import PartitionedSimulation
+
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    "Point": "point",
+    "Request": "request",
+    "Offer": "offer",
+    "Driver": "driver",
+    "HistoryEvent": "driver",
+    "DriverBehaviour": "driver_behaviour",
+    "GreedyDistanceBehaviour": "driver_behaviour",
+    "EarningsMaxBehaviour": "driver_behaviour",
+    "LazyBehaviour": "driver_behaviour",
+    "Naive": "driver_behaviour",
+    "DispatchPolicy": "dispatch_policies",
+    "NearestNeighborPolicy": "dispatch_policies",
+    "GlobalGreedyPolicy": "dispatch_policies",
+    "AnytimePolicy": "dispatch_policies",
+    "MutationRule": "mutation_rules",
+    "DecisionTreeRule": "mutation_rules",
+    "MutationThresholds": "mutation_rules",
+    "RequestGenerator": "request_generator",
+    "DeliverySimulation": "delivery_simulation",
+    "MetricsCollector": "metrics_collector",
+    "DistanceCache": "distance_cache",
+    "ChangeTracker": "change_tracker",
+    "DispatchIndex": "dispatch_index",
+    "RejectionMemo": "rejection_memo",
+    "MutationScheduler": "mutation_scheduler",
+    "Trip": "trips",
+    "TripSchedule": "trips",
+    "DriverStatus": "status",
+    "RequestStatus": "status",
+    "ArraySnapshot": "array_snapshot",
+    "SimulationRunner": "sim_runner",
+    "EventLog": "event_log",
+    "Replayer": "event_log",
+    "BatchSimulation": "batch_simulation",
+    "PartitionedSimulation": "partitioned_simulation",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Same as "from .module import name" (level=1 relative import)
+    value = getattr(__import__(module, globals(), None, [name], 1), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
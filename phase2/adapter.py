@@ -5,48 +5,105 @@ This module translates between:
 - Phase 1 style dictionaries (used by the GUI), and
 - Phase 2 objects (used by the simulation engine).
 
-The adapter owns a single global DeliverySimulation instance.
+The adapter keeps a registry of simulation sessions, so several
+simulations can run side by side in one process (for example to compare
+dispatch policies). Each session has its own DeliverySimulation, its own
+lock and optionally a background worker thread. init_state creates the
+default session used by the Phase 1 GUI when no session id is given.
+
+Errors are reported through a pluggable reporter (see set_error_reporter);
+dearpygui is only imported when the first GUI popup is shown.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Tuple, Any, Optional
+import itertools
+import logging
+import threading
 import traceback
 
-# GUI library for error popups
-import dearpygui.dearpygui as dpg
-
-# Reuse Phase 1 helpers
-from phase1 import io_mod
-
 # Phase 2 core
 from .delivery_simulation import DeliverySimulation
-from .dispatch_policies import NearestNeighborPolicy
+from .dispatch_policies import AnytimePolicy, NearestNeighborPolicy
 from .driver import Driver
 from .request import Request
 from .point import Point
 from .request_generator import RequestGenerator
 from .mutation_rules import MutationRule, DecisionTreeRule, MutationThresholds
 from .driver_behaviour import GreedyDistanceBehaviour
+from .sim_runner import SimulationRunner
 
 
 # --------------------------------------------------
-# Global simulation instance (managed by adapter)
+# Simulation sessions (managed by adapter)
 # --------------------------------------------------
 
-_SIM: DeliverySimulation | None = None
+class _Session:
+    """
+    One simulation hosted by the adapter.
+
+    The lock serialises GUI/batch calls on the same session; calls on
+    different sessions run independently. While a background runner is
+    set, the runner owns the simulation and holds the lock during each
+    tick.
+    """
+
+    def __init__(self, sim: DeliverySimulation) -> None:
+        self.sim = sim
+        self.lock = threading.Lock()
+        self.runner: SimulationRunner | None = None
+
+
+_SESSIONS: Dict[int, _Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+_SESSION_IDS = itertools.count(1)
+_DEFAULT_SESSION: int | None = None
+
+
+def _session(session_id: int | None) -> _Session:
+    """
+    Look up a session; None means the default session from init_state.
+    """
+    if session_id is None:
+        session_id = _DEFAULT_SESSION
+    session = _SESSIONS.get(session_id) if session_id is not None else None
+    if session is None:
+        raise RuntimeError("Simulation not initialised")
+    return session
+
+
+def _idle_session(session_id: int | None) -> _Session:
+    """
+    Look up a session that is not running in the background.
+    """
+    session = _session(session_id)
+    if session.runner is not None:
+        raise RuntimeError("Simulation is running in the background")
+    return session
 
 
 # --------------------------------------------------
 # Phase 1 required backend functions
 # --------------------------------------------------
 
+def _io_mod():
+    """
+    Import the Phase 1 helpers on first use.
+
+    Headless workers that never load or generate Phase 1 data do not pay
+    for importing (and initialising) io_mod.
+    """
+    from phase1 import io_mod
+    return io_mod
+
+
 def load_drivers(path: str) -> List[Dict[str, Any]]:
     """
     Load drivers from file using Phase 1 logic.
 
     This function is required by the GUI interface.
     """
-    return io_mod.load_drivers(path)
+    return _io_mod().load_drivers(path)
 
 
 def load_requests(path: str) -> List[Dict[str, Any]]:
@@ -55,7 +112,7 @@ def load_requests(path: str) -> List[Dict[str, Any]]:
 
     This function is required by the GUI interface.
     """
-    return io_mod.load_requests(path)
+    return _io_mod().load_requests(path)
 
 
 def generate_drivers(n: int, width: int, height: int) -> List[Dict[str, Any]]:
@@ -64,7 +121,7 @@ def generate_drivers(n: int, width: int, height: int) -> List[Dict[str, Any]]:
 
     This function is required by the GUI interface.
     """
-    return io_mod.generate_drivers(n, width, height)
+    return _io_mod().generate_drivers(n, width, height)
 
 
 def generate_requests(
@@ -79,29 +136,24 @@ def generate_requests(
 
     New requests are appended to the given list.
     """
-    io_mod.generate_requests(start_t, out_list, req_rate, width, height)
+    _io_mod().generate_requests(start_t, out_list, req_rate, width, height)
 
 
 # --------------------------------------------------
 # Adapter: dicts -> objects
 # --------------------------------------------------
 
-def init_state(
+def _build_simulation(
     drivers: List[Dict],
     requests: List[Dict],
     timeout: int,
     req_rate: float,
     width: int,
     height: int,
-) -> Dict[str, Any]:
+) -> DeliverySimulation:
     """
-    Create and initialize a Phase 2 simulation.
-
-    Converts Phase 1-style dictionaries into Phase 2 objects
-    and stores the simulation globally.
+    Convert Phase 1-style dictionaries into a Phase 2 simulation.
     """
-    global _SIM
-
     # Build Driver objects
     driver_objs: List[Driver] = []
     for d in drivers:
@@ -140,7 +192,7 @@ def init_state(
     dispatch_policy = NearestNeighborPolicy()
     mutation_rule = DecisionTreeRule(MutationThresholds())
 
-    _SIM = DeliverySimulation(
+    return DeliverySimulation(
         drivers=driver_objs,
         dispatch_policy=dispatch_policy,
         request_generator=generator,
@@ -148,53 +200,335 @@ def init_state(
         timeout=timeout,
     )
 
-    return _snapshot()
+
+def create_session(
+    drivers: List[Dict],
+    requests: List[Dict],
+    timeout: int,
+    req_rate: float,
+    width: int,
+    height: int,
+) -> int:
+    """
+    Create a new simulation session and return its id.
+
+    The arguments are the same as for init_state. The session lives
+    until close_session is called.
+    """
+    session = _Session(_build_simulation(drivers, requests, timeout, req_rate, width, height))
+    with _SESSIONS_LOCK:
+        session_id = next(_SESSION_IDS)
+        _SESSIONS[session_id] = session
+    return session_id
+
+
+def close_session(session_id: int) -> None:
+    """
+    Stop a session's background worker (if any) and forget the session.
+    """
+    global _DEFAULT_SESSION
+
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.pop(session_id, None)
+        if _DEFAULT_SESSION == session_id:
+            _DEFAULT_SESSION = None
+    if session is not None and session.runner is not None:
+        session.runner.stop()
+        session.runner = None
+
+
+def list_sessions() -> List[int]:
+    """
+    Return the ids of all open sessions.
+    """
+    with _SESSIONS_LOCK:
+        return sorted(_SESSIONS)
+
+
+def init_state(
+    drivers: List[Dict],
+    requests: List[Dict],
+    timeout: int,
+    req_rate: float,
+    width: int,
+    height: int,
+) -> Dict[str, Any]:
+    """
+    Create and initialize a Phase 2 simulation.
+
+    Converts Phase 1-style dictionaries into Phase 2 objects and makes
+    the new simulation the default session (replacing the previous one).
+    The session id is returned in the snapshot under "session".
+    """
+    global _DEFAULT_SESSION
+
+    if _DEFAULT_SESSION is not None:
+        close_session(_DEFAULT_SESSION)
+
+    session_id = create_session(drivers, requests, timeout, req_rate, width, height)
+    _DEFAULT_SESSION = session_id
+
+    snapshot = _snapshot(_SESSIONS[session_id].sim)
+    snapshot["session"] = session_id
+    return snapshot
 
 
 # --------------------------------------------------
 # Adapter: advance simulation
 # --------------------------------------------------
 
-def simulate_step(state: Dict) -> Tuple[Dict, Dict]:
+def simulate_step(state: Dict | None = None, session_id: int | None = None) -> Tuple[Dict, Dict]:
     """
     Advance the simulation by one time step.
 
     Returns the updated state snapshot and a metrics dictionary.
+    Without session_id the default session (from init_state) is used.
     """
-    if _SIM is None:
-        raise RuntimeError("Simulation not initialised")
+    session = _idle_session(session_id)
+
+    try:
+        with session.lock:
+            session.sim.tick()
+            return _snapshot_and_metrics(session.sim)
+    
+    except Exception as e:
+        # Show error popup in GUI
+        _report_error(e)
+        # Re-raise to stop simulation
+        raise
+
+
+def simulate_step_delta(since_frame: int, session_id: int | None = None) -> Tuple[Dict, Dict]:
+    """
+    Advance the simulation by one time step and return only the changes.
+
+    The delta holds the drivers that moved or changed status and the
+    pending requests added, updated and removed after since_frame. If
+    "full" is True the GUI must drop its state and use the delta as a
+    full snapshot. Pass the returned "frame" as since_frame next time.
+    """
+    session = _idle_session(session_id)
 
     try:
-        _SIM.tick()
-        snapshot = _snapshot()
+        with session.lock:
+            session.sim.tick()
+            delta = _delta_snapshot(session.sim, since_frame)
 
         metrics = {
-            "served": snapshot["served"],
-            "expired": snapshot["expired"],
-            "avg_wait": snapshot["avg_wait"],
+            "served": delta["served"],
+            "expired": delta["expired"],
+            "avg_wait": delta["avg_wait"],
         }
 
-        return snapshot, metrics
-    
+        return delta, metrics
+
     except Exception as e:
-        # Show error popup in GUI
-        _show_error_popup(e)
-        # Re-raise to stop simulation
+        _report_error(e)
         raise
 
 
+def full_snapshot(session_id: int | None = None) -> Dict[str, Any]:
+    """
+    Rebuild a full snapshot of the current state on demand.
+
+    Used by the GUI to start (or resync) a delta stream.
+    """
+    session = _idle_session(session_id)
+    with session.lock:
+        return _snapshot(session.sim)
+
+
+def _snapshot_and_metrics(sim: DeliverySimulation) -> Tuple[Dict, Dict]:
+    """
+    Build the GUI snapshot and the metrics dictionary.
+    """
+    snapshot = _snapshot(sim)
+
+    metrics = {
+        "served": snapshot["served"],
+        "expired": snapshot["expired"],
+        "avg_wait": snapshot["avg_wait"],
+    }
+
+    return snapshot, metrics
+
+
+# --------------------------------------------------
+# Adapter: dispatch time budget
+# --------------------------------------------------
+
+def set_dispatch_budget(budget_ms: Optional[float], session_id: int | None = None) -> None:
+    """
+    Limit the wall-clock time of dispatch per tick (see AnytimePolicy).
+
+    Requests that do not fit in the budget are dispatched in the next
+    ticks, so a backlog of waiting requests does not drop GUI frames.
+    None removes the budget. It takes effect from the next tick, also
+    while a background worker runs (the worker ticks under the session
+    lock, so the policy is never swapped during a tick).
+    """
+    session = _session(session_id)
+    with session.lock:
+        sim = session.sim
+        policy = sim.dispatch_policy
+        if isinstance(policy, AnytimePolicy):
+            policy = policy.policy
+        if budget_ms is not None:
+            policy = AnytimePolicy(policy, budget=budget_ms / 1000.0)
+        sim.dispatch_policy = policy
+
+
+def dispatch_stats(session_id: int | None = None) -> Optional[Dict[str, float]]:
+    """
+    Return the overrun counters of the dispatch budget (AnytimePolicy.stats),
+    or None when the session has no budget.
+    """
+    session = _session(session_id)
+    with session.lock:
+        policy = session.sim.dispatch_policy
+        if isinstance(policy, AnytimePolicy):
+            return policy.stats()
+    return None
+
+
+# --------------------------------------------------
+# Adapter: background simulation thread
+# --------------------------------------------------
+
+def start_background(
+    ticks_per_second: Optional[float] = None,
+    max_lead: Optional[int] = 1,
+    paused: bool = False,
+    session_id: int | None = None,
+) -> None:
+    """
+    Run the simulation on a worker thread instead of the GUI callback.
+
+    ticks_per_second=None runs as fast as possible. max_lead limits how
+    many frames the worker may publish before the GUI reads one with
+    poll_background(). While the worker runs, simulate_step is disabled.
+    """
+    session = _session(session_id)
+    stop_background(session_id)
+
+    sim = session.sim
+    session.runner = SimulationRunner(
+        sim,
+        lambda: _snapshot_and_metrics(sim),
+        ticks_per_second=ticks_per_second,
+        max_lead=max_lead,
+        lock=session.lock,
+    )
+    session.runner.start(paused=paused)
+
+
+def _runner(session_id: int | None) -> SimulationRunner | None:
+    try:
+        return _session(session_id).runner
+    except RuntimeError:
+        return None
+
+
+def poll_background(session_id: int | None = None) -> Optional[Tuple[Dict, Dict]]:
+    """
+    Return the latest (snapshot, metrics) published by the worker.
+
+    Called from the dearpygui render loop; it never waits for the
+    simulation. Returns None until the first tick is done. If the worker
+    failed, the error popup is shown and the error is raised here.
+    """
+    runner = _runner(session_id)
+    if runner is None:
+        raise RuntimeError("Simulation is not running in the background")
+
+    if runner.error is not None:
+        error = runner.error
+        stop_background(session_id)
+        _report_error(error)
+        raise error
+
+    return runner.latest()
+
+
+def pause_background(session_id: int | None = None) -> None:
+    runner = _runner(session_id)
+    if runner is not None:
+        runner.pause()
+
+
+def resume_background(session_id: int | None = None) -> None:
+    runner = _runner(session_id)
+    if runner is not None:
+        runner.resume()
+
+
+def step_background(n: int = 1, session_id: int | None = None) -> None:
+    """
+    Advance a paused background simulation by n ticks.
+    """
+    runner = _runner(session_id)
+    if runner is not None:
+        runner.step(n)
+
+
+def set_background_rate(ticks_per_second: Optional[float], session_id: int | None = None) -> None:
+    runner = _runner(session_id)
+    if runner is not None:
+        runner.set_rate(ticks_per_second)
+
+
+def stop_background(session_id: int | None = None) -> None:
+    """
+    Stop the worker thread; the GUI may call simulate_step again.
+    """
+    try:
+        session = _session(session_id)
+    except RuntimeError:
+        return
+    if session.runner is not None:
+        session.runner.stop()
+        session.runner = None
+
+
 # --------------------------------------------------
-# Error handling with GUI popup
+# Error handling (GUI popup, logging or raise only)
 # --------------------------------------------------
 
-def _show_error_popup(exception: Exception) -> None:
+_LOG = logging.getLogger(__name__)
+
+
+def _log_error(exception: BaseException) -> None:
+    """
+    Log a simulation error with its traceback (headless mode).
+    """
+    _LOG.error("Simulation error", exc_info=(type(exception), exception, exception.__traceback__))
+
+
+def _no_report(exception: BaseException) -> None:
+    """
+    Do not report; the error is only raised to the caller.
+    """
+
+
+def _show_error_popup(exception: BaseException) -> None:
     """
     Display an error popup in the GUI when simulation fails.
     
     This satisfies the Phase 1 feedback requirement for error visualization.
+    The GUI library is imported here, on the first popup, so importing the
+    adapter does not need dearpygui. Without it the error is logged instead,
+    so the original error is not hidden by an ImportError.
     """
+    try:
+        import dearpygui.dearpygui as dpg
+    except ImportError:
+        _log_error(exception)
+        return
+
     error_msg = f"{type(exception).__name__}: {str(exception)}"
-    error_trace = traceback.format_exc()
+    error_trace = "".join(
+        traceback.format_exception(type(exception), exception, exception.__traceback__)
+    )
     
     # Create modal popup window
     with dpg.window(
@@ -230,37 +564,110 @@ def _show_error_popup(exception: Exception) -> None:
         )
 
 
+_ERROR_REPORTERS: Dict[str, Callable[[BaseException], None]] = {
+    "gui": _show_error_popup,
+    "log": _log_error,
+    "raise": _no_report,
+}
+
+_ERROR_REPORTER: Callable[[BaseException], None] = _ERROR_REPORTERS["gui"]
+
+
+def set_error_reporter(reporter: str | Callable[[BaseException], None]) -> None:
+    """
+    Choose how simulation errors are reported before they are re-raised.
+
+    "gui" shows a dearpygui popup (default), "log" logs the error and
+    traceback, and "raise" only raises to the caller. A callable taking
+    the exception can also be given. Headless batch jobs and worker
+    processes use "log" or "raise" and never import the GUI library.
+    """
+    global _ERROR_REPORTER
+
+    if callable(reporter):
+        _ERROR_REPORTER = reporter
+    elif reporter in _ERROR_REPORTERS:
+        _ERROR_REPORTER = _ERROR_REPORTERS[reporter]
+    else:
+        raise ValueError(f"Unknown error reporter: {reporter!r}")
+
+
+def _report_error(exception: BaseException) -> None:
+    _ERROR_REPORTER(exception)
+
+
+# --------------------------------------------------
+# Adapter: objects -> arrays
+# --------------------------------------------------
+
+def snapshot_arrays(session_id: int | None = None) -> Dict[str, Any]:
+    """
+    Return the simulation state as NumPy arrays.
+
+    Meant for the dearpygui plot series: the arrays (driver xy, status,
+    earnings and active-request xy, status) can be pushed straight into
+    the plots without building a dict per driver or request.
+    The arrays are reused buffers and are overwritten on the next call.
+    """
+    session = _idle_session(session_id)
+    with session.lock:
+        return session.sim.get_array_snapshot()
+
+
 # --------------------------------------------------
 # Adapter: objects -> dicts
 # --------------------------------------------------
 
-def _snapshot() -> Dict[str, Any]:
+def _snapshot(sim: DeliverySimulation) -> Dict[str, Any]:
     """
     Convert the internal simulation state into GUI format.
 
     This hides all Phase 2 objects from the GUI.
     """
-    assert _SIM is not None
-    snap = _SIM.get_snapshot()
+    snap = sim.get_snapshot()
 
     return {
         "t": snap["time"],
+        "frame": snap["time"],
         "drivers": snap["drivers"],
-        "pending": [
-            {
-                "id": r.rid,                    # rid → GUI id
-                "px": r.pickup.x,
-                "py": r.pickup.y,
-                "dx": r.dropoff.x,
-                "dy": r.dropoff.y,
-                "status": r.status.lower(),
-                "driver_id": r.assigned_driver_id,  # did, but GUI kalder det driver_id
-                "t": r.creation_time,
-            }
-            for r in _SIM.requests
-            if r.is_active()
-        ],
+        "pending": [_pending_view(r) for r in sim.requests if r.is_active()],
         "served": snap["served"],
         "expired": snap["expired"],
         "avg_wait": snap["avg_wait"],
+    }
+
+
+def _delta_snapshot(sim: DeliverySimulation, since_frame: int) -> Dict[str, Any]:
+    """
+    Convert the changes since a frame into GUI format.
+    """
+    delta = sim.get_delta_snapshot(since_frame)
+
+    return {
+        "t": delta["time"],
+        "frame": delta["frame"],
+        "full": delta["full"],
+        "drivers": delta["drivers"],
+        "pending_added": [_pending_view(r) for r in delta["added"]],
+        "pending_updated": [_pending_view(r) for r in delta["updated"]],
+        "pending_removed": delta["removed"],
+        "served": delta["served"],
+        "expired": delta["expired"],
+        "avg_wait": delta["avg_wait"],
+    }
+
+
+def _pending_view(r: Request) -> Dict[str, Any]:
+    """
+    Convert one active request into the GUI pending format.
+    """
+    return {
+        "id": r.rid,                    # rid → GUI id
+        "px": r.pickup.x,
+        "py": r.pickup.y,
+        "dx": r.dropoff.x,
+        "dy": r.dropoff.y,
+        "status": r.status.lower(),
+        "driver_id": r.assigned_driver_id,  # did, but GUI kalder det driver_id
+        "t": r.creation_time,
     }
\ No newline at end of file
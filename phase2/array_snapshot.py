@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from typing import Dict, List, TYPE_CHECKING
+
+import numpy
+
+from .status import DriverStatus, RequestStatus
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+# Integer codes used in the status arrays (the status codes of phase2.status)
+DRIVER_STATUS_CODES = {s.name: int(s) for s in DriverStatus}
+REQUEST_STATUS_CODES = {s.name: int(s) for s in RequestStatus}
+
+
+class ArraySnapshot:
+    """
+    Simulation state as NumPy arrays backed by reusable buffers.
+
+    The buffers are allocated once and overwritten in place by update(),
+    so a GUI frame does not build a dict per driver or per request. The
+    request buffers grow (doubling) when there are more active requests
+    than they can hold.
+
+    The arrays returned by update() are views into the buffers. They are
+    only valid until the next call to update(); copy them to keep them.
+
+    --- DOCTEST ---
+    >>> class P:
+    ...     def __init__(self, x, y): self.x, self.y = x, y
+    >>> class D:
+    ...     def __init__(self, i):
+    ...         self.did, self.position = i, P(i, 2 * i)
+    ...         self.status_code, self.total_earnings = DriverStatus.IDLE, 1.5
+    >>> class R:
+    ...     def __init__(self, i):
+    ...         self.rid, self.status_code = i, RequestStatus.PICKED
+    ...         self.pickup, self.dropoff = P(1, 1), P(4, 5)
+    >>> snap = ArraySnapshot(capacity=1)
+    >>> arrays = snap.update([D(1), D(2)], [R(1), R(2)])
+    >>> arrays["driver_xy"].tolist()
+    [[1.0, 2.0], [2.0, 4.0]]
+    >>> arrays["request_status"].tolist()
+    [2, 2]
+    >>> arrays["request_dropoff_xy"].shape
+    (2, 2)
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.driver_id = numpy.zeros(0, dtype=numpy.int64)
+        self.driver_xy = numpy.zeros((0, 2))
+        self.driver_status = numpy.zeros(0, dtype=numpy.int8)
+        self.driver_earnings = numpy.zeros(0)
+        self._allocate_requests(max(1, int(capacity)))
+
+    def _allocate_drivers(self, n: int) -> None:
+        self.driver_id = numpy.zeros(n, dtype=numpy.int64)
+        self.driver_xy = numpy.zeros((n, 2))
+        self.driver_status = numpy.zeros(n, dtype=numpy.int8)
+        self.driver_earnings = numpy.zeros(n)
+
+    def _allocate_requests(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._request_id = numpy.zeros(capacity, dtype=numpy.int64)
+        self._request_pickup_xy = numpy.zeros((capacity, 2))
+        self._request_dropoff_xy = numpy.zeros((capacity, 2))
+        self._request_status = numpy.zeros(capacity, dtype=numpy.int8)
+
+    def update(self, drivers: List["Driver"], active: List["Request"]) -> Dict[str, numpy.ndarray]:
+        """
+        Write the current drivers and active requests into the buffers.
+        """
+        n = len(drivers)
+        if n != len(self.driver_xy):
+            self._allocate_drivers(n)
+        if n:
+            self.driver_id[:] = [d.did for d in drivers]
+            self.driver_xy[:, 0] = [d.position.x for d in drivers]
+            self.driver_xy[:, 1] = [d.position.y for d in drivers]
+            self.driver_status[:] = [d.status_code for d in drivers]
+            self.driver_earnings[:] = [d.total_earnings for d in drivers]
+
+        m = len(active)
+        if m > self._capacity:
+            capacity = self._capacity
+            while capacity < m:
+                capacity *= 2
+            self._allocate_requests(capacity)
+        if m:
+            self._request_id[:m] = [r.rid for r in active]
+            self._request_pickup_xy[:m, 0] = [r.pickup.x for r in active]
+            self._request_pickup_xy[:m, 1] = [r.pickup.y for r in active]
+            self._request_dropoff_xy[:m, 0] = [r.dropoff.x for r in active]
+            self._request_dropoff_xy[:m, 1] = [r.dropoff.y for r in active]
+            self._request_status[:m] = [r.status_code for r in active]
+
+        return {
+            "driver_id": self.driver_id,
+            "driver_xy": self.driver_xy,
+            "driver_status": self.driver_status,
+            "driver_earnings": self.driver_earnings,
+            "request_id": self._request_id[:m],
+            "request_pickup_xy": self._request_pickup_xy[:m],
+            "request_dropoff_xy": self._request_dropoff_xy[:m],
+            "request_status": self._request_status[:m],
+        }
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
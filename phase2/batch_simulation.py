@@ -0,0 +1,499 @@
+"""
+Many replicas of one configuration advanced in lockstep with NumPy.
+
+With small fleets most of the time in DeliverySimulation goes to Python
+per-object overhead (Driver, Request, Offer and Point objects, method
+calls), not to the arithmetic. BatchSimulation runs B independent
+replicas of the same configuration at once and keeps the state as
+arrays: drivers as (B, N) arrays and requests as (B, C) arrays of
+request slots (C grows when needed, delivered and expired requests free
+their slot). Arrivals, expiry, distances, the accept rules of the
+built-in behaviours, dispatch, movement and the DecisionTreeRule run as
+a few NumPy operations over all replicas.
+
+The rules are those of DeliverySimulation.tick, step by step, for
+NearestNeighborPolicy, GlobalGreedyPolicy, the four built-in behaviours
+and DecisionTreeRule. Differences:
+
+- each replica draws from its own stream of one numpy Generator, so a
+  replica does not reproduce the DeliverySimulation run for a seed; the
+  results agree in distribution.
+- drivers keep no history; the mutation rule only needs the number of
+  expirations since the last mutation. DeliverySimulation's history
+  holds no earnings on DELIVERED events and no "accepted" events, so
+  the earnings and acceptance ratios of the rule are 0 there as well.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy
+
+from .array_snapshot import DRIVER_STATUS_CODES, REQUEST_STATUS_CODES
+from .dispatch_policies import DispatchPolicy, GlobalGreedyPolicy, NearestNeighborPolicy
+from .driver import Driver
+from .driver_behaviour import EarningsMaxBehaviour, GreedyDistanceBehaviour, LazyBehaviour, Naive
+from .mutation_rules import DecisionTreeRule, MutationRule
+from .request import Request
+from .request_generator import RequestGenerator
+
+
+IDLE = DRIVER_STATUS_CODES["IDLE"]
+TO_PICKUP = DRIVER_STATUS_CODES["TO_PICKUP"]
+TO_DROPOFF = DRIVER_STATUS_CODES["TO_DROPOFF"]
+
+WAITING = REQUEST_STATUS_CODES["WAITING"]
+ASSIGNED = REQUEST_STATUS_CODES["ASSIGNED"]
+PICKED = REQUEST_STATUS_CODES["PICKED"]
+FREE = -1  # empty request slot
+
+# Behaviour codes, in the order DecisionTreeRule._random_behaviour picks from
+BEHAVIOURS = (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive)
+GREEDY, EARNINGS, LAZY, NAIVE = range(4)
+
+# Behaviour parameters kept per driver: (class, attribute)
+_PARAMETERS = tuple((cls, name) for cls in BEHAVIOURS for name in cls.parameters)
+
+
+def _behaviour_code(behaviour) -> int:
+    cls = type(behaviour)
+    if cls not in BEHAVIOURS:
+        raise TypeError(f"BatchSimulation does not support behaviour {cls.__name__}")
+    return BEHAVIOURS.index(cls)
+
+
+class BatchSimulation:
+    """
+    B independent replicas of one simulation configuration.
+
+    The parameters are those of DeliverySimulation. Every replica starts
+    from the same drivers (which must be idle) and the same scheduled
+    requests of the request generator.
+
+    Parameters
+    ----------
+    replicas : int
+        Number of replicas B.
+    seed : int
+        Seed of the numpy Generator all replicas draw from.
+
+    --- DOCTEST ---
+    >>> from phase2.point import Point
+    >>> from phase2.mutation_rules import MutationThresholds
+    >>> drivers = [Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())]
+    >>> batch = BatchSimulation(
+    ...     drivers, 3, NearestNeighborPolicy(), RequestGenerator(0.5),
+    ...     DecisionTreeRule(MutationThresholds()), 20, seed=1)
+    >>> for _ in range(10):
+    ...     batch.tick()
+    >>> batch.served.shape, batch.time
+    ((3,), 10)
+    >>> len(batch.summaries())
+    3
+    """
+
+    def __init__(
+        self,
+        drivers: List[Driver],
+        replicas: int,
+        dispatch_policy: DispatchPolicy,
+        request_generator: RequestGenerator,
+        mutation_rule: MutationRule,
+        timeout: int,
+        *,
+        base_fee: float = Request.BASE_FEE,
+        distance_fee: float = Request.DISTANCE_FEE,
+        seed: Optional[int] = None,
+    ) -> None:
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        if isinstance(dispatch_policy, NearestNeighborPolicy):
+            self.k: Optional[int] = dispatch_policy.k
+        elif isinstance(dispatch_policy, GlobalGreedyPolicy):
+            self.k = None
+        else:
+            raise TypeError(f"BatchSimulation does not support {type(dispatch_policy).__name__}")
+        self.policy_timeout = dispatch_policy.timeout
+        if not isinstance(mutation_rule, DecisionTreeRule):
+            raise TypeError(f"BatchSimulation does not support {type(mutation_rule).__name__}")
+        if any(d.status_code != IDLE or d.current_request is not None for d in drivers):
+            raise ValueError("BatchSimulation drivers must start IDLE without a request")
+
+        self.replicas = replicas
+        self.time = 0
+        self.timeout = timeout
+        self.base_fee = base_fee
+        self.distance_fee = distance_fee
+        self.thresholds = mutation_rule.thresholds
+        self.rate = request_generator.rate
+        self.width = request_generator.width
+        self.height = request_generator.height
+        self.rng = numpy.random.default_rng(seed)
+
+        # Scheduled requests: creation time -> (pickup x, pickup y, dropoff x, dropoff y)
+        self._scheduled: Dict[int, List[tuple]] = {}
+        for r in request_generator.scheduled:
+            self._scheduled.setdefault(r.creation_time, []).append(
+                (r.pickup.x, r.pickup.y, r.dropoff.x, r.dropoff.y)
+            )
+
+        shape = (replicas, len(drivers))
+
+        def per_driver(values, dtype=float) -> numpy.ndarray:
+            return numpy.broadcast_to(numpy.array(values, dtype=dtype), shape).copy()
+
+        # Drivers (B, N)
+        self.did = numpy.array([d.did for d in drivers], dtype=numpy.int64)
+        self.x = per_driver([d.position.x for d in drivers])
+        self.y = per_driver([d.position.y for d in drivers])
+        self.speed = per_driver([d.speed for d in drivers])
+        self.status = numpy.full(shape, IDLE, dtype=numpy.int8)
+        self.slot = numpy.full(shape, -1, dtype=numpy.int64)
+        self.earnings = per_driver([getattr(d, "total_earnings", 0.0) for d in drivers])
+        self.idle_time = per_driver([d.idle_time for d in drivers])
+        self.stamp = per_driver([d.behaviour_mutation_stamp for d in drivers], numpy.int64)
+        self.expired_since = numpy.zeros(shape, dtype=numpy.int64)
+        self.behaviour = per_driver([_behaviour_code(d.behaviour) for d in drivers], numpy.int8)
+        self._defaults: Dict[str, float] = {}
+        self.params: Dict[str, numpy.ndarray] = {}
+        for cls, name in _PARAMETERS:
+            default = getattr(cls.shared(), name)
+            self._defaults[name] = default
+            self.params[name] = per_driver([
+                getattr(d.behaviour, name, default) if isinstance(d.behaviour, cls) else default
+                for d in drivers
+            ])
+
+        # Request slots (B, C)
+        self._allocate_requests(max(8, int(2 * self.rate * (timeout + 1)) + 8))
+        self._next_seq = numpy.zeros(replicas, dtype=numpy.int64)
+
+        # Results per replica (B,)
+        self.served = numpy.zeros(replicas, dtype=numpy.int64)
+        self.expired = numpy.zeros(replicas, dtype=numpy.int64)
+        self.wait_sum = numpy.zeros(replicas, dtype=numpy.int64)
+
+        self._rows = numpy.arange(replicas)[:, None]
+
+    def _allocate_requests(self, capacity: int) -> None:
+        shape = (self.replicas, capacity)
+        self.pickup_x = numpy.zeros(shape)
+        self.pickup_y = numpy.zeros(shape)
+        self.dropoff_x = numpy.zeros(shape)
+        self.dropoff_y = numpy.zeros(shape)
+        self.trip_length = numpy.zeros(shape)
+        self.creation_time = numpy.zeros(shape, dtype=numpy.int64)
+        self.seq = numpy.zeros(shape, dtype=numpy.int64)  # arrival order within a replica
+        self.request_status = numpy.full(shape, FREE, dtype=numpy.int8)
+
+    def _grow_requests(self, extra: int) -> None:
+        """
+        Add at least extra free slots to every replica (doubling the capacity).
+        """
+        old = self.request_status.shape[1]
+        saved = {
+            name: getattr(self, name)
+            for name in ("pickup_x", "pickup_y", "dropoff_x", "dropoff_y", "trip_length",
+                         "creation_time", "seq", "request_status")
+        }
+        self._allocate_requests(max(2 * old, old + extra))
+        for name, values in saved.items():
+            getattr(self, name)[:, :old] = values
+
+    # --------------------------------------------------
+    # Tick
+    # --------------------------------------------------
+
+    def tick(self) -> None:
+        """
+        Advance every replica by one time step.
+        """
+        self.time += 1
+        self._generate_requests()
+        expired_now = self._expire_old_requests()
+        self._dispatch()
+        self._move_drivers_and_handle_events()
+        self._apply_mutations(expired_now)
+
+    def _generate_requests(self) -> None:
+        scheduled = self._scheduled.get(self.time, [])
+        random_counts = self.rng.poisson(self.rate, self.replicas)
+        counts = random_counts + len(scheduled)
+        if not counts.any():
+            return
+
+        free = self.request_status == FREE
+        missing = int((counts - free.sum(axis=1)).max())
+        if missing > 0:
+            self._grow_requests(missing)
+            free = self.request_status == FREE
+
+        # The first counts[b] free slots of replica b get the new requests;
+        # the scheduled requests come first, as in RequestGenerator.maybe_generate
+        rank = numpy.cumsum(free, axis=1)
+        rows, cols = numpy.nonzero(free & (rank <= counts[:, None]))
+        index = rank[rows, cols] - 1
+        is_scheduled = index < len(scheduled)
+        n_random = int(random_counts.sum())
+
+        coords = numpy.empty((len(rows), 4))
+        if scheduled:
+            coords[is_scheduled] = numpy.array(scheduled)[index[is_scheduled]]
+        coords[~is_scheduled, 0] = self.rng.uniform(0, self.width, n_random)
+        coords[~is_scheduled, 1] = self.rng.uniform(0, self.height, n_random)
+        coords[~is_scheduled, 2] = self.rng.uniform(0, self.width, n_random)
+        coords[~is_scheduled, 3] = self.rng.uniform(0, self.height, n_random)
+
+        self.pickup_x[rows, cols] = coords[:, 0]
+        self.pickup_y[rows, cols] = coords[:, 1]
+        self.dropoff_x[rows, cols] = coords[:, 2]
+        self.dropoff_y[rows, cols] = coords[:, 3]
+        self.trip_length[rows, cols] = numpy.sqrt(
+            (coords[:, 0] - coords[:, 2]) ** 2 + (coords[:, 1] - coords[:, 3]) ** 2
+        )
+        self.creation_time[rows, cols] = self.time
+        self.seq[rows, cols] = self._next_seq[rows] + index
+        self.request_status[rows, cols] = WAITING
+        self._next_seq += counts
+
+    def _expire_old_requests(self) -> numpy.ndarray:
+        """
+        Expire requests that waited longer than timeout and release their drivers.
+
+        Returns the (B, N) mask of drivers that were released.
+        """
+        status = self.request_status
+        expired = ((status == WAITING) | (status == ASSIGNED)) & (
+            self.time - self.creation_time > self.timeout
+        )
+        self.expired += expired.sum(axis=1)
+
+        holding = self.slot >= 0
+        released = holding & numpy.take_along_axis(expired, numpy.where(holding, self.slot, 0), axis=1)
+        self.status[released] = IDLE
+        self.slot[released] = -1
+        self.expired_since += released
+
+        status[expired] = FREE
+        return released
+
+    def _accepts(self, rows: numpy.ndarray, dist: numpy.ndarray, trip: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the decisions of the drivers' behaviours for (P, N) offers.
+
+        Row p offers one request of replica rows[p] to every driver of
+        that replica; dist is the driver to pickup distance and trip the
+        pickup to dropoff distance. The greedy, lazy and naive rules are
+        all limits on dist and trip, so they are turned into one pair of
+        limits per driver first.
+        """
+        params = self.params
+        behaviour = self.behaviour
+        inf = numpy.inf
+
+        # GreedyDistanceBehaviour (max_distance 0 means speed * expiretime)
+        max_distance = numpy.where(
+            params["max_distance"] == 0, self.speed * params["expiretime"], params["max_distance"]
+        )
+        # LazyBehaviour only accepts after max_idle_time idle ticks
+        lazy_close = numpy.where(self.idle_time >= params["max_idle_time"], params["close"], -inf)
+
+        dist_limit = numpy.where(
+            behaviour == GREEDY, max_distance / 3, numpy.where(behaviour == LAZY, lazy_close, inf)
+        )
+        trip_limit = numpy.where(behaviour == GREEDY, max_distance, inf)
+        accepted = (dist <= dist_limit[rows]) & (trip <= trip_limit[rows])
+
+        # EarningsMaxBehaviour
+        earnings = (behaviour == EARNINGS)[rows]
+        if earnings.any():
+            total = dist + trip
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                ratio = (5 + numpy.floor_divide(total - 5, 5)) / (total / self.speed[rows])
+            accepted &= ~earnings | (ratio >= params["min_ratio"][rows])
+        return accepted
+
+    def _dispatch(self) -> None:
+        """
+        Offer, accept, resolve conflicts and assign, like one dispatch round
+        of DeliverySimulation.
+
+        The offers are (P, N) arrays: one row per waiting request of any
+        replica (P in total) against the N drivers of its replica.
+        """
+        idle = self.status == IDLE
+        rows, slots = numpy.nonzero(self.request_status == WAITING)
+        if len(rows) == 0 or not idle.any():
+            return
+
+        px = self.pickup_x[rows, slots]
+        py = self.pickup_y[rows, slots]
+        trip = self.trip_length[rows, slots]
+        dist = numpy.sqrt((self.x[rows] - px[:, None]) ** 2 + (self.y[rows] - py[:, None]) ** 2)
+        offered = idle[rows]
+        accepted = offered & self._accepts(rows, dist, trip[:, None])
+        if self.policy_timeout is not None:
+            # Drivers that cannot reach the pickup before it expires (see DispatchPolicy)
+            ticks = self.creation_time[rows, slots] + self.policy_timeout - self.time + 1
+            accepted &= dist <= self.speed[rows] * ticks[:, None] * (1 + 1e-9)
+
+        if self.k is not None:
+            # NearestNeighborPolicy: the first accepting driver among the
+            # k nearest idle ones; the earliest request wins a driver
+            nearest = numpy.argsort(
+                numpy.where(offered, dist, numpy.inf), axis=1, kind="stable"
+            )[:, :self.k]
+            accepted_k = numpy.take_along_axis(accepted, nearest, axis=1)
+            has_driver = accepted_k.any(axis=1)
+            driver = nearest[numpy.arange(len(rows)), accepted_k.argmax(axis=1)]
+            priority = numpy.zeros(len(rows))
+        else:
+            # GlobalGreedyPolicy: the nearest accepting driver; the request
+            # closest to a driver wins it
+            candidate = numpy.where(accepted, dist, numpy.inf)
+            driver = candidate.argmin(axis=1)
+            priority = candidate[numpy.arange(len(rows)), driver]
+            has_driver = numpy.isfinite(priority)
+
+        rows, slots, driver, priority = rows[has_driver], slots[has_driver], driver[has_driver], priority[has_driver]
+        if len(rows) == 0:
+            return
+        key = rows * self.x.shape[1] + driver
+        order = numpy.lexsort((self.seq[rows, slots], priority, key))
+        key = key[order]
+        wins = numpy.ones(len(key), dtype=bool)
+        wins[1:] = key[1:] != key[:-1]
+        win = order[wins]
+
+        rows, driver, slots = rows[win], driver[win], slots[win]
+        self.status[rows, driver] = TO_PICKUP
+        self.slot[rows, driver] = slots
+        self.idle_time[rows, driver] = 0
+        self.request_status[rows, slots] = ASSIGNED
+
+    def _move_drivers_and_handle_events(self) -> None:
+        """
+        Move busy drivers towards their target and handle pickup/dropoff.
+        """
+        busy = self.slot >= 0
+        if not busy.any():
+            return
+        slot = numpy.where(busy, self.slot, 0)
+        to_pickup = self.status == TO_PICKUP
+        to_dropoff = self.status == TO_DROPOFF
+
+        def at_slot(values: numpy.ndarray) -> numpy.ndarray:
+            return numpy.take_along_axis(values, slot, axis=1)
+
+        target_x = numpy.where(to_pickup, at_slot(self.pickup_x), at_slot(self.dropoff_x))
+        target_y = numpy.where(to_pickup, at_slot(self.pickup_y), at_slot(self.dropoff_y))
+        dx = target_x - self.x
+        dy = target_y - self.y
+        dist = numpy.sqrt(dx ** 2 + dy ** 2)
+
+        arrived = busy & (dist <= self.speed)
+        moving = busy & ~arrived
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            self.x = numpy.where(arrived, target_x, numpy.where(moving, self.x + dx / dist * self.speed, self.x))
+            self.y = numpy.where(arrived, target_y, numpy.where(moving, self.y + dy / dist * self.speed, self.y))
+
+        picked = arrived & to_pickup
+        self.status[picked] = TO_DROPOFF
+        rows, cols = numpy.nonzero(picked)
+        self.request_status[rows, slot[rows, cols]] = PICKED
+
+        delivered = arrived & to_dropoff
+        rows, cols = numpy.nonzero(delivered)
+        if len(rows):
+            slots = slot[rows, cols]
+            numpy.add.at(self.served, rows, 1)
+            numpy.add.at(self.wait_sum, rows, self.time - self.creation_time[rows, slots])
+            self.earnings[rows, cols] += self.base_fee + self.distance_fee * self.trip_length[rows, slots]
+            self.status[rows, cols] = IDLE
+            self.slot[rows, cols] = -1
+            self.request_status[rows, slots] = FREE
+
+    def _apply_mutations(self, expired_now: numpy.ndarray) -> None:
+        """
+        DecisionTreeRule.maybe_mutate for every driver of every replica.
+        """
+        thr = self.thresholds
+        current = self.behaviour
+        random_behaviour = self.rng.integers(0, len(BEHAVIOURS), size=current.shape).astype(numpy.int8)
+
+        by_time = self.time - self.stamp >= thr.lasttime_mutation_thr
+        a = self.expired_since >= thr.expire_thr
+        # Earnings and accepted ratios since the last mutation (0, see module docstring)
+        b = 0.0 < thr.earning_thr
+        c = 0.0 < thr.accepted_thr
+        not_a = ~a
+
+        def unless(code: int, otherwise) -> numpy.ndarray:
+            return numpy.where(current != code, code, otherwise)
+
+        new = numpy.select(
+            [
+                by_time,
+                a & (not b) & (not c),
+                not_a & b & (not c),
+                not_a & (not b) & c,
+                a & b & (not c),
+                not_a & b & c,
+                a & (not b) & c,
+                a & b & c,
+            ],
+            [
+                random_behaviour,
+                unless(GREEDY, LAZY),
+                unless(EARNINGS, GREEDY),
+                unless(NAIVE, EARNINGS),
+                unless(GREEDY, random_behaviour),
+                unless(EARNINGS, NAIVE),
+                unless(LAZY, random_behaviour),
+                random_behaviour,
+            ],
+            default=-1,
+        )
+        mutated = new >= 0
+        if not mutated.any():
+            return
+
+        # Every mutation makes a new behaviour with default parameters
+        self.behaviour = numpy.where(mutated, new, current).astype(numpy.int8)
+        self.stamp[mutated] = self.time
+        self.expired_since[mutated] = expired_now[mutated]
+        for name, values in self.params.items():
+            values[mutated] = self._defaults[name]
+
+    # --------------------------------------------------
+    # Results
+    # --------------------------------------------------
+
+    def avg_wait(self) -> numpy.ndarray:
+        """
+        Return the average waiting time of each replica (0 without deliveries).
+        """
+        return numpy.where(self.served > 0, self.wait_sum / numpy.maximum(self.served, 1), 0.0)
+
+    def summaries(self) -> List[Dict]:
+        """
+        Return one dict per replica, with the keys of branching.summarize.
+        """
+        avg_wait = self.avg_wait()
+        earnings = self.earnings.sum(axis=1)
+        return [
+            {
+                "time": self.time,
+                "served": int(self.served[b]),
+                "expired": int(self.expired[b]),
+                "avg_wait": float(avg_wait[b]),
+                "earnings": float(earnings[b]),
+            }
+            for b in range(self.replicas)
+        ]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
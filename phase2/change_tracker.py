@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+class ChangeTracker:
+    """
+    Record which drivers and requests changed in each frame.
+
+    The simulation starts a new frame every tick (the frame id is the
+    tick number). Drivers report themselves when they move or change
+    status, and requests report themselves when they are marked. A
+    request that is no longer active is recorded as removed.
+
+    Only the last max_frames frames are kept. Asking for changes since
+    an older frame returns None, and the caller must send a full snapshot.
+
+    --- DOCTEST ---
+    >>> class D:
+    ...     did = 1
+    >>> class R:
+    ...     def __init__(self, rid, active): self.rid, self._a = rid, active
+    ...     def is_active(self): return self._a
+    >>> tracker = ChangeTracker(max_frames=2)
+    >>> tracker.begin_frame(1)
+    >>> tracker.request_added(R(5, True))
+    >>> tracker.begin_frame(2)
+    >>> tracker.driver_changed(D())
+    >>> tracker.request_changed(R(6, False))
+    >>> drivers, added, updated, removed = tracker.changes_since(0)
+    >>> sorted(drivers), sorted(added), sorted(removed)
+    ([1], [5], [6])
+    >>> tracker.changes_since(1)[1]
+    set()
+    >>> tracker.begin_frame(3)
+    >>> tracker.changes_since(0) is None
+    True
+    """
+
+    def __init__(self, max_frames: int = 256) -> None:
+        self.max_frames = max(1, int(max_frames))
+        self.frame = 0
+        self._frames: Deque[Tuple[int, Set[int], Set[int], Set[int], Set[int]]] = deque()
+        self.begin_frame(0)
+
+    def begin_frame(self, frame: int) -> None:
+        """
+        Start collecting changes for a new frame.
+        """
+        self.frame = frame
+        self._drivers: Set[int] = set()
+        self._added: Set[int] = set()
+        self._updated: Set[int] = set()
+        self._removed: Set[int] = set()
+        self._frames.append((frame, self._drivers, self._added, self._updated, self._removed))
+        while len(self._frames) > self.max_frames:
+            self._frames.popleft()
+
+    def driver_changed(self, driver: "Driver") -> None:
+        self._drivers.add(driver.did)
+
+    def request_added(self, request: "Request") -> None:
+        self._added.add(request.rid)
+
+    def request_changed(self, request: "Request") -> None:
+        if request.is_active():
+            self._updated.add(request.rid)
+        else:
+            self._removed.add(request.rid)
+
+    def changes_since(
+        self, since_frame: int
+    ) -> Optional[Tuple[Set[int], Set[int], Set[int], Set[int]]]:
+        """
+        Return (drivers, added, updated, removed) id sets for all frames
+        after since_frame, or None if those frames are no longer kept.
+
+        A request added and removed in the range is left out, and a
+        request added in the range is only reported as added.
+        """
+        if self._frames[0][0] > since_frame + 1:
+            return None
+
+        drivers: Set[int] = set()
+        added: Set[int] = set()
+        updated: Set[int] = set()
+        removed: Set[int] = set()
+        for frame, d, a, u, r in self._frames:
+            if frame > since_frame:
+                drivers |= d
+                added |= a
+                updated |= u
+                removed |= r
+
+        updated -= added
+        updated -= removed
+        added_and_removed = added & removed
+        added -= added_and_removed
+        removed -= added_and_removed
+        return drivers, added, updated, removed
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,376 @@
+"""
+Checkpoint and restore of a running DeliverySimulation.
+
+A checkpoint holds the full state of a simulation between two ticks:
+time, counters, wait times, metrics, every request (including the ones
+still scheduled in the request generator), every driver with its
+behaviour, idle counters, mutation stamp and history, the dispatch
+policy, the mutation rule and the state of the random generators.
+
+The state is written as plain columns (one list per attribute) instead
+of pickling the object graph. Objects that are referenced from several
+places (requests held by drivers, behaviours shared between drivers and
+history events) are stored once and referenced by index. The columns
+are encoded with marshal and compressed with zlib behind a small header:
+
+    b"DSCK" | format version (uint16) | zlib(marshal(state))
+
+marshal is fast and compact but its format may change between Python
+versions, so checkpoints are meant to be restored by the same Python
+version that wrote them.
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+import random
+import struct
+import zlib
+from importlib import import_module
+from typing import Any, Dict, List, TYPE_CHECKING
+
+import numpy
+
+from .point import Point
+from .request import Request
+from .driver import Driver, HistoryEvent
+from .status import DriverStatus, RequestStatus
+
+if TYPE_CHECKING:
+    from .delivery_simulation import DeliverySimulation
+
+
+MAGIC = b"DSCK"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">4sH")
+
+_REQUEST_COLUMNS = (
+    "rid", "px", "py", "dx", "dy", "creation_time", "status", "assigned_driver_id",
+    "wait_time", "pickup_wait_time", "delivered_wait_time", "expired_wait_time",
+)
+
+
+# --------------------------------------------------
+# Generic configuration objects (policies, rules, behaviours, ...)
+# --------------------------------------------------
+
+def _encode_value(value: Any) -> Any:
+    """
+    Encode a value made of primitives, containers and phase2 objects.
+
+    Objects are stored as ("__obj__", module, class name, attributes) and
+    numpy Generators (DecisionTreeRule.rng) as ("__rng__", bit generator
+    name, bit generator state).
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, tuple):
+        return ("__tuple__", [_encode_value(v) for v in value])
+    if isinstance(value, dict):
+        return {k: _encode_value(v) for k, v in value.items()}
+    if isinstance(value, numpy.random.Generator):
+        bit_generator = value.bit_generator
+        return ("__rng__", type(bit_generator).__name__, _encode_value(bit_generator.state))
+    if hasattr(value, "__dict__") and type(value).__module__.startswith("phase2."):
+        cls = type(value)
+        return ("__obj__", cls.__module__, cls.__qualname__, _encode_value(vars(value)))
+    raise TypeError(f"Cannot checkpoint value of type {type(value).__name__}")
+
+
+def _find_bit_generator(name: str) -> type:
+    cls = getattr(numpy.random, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, numpy.random.BitGenerator)):
+        raise ValueError(f"Unknown bit generator {name!r}")
+    return cls
+
+
+def _find_class(module: str, name: str) -> type:
+    if not module.startswith("phase2."):
+        raise ValueError(f"Refusing to restore class from module {module!r}")
+    return getattr(import_module(module), name)
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _decode_value(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        tag = value[0]
+        if tag == "__tuple__":
+            return tuple(_decode_value(v) for v in value[1])
+        if tag == "__rng__":
+            bit_generator = _find_bit_generator(value[1])()
+            bit_generator.state = _decode_value(value[2])
+            return numpy.random.Generator(bit_generator)
+        if tag == "__obj__":
+            cls = _find_class(value[1], value[2])
+            obj = cls.__new__(cls)
+            obj.__dict__.update(_decode_value(value[3]))
+            return obj
+    return value
+
+
+class _ObjectTable:
+    """
+    Store shared objects once and hand out their index (-1 for None).
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Any] = []
+        self._index: Dict[int, int] = {}
+
+    def ref(self, obj: Any) -> int:
+        if obj is None:
+            return -1
+        key = id(obj)
+        index = self._index.get(key)
+        if index is None:
+            index = len(self.entries)
+            self._index[key] = index
+            self.entries.append(_encode_value(obj))
+        return index
+
+
+# --------------------------------------------------
+# Requests
+# --------------------------------------------------
+
+def _encode_requests(requests: List[Request]) -> Dict[str, list]:
+    return {
+        "rid": [r.rid for r in requests],
+        "px": [r.pickup.x for r in requests],
+        "py": [r.pickup.y for r in requests],
+        "dx": [r.dropoff.x for r in requests],
+        "dy": [r.dropoff.y for r in requests],
+        "creation_time": [r.creation_time for r in requests],
+        "status": bytes(r.status_code for r in requests),
+        "assigned_driver_id": [r.assigned_driver_id for r in requests],
+        "wait_time": [r.wait_time for r in requests],
+        "pickup_wait_time": [r.pickup_wait_time for r in requests],
+        "delivered_wait_time": [r.delivered_wait_time for r in requests],
+        "expired_wait_time": [r.expired_wait_time for r in requests],
+    }
+
+
+def _decode_requests(columns: Dict[str, Any]) -> List[Request]:
+    rows = zip(*(columns[name] for name in _REQUEST_COLUMNS))
+    return [
+        Request(
+            rid, Point(px, py), Point(dx, dy), creation_time, RequestStatus(status),
+            assigned, wait, pickup_wait, delivered_wait, expired_wait,
+        )
+        for (rid, px, py, dx, dy, creation_time, status, assigned,
+             wait, pickup_wait, delivered_wait, expired_wait) in rows
+    ]
+
+
+# --------------------------------------------------
+# Random generators
+# --------------------------------------------------
+
+def _capture_rng() -> Dict[str, Any]:
+    name, keys, pos, has_gauss, cached_gauss = numpy.random.get_state()
+    return {
+        "random": random.getstate(),
+        "numpy": (name, keys.tobytes(), int(pos), int(has_gauss), float(cached_gauss)),
+    }
+
+
+def _restore_rng(state: Dict[str, Any]) -> None:
+    version, internal, gauss = state["random"]
+    random.setstate((version, tuple(internal), gauss))
+    name, keys, pos, has_gauss, cached_gauss = state["numpy"]
+    numpy.random.set_state(
+        (name, numpy.frombuffer(keys, dtype=numpy.uint32), pos, has_gauss, cached_gauss)
+    )
+
+
+# --------------------------------------------------
+# Whole simulation
+# --------------------------------------------------
+
+def capture_state(sim: "DeliverySimulation") -> Dict[str, Any]:
+    """
+    Return the full simulation state as plain data (no phase2 objects).
+
+    This must run between ticks, on the thread that owns the simulation.
+    The result no longer references the simulation, so it can be encoded
+    and written on another thread while the simulation continues.
+    """
+    request_index = {id(r): i for i, r in enumerate(sim.requests)}
+    behaviours = _ObjectTable()
+    drivers = sim.drivers
+
+    history = []
+    for d in drivers:
+        history.append([
+            (ev.timestamp, ev.event, behaviours.ref(ev.behaviour), ev.request_id, ev.earnings)
+            for ev in d.history
+        ])
+
+    generator = sim.request_generator
+    generator_attrs = {k: v for k, v in vars(generator).items() if k != "scheduled"}
+
+    return {
+        "time": sim.time,
+        "timeout": sim.timeout,
+        "served_count": sim.served_count,
+        "expired_count": sim.expired_count,
+        "wait_times": list(sim.wait_times),
+        "base_fee": sim.base_fee,
+        "distance_fee": sim.distance_fee,
+        "record_interval": sim.record_interval,
+        "dt": sim.dt,
+        "metrics": _encode_value(sim.metrics),
+        "dispatch_policy": _encode_value(sim.dispatch_policy),
+        "mutation_rule": _encode_value(sim.mutation_rule),
+        "request_generator": (
+            type(generator).__module__,
+            type(generator).__qualname__,
+            _encode_value(generator_attrs),
+            _encode_requests(generator.scheduled),
+        ),
+        "requests": _encode_requests(sim.requests),
+        "drivers": {
+            "did": [d.did for d in drivers],
+            "x": [d.position.x for d in drivers],
+            "y": [d.position.y for d in drivers],
+            "speed": [d.speed for d in drivers],
+            "status": bytes(d.status_code for d in drivers),
+            "current_request": [
+                -1 if d.current_request is None else request_index[id(d.current_request)]
+                for d in drivers
+            ],
+            "behaviour": [behaviours.ref(d.behaviour) for d in drivers],
+            "total_earnings": [d.total_earnings for d in drivers],
+            "idle_time": [d.idle_time for d in drivers],
+            "idle_stattime": [d.idle_stattime for d in drivers],
+            "behaviour_mutation_stamp": [d.behaviour_mutation_stamp for d in drivers],
+            "history": history,
+            # Origin and start tick of the trips, so restored drivers move on the same line
+            "trip": [
+                None if d.trip is None else (d.trip.origin.x, d.trip.origin.y, d.trip.start)
+                for d in drivers
+            ],
+        },
+        "behaviours": behaviours.entries,
+        "rng": _capture_rng(),
+    }
+
+
+def restore_state(state: Dict[str, Any], restore_rng: bool = True) -> "DeliverySimulation":
+    """
+    Build a new DeliverySimulation from a captured state.
+
+    With restore_rng the global random and numpy.random generators are
+    reset to their state at capture time, so the restored simulation
+    continues exactly like the original would have.
+    """
+    from .delivery_simulation import DeliverySimulation
+
+    requests = _decode_requests(state["requests"])
+    behaviours = [_decode_value(b) for b in state["behaviours"]]
+
+    def behaviour(index: int) -> Any:
+        return None if index < 0 else behaviours[index]
+
+    cols = state["drivers"]
+    drivers = []
+    for i, did in enumerate(cols["did"]):
+        current = cols["current_request"][i]
+        d = Driver(
+            did,
+            Point(cols["x"][i], cols["y"][i]),
+            cols["speed"][i],
+            DriverStatus(cols["status"][i]),
+            None if current < 0 else requests[current],
+            behaviour(cols["behaviour"][i]),
+        )
+        d.total_earnings = cols["total_earnings"][i]
+        d.idle_time = cols["idle_time"][i]
+        d.idle_stattime = cols["idle_stattime"][i]
+        d.behaviour_mutation_stamp = cols["behaviour_mutation_stamp"][i]
+        d.history = [
+            HistoryEvent(timestamp, event, behaviour(b), request_id, earnings)
+            for timestamp, event, b, request_id, earnings in cols["history"][i]
+        ]
+        drivers.append(d)
+
+    module, name, attrs, scheduled = state["request_generator"]
+    generator_cls = _find_class(module, name)
+    generator = generator_cls.__new__(generator_cls)
+    generator.__dict__.update(_decode_value(attrs))
+    generator.scheduled = _decode_requests(scheduled)
+
+    sim = DeliverySimulation(
+        drivers,
+        _decode_value(state["dispatch_policy"]),
+        generator,
+        _decode_value(state["mutation_rule"]),
+        state["timeout"],
+        base_fee=state["base_fee"],
+        distance_fee=state["distance_fee"],
+        record_interval=state["record_interval"],
+        dt=state.get("dt", 1),
+    )
+    sim.time = state["time"]
+    sim.served_count = state["served_count"]
+    sim.expired_count = state["expired_count"]
+    sim.wait_times = list(state["wait_times"])
+    sim.metrics = _decode_value(state["metrics"])
+
+    sim.trip_schedule.tick = sim.time
+    for d, trip in zip(drivers, cols.get("trip") or ()):
+        if trip is not None:
+            x, y, start = trip
+            sim.trip_schedule.resume(d, Point(x, y), start)
+
+    sim.requests = requests
+    sim.change_tracker.begin_frame(sim.time)
+    for r in requests:
+        r.change_tracker = sim.change_tracker
+        r.dispatch_index = sim.dispatch_index
+        sim.dispatch_index.add_request(r)
+        sim._requests_by_id[r.rid] = r
+
+    if restore_rng:
+        _restore_rng(state["rng"])
+    return sim
+
+
+def encode(state: Dict[str, Any], level: int = 1) -> bytes:
+    """
+    Encode a captured state into the binary checkpoint format.
+    """
+    return _HEADER.pack(MAGIC, FORMAT_VERSION) + zlib.compress(marshal.dumps(state), level)
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """
+    Decode a binary checkpoint back into a state.
+    """
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a DeliverySimulation checkpoint")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version}")
+    return marshal.loads(zlib.decompress(data[_HEADER.size:]))
+
+
+def write(path: str, state: Dict[str, Any]) -> None:
+    """
+    Encode a state and write it to path (via a temporary file).
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(state))
+    os.replace(tmp, path)
+
+
+def read(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return decode(f.read())
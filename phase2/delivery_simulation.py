@@ -1,15 +1,29 @@
 from __future__ import annotations
 
-from typing import List, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, TYPE_CHECKING
 
 from .request import Request
 from .driver import Driver
-from .dispatch_policies import DispatchPolicy
-from .request_generator import RequestGenerator
-from .mutation_rules import MutationRule
 from .offer import Offer
+from .distance_cache import DistanceCache
+from .change_tracker import ChangeTracker
+from .dispatch_index import DispatchIndex
+from .rejection_memo import RejectionMemo
+from .mutation_scheduler import MutationScheduler
+from .trips import TripSchedule
+from .status import ASSIGNED, IDLE, PICKED
 from .metrics_collector import MetricsCollector
 
+if TYPE_CHECKING:
+    # Only needed for annotations; importing them here would pull in
+    # numpy and every policy/behaviour module at engine import time.
+    from .dispatch_policies import DispatchPolicy
+    from .request_generator import RequestGenerator
+    from .mutation_rules import MutationRule
+    from .array_snapshot import ArraySnapshot
+    from .event_log import EventLog
+
 
 class DeliverySimulation:
     """
@@ -18,6 +32,9 @@ class DeliverySimulation:
     Controls time, drivers, requests, and statistics.
     """
 
+    # Event log written while a run is recorded (see start_event_log)
+    event_log: Optional[EventLog] = None
+
     def __init__(
         self,
         drivers: List[Driver],
@@ -26,9 +43,12 @@ class DeliverySimulation:
         mutation_rule: MutationRule,
         timeout: int,
         *,
-        base_fee: float = 10.0,
-        distance_fee: float = 1.0,
+        base_fee: float = Request.BASE_FEE,
+        distance_fee: float = Request.DISTANCE_FEE,
         record_interval: int = 1,
+        checkpoint_every: int = 0,
+        checkpoint_path: str = "checkpoint_{time}.dsck",
+        dt: int = 1,
     ) -> None:
         """
         Create a simulation instance.
@@ -38,8 +58,20 @@ class DeliverySimulation:
         record_interval : int
             How often to record metrics (every N ticks). Default is 1 (every tick).
             Set higher for long simulations to reduce memory usage.
+        checkpoint_every : int
+            Save a checkpoint every N ticks in the background. 0 (default) disables it.
+        checkpoint_path : str
+            Path for periodic checkpoints; "{time}" is replaced by the tick.
+        dt : int
+            Ticks covered by one call of tick(). Default is 1 (exact). With a
+            larger dt the run is approximate but faster: requests are generated
+            and expired, drivers dispatched and mutated once per step, while
+            pickups and dropoffs still happen at the exact tick within the step.
         """
+        if not isinstance(dt, int) or dt < 1:
+            raise ValueError("dt must be a positive integer")
         self.time = 0
+        self.dt = dt
         self.drivers = drivers
         self.requests: List[Request] = []
 
@@ -59,36 +91,140 @@ class DeliverySimulation:
         self.metrics = MetricsCollector()
         self.record_interval = record_interval
 
+        # Periodic checkpoints (written by a background thread)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = checkpoint_path
+        self._checkpoint_writer: Optional[ThreadPoolExecutor] = None
+        self._checkpoint_futures: List[Future] = []
+
+        # Driver -> pickup distances shared by dispatch and behaviours within one tick
+        self.distance_cache = DistanceCache()
+
+        # Reusable NumPy buffers for get_array_snapshot() (created on first use)
+        self._array_snapshot: Optional[ArraySnapshot] = None
+
+        # Drivers and requests changed per tick, for get_delta_snapshot()
+        self.change_tracker = ChangeTracker()
+        self._drivers_by_id: Dict[int, Driver] = {d.did: d for d in self.drivers}
+        self._requests_by_id: Dict[int, Request] = {}
+
+        # Idle drivers and waiting requests, updated on status changes
+        self.dispatch_index = DispatchIndex()
+
+        # Offers rejected by drivers whose decision inputs did not change since
+        self.rejection_memo = RejectionMemo()
+
+        # Drivers the mutation rule has to look at in each tick
+        self.mutation_scheduler = MutationScheduler(mutation_rule)
+
+        # Trips of the busy drivers and their arrival ticks
+        self.trip_schedule = TripSchedule()
+
         for d in self.drivers:
-            if not hasattr(d, "total_earnings"):
-                d.total_earnings = 0.0
+            self._attach_driver(d)
+
+    def _attach_driver(self, d: Driver) -> None:
+        if not hasattr(d, "total_earnings"):
+            d.total_earnings = 0.0
+        d.distance_cache = self.distance_cache
+        d.change_tracker = self.change_tracker
+        d.dispatch_index = self.dispatch_index
+        self.dispatch_index.add_driver(d)
+        d.mutation_scheduler = self.mutation_scheduler
+        self.mutation_scheduler.add_driver(d, self.time)
+        d.trip_schedule = self.trip_schedule
+        self.trip_schedule.add_driver(d)
+
+    def add_drivers(self, drivers: List[Driver]) -> None:
+        """
+        Add drivers to a running simulation (after the existing ones).
+        """
+        for d in drivers:
+            self._attach_driver(d)
+            self.drivers.append(d)
+            self._drivers_by_id[d.did] = d
+            d._changed()
 
-    def tick(self) -> None:
+    def remove_drivers(self, drivers: List[Driver]) -> None:
+        """
+        Take drivers out of a running simulation.
+
+        The drivers are detached from the simulation's caches, so they
+        can be moved to another simulation (or pickled). Drivers that
+        still hold a request should not be removed.
         """
-        Advance the simulation by one time step.
+        removed = {id(d) for d in drivers}
+        self.drivers[:] = [d for d in self.drivers if id(d) not in removed]
+        for d in drivers:
+            self._drivers_by_id.pop(d.did, None)
+            self.dispatch_index.remove_driver(d)
+            self.mutation_scheduler.remove_driver(d)
+            self.trip_schedule.remove_driver(d)
+            d.trip_schedule = None
+            d.distance_cache = None
+            d.change_tracker = None
+            d.dispatch_index = None
+            d.mutation_scheduler = None
+
+    def _add_request(self, r: Request) -> None:
         """
-        self.time += 1
+        Add a new request and register it with the change tracker and dispatch index.
+        """
+        self.requests.append(r)
+        self._requests_by_id[r.rid] = r
+        r.change_tracker = self.change_tracker
+        self.change_tracker.request_added(r)
+        r.dispatch_index = self.dispatch_index
+        self.dispatch_index.add_request(r)
 
-        new_requests = self.request_generator.maybe_generate(self.time)
-        self.requests.extend(new_requests)
+    def tick(self) -> None:
+        """
+        Advance the simulation by one time step of dt ticks.
+
+        With dt > 1 the ticks before the last one of the step only move
+        the drivers (completing the pickups and dropoffs that happen in
+        them). The requests of the whole step arrive together and the
+        rest of the tick (expiry, dispatch, mutations) runs once, at the
+        last tick, so a driver that becomes idle within a step waits for
+        the end of the step to get a new request.
+        """
+        start = self.time
+        self.time += self.dt
+        self.change_tracker.begin_frame(self.time)
+
+        if self.dt == 1:
+            new_requests = self.request_generator.maybe_generate(self.time)
+        else:
+            for t in range(start + 1, self.time):
+                self._move_drivers_and_handle_events(t)
+            new_requests = self.request_generator.generate_between(start, self.time)
+        for r in new_requests:
+            self._add_request(r)
+            if self.event_log is not None:
+                self.event_log.arrival(self.time, r)
 
         self._expire_old_requests()
 
+        # Only idle drivers and waiting requests can be matched
         offers = self.dispatch_policy.assign(
-            self.drivers,
-            self._active_requests(),
+            self.dispatch_index.idle_drivers(),
+            self.dispatch_index.waiting_requests(),
             self.time,
         )
 
         accepted = self._filter_acceptances(offers)
+        self.rejection_memo.prune()
         assignments = self._resolve_conflicts(accepted)
         self._apply_assignments(assignments)
 
-        self._move_drivers_and_handle_events()
+        self._move_drivers_and_handle_events(self.time)
         self._apply_mutations()
+
+        # Drivers have moved, so this tick's distances are no longer valid
+        self.distance_cache.clear()
         
         # Record metrics at specified intervals
-        if self.time % self.record_interval == 0:
+        if self.time // self.record_interval != start // self.record_interval:
             self.metrics.record_snapshot(
                 time=self.time,
                 served_count=self.served_count,
@@ -98,6 +234,100 @@ class DeliverySimulation:
                 requests=self.requests
             )
 
+        if self.checkpoint_every and self.time // self.checkpoint_every != start // self.checkpoint_every:
+            self.save_checkpoint(self.checkpoint_path.format(time=self.time), background=True)
+
+        if self.event_log is not None:
+            self.event_log.end_tick(self)
+
+    def start_event_log(self, path: str, checkpoint_every: int = 1000) -> EventLog:
+        """
+        Record the run from now on in an append-only event log at path.
+
+        A checkpoint of the current state is written next to the log
+        (and one every checkpoint_every ticks), so a Replayer can
+        rebuild the state at any tick from the log. Stop the log with
+        stop_event_log before replaying it.
+        """
+        from .event_log import EventLog
+
+        if self.event_log is not None:
+            raise RuntimeError("An event log is already running")
+        if self.dt != 1:
+            raise ValueError("Event logs are only written with dt=1")
+        self.event_log = EventLog(path, checkpoint_every)
+        self.event_log.mark_checkpoint(self)
+        self.event_log._push()
+        return self.event_log
+
+    def stop_event_log(self) -> None:
+        """
+        Flush and close the event log and wait for its checkpoints.
+        """
+        log, self.event_log = self.event_log, None
+        if log is not None:
+            self.wait_for_checkpoints()
+            log.close(self.time)
+
+    def save_checkpoint(self, path: str, background: bool = False) -> Optional[Future]:
+        """
+        Save the full simulation state to path.
+
+        The state is captured immediately (so it is consistent with the
+        current tick). With background=True the encoding, compression
+        and file writing run on a writer thread and a Future is returned;
+        the simulation can keep ticking meanwhile.
+        """
+        from . import checkpoint
+
+        state = checkpoint.capture_state(self)
+        if not background:
+            checkpoint.write(path, state)
+            return None
+
+        if self._checkpoint_writer is None:
+            self._checkpoint_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="checkpoint"
+            )
+        self._checkpoint_futures = [f for f in self._checkpoint_futures if not f.done()]
+        future = self._checkpoint_writer.submit(checkpoint.write, path, state)
+        self._checkpoint_futures.append(future)
+        return future
+
+    def wait_for_checkpoints(self) -> None:
+        """
+        Block until all background checkpoints are written.
+
+        Raises the first error a background write ran into.
+        """
+        futures, self._checkpoint_futures = self._checkpoint_futures, []
+        for future in futures:
+            future.result()
+
+    def fork(self, n: int = 1) -> List["DeliverySimulation"]:
+        """
+        Return n independent copies of this simulation at the current tick.
+
+        The copies are restored from one captured state, so they share no
+        drivers, points, requests or behaviours with this simulation. See
+        phase2.branching.run_branches to run what-if branches in a pool.
+        """
+        from .branching import fork
+
+        return fork(self, n)
+
+    @classmethod
+    def load_checkpoint(cls, path: str, restore_rng: bool = True) -> "DeliverySimulation":
+        """
+        Create a simulation from a checkpoint written by save_checkpoint.
+
+        With restore_rng the global random generators are reset as well,
+        so the run continues exactly as the original one did.
+        """
+        from . import checkpoint
+
+        return checkpoint.restore_state(checkpoint.read(path), restore_rng=restore_rng)
+
     def get_snapshot(self) -> Dict:
         """
         Return current state in GUI-friendly format.
@@ -107,28 +337,92 @@ class DeliverySimulation:
             "served": self.served_count,
             "expired": self.expired_count,
             "avg_wait": self._avg_wait(),
-            "drivers": [
-                {
-                    "id": d.did,
-                    "x": d.position.x,
-                    "y": d.position.y,
-                    "status": d.status,
-                    "earnings": d.total_earnings,
-                }
-                for d in self.drivers
-            ],
+            "drivers": [self._driver_view(d) for d in self.drivers],
             "pickups": [
                 (r.pickup.x, r.pickup.y)
                 for r in self.requests
-                if r.status in ("WAITING", "ASSIGNED")
+                if r.status_code <= ASSIGNED
             ],
             "dropoffs": [
                 (r.dropoff.x, r.dropoff.y)
                 for r in self.requests
-                if r.status == "PICKED"
+                if r.status_code == PICKED
             ],
         }
 
+    def get_delta_snapshot(self, since_frame: int) -> Dict:
+        """
+        Return only what changed after the frame since_frame.
+
+        The frame id is the tick number. The result holds the changed
+        drivers (GUI-friendly dicts as in get_snapshot), the requests
+        added and updated, and the ids of requests that are no longer
+        active. When since_frame is too old to answer from the kept
+        history, a full snapshot is returned with "full" set to True.
+        The client keeps "frame" and passes it on the next call.
+        """
+        changes = self.change_tracker.changes_since(since_frame)
+        if changes is None:
+            drivers = self.drivers
+            added = self._active_requests()
+            updated: List[Request] = []
+            removed: List[int] = []
+        else:
+            driver_ids, added_ids, updated_ids, removed_ids = changes
+            if since_frame < self.time:
+                # Drivers on a trip moved without reporting it
+                driver_ids = driver_ids | {d.did for d in self.trip_schedule.moving()}
+            drivers = [self._drivers_by_id[i] for i in sorted(driver_ids) if i in self._drivers_by_id]
+            added = [self._requests_by_id[i] for i in sorted(added_ids)]
+            updated = [self._requests_by_id[i] for i in sorted(updated_ids)]
+            removed = sorted(removed_ids)
+
+        return {
+            "frame": self.time,
+            "full": changes is None,
+            "time": self.time,
+            "served": self.served_count,
+            "expired": self.expired_count,
+            "avg_wait": self._avg_wait(),
+            "drivers": [self._driver_view(d) for d in drivers],
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+        }
+
+    @staticmethod
+    def _driver_view(d: Driver) -> Dict:
+        """
+        Return one driver in GUI-friendly format.
+        """
+        return {
+            "id": d.did,
+            "x": d.position.x,
+            "y": d.position.y,
+            "status": d.status,
+            "earnings": d.total_earnings,
+        }
+
+    def get_array_snapshot(self) -> Dict:
+        """
+        Return current state as NumPy arrays for fast GUI plotting.
+
+        The driver and active-request arrays are views into buffers
+        that are reused and overwritten on the next call, so no dict
+        is built per driver or per request.
+        """
+        if self._array_snapshot is None:
+            from .array_snapshot import ArraySnapshot
+            self._array_snapshot = ArraySnapshot()
+        arrays = self._array_snapshot.update(self.drivers, self._active_requests())
+        arrays.update(
+            time=self.time,
+            served=self.served_count,
+            expired=self.expired_count,
+            avg_wait=self._avg_wait(),
+        )
+        return arrays
+
     def _active_requests(self) -> List[Request]:
         """
         Return requests that are not finished.
@@ -152,12 +446,15 @@ class DeliverySimulation:
         so they can return to IDLE and pick up new requests.
 
         --- DOCTEST ---
+        >>> from phase2.status import WAITING, EXPIRED
         >>> class R:
-        ...     def __init__(self, t, status="WAITING"):
+        ...     def __init__(self, t, status=WAITING):
         ...         self.creation_time = t
-        ...         self.status = status
+        ...         self.status_code = status
+        ...         self.assigned_driver_id = 0
+        ...         self.rid = 1
         ...     def is_active(self): return True
-        ...     def mark_expired(self, t): self.status = "EXPIRED"
+        ...     def mark_expired(self, t): self.status_code = EXPIRED
         >>> sim = DeliverySimulation.__new__(DeliverySimulation)
         >>> sim.time = 10
         >>> sim.timeout = 3
@@ -165,42 +462,58 @@ class DeliverySimulation:
         >>> r = R(0)
         >>> sim.requests = [r]
         >>> sim._expire_old_requests()
-        >>> r.status
+        >>> r.status_code.name
         'EXPIRED'
         """
         for r in self._active_requests():
-            if self.time - r.creation_time > self.timeout and r.status != "PICKED":
+            if self.time - r.creation_time > self.timeout and r.status_code != PICKED:
                 r.mark_expired(self.time)
                 self.expired_count += 1
                 
                 # Release any driver assigned to this expired request
+                released = 0
                 if r.assigned_driver_id > 0:
                     for driver in self.drivers:
                         if driver.did == r.assigned_driver_id and driver.current_request == r:
                             driver.release_expired_request(self.time)
+                            released = driver.did
                             break
 
+                if self.event_log is not None:
+                    self.event_log.expired(self.time, r.rid, released)
+
     def _filter_acceptances(self, offers: List[Offer]) -> List[Offer]:
         """
         Keep only offers accepted by drivers.
 
+        Offers the driver already rejected, with the same decision inputs,
+        are dropped without asking the behaviour again (see RejectionMemo).
+
         --- DOCTEST ---
         >>> class B:
         ...     def decide(self, d, o, t): return True
         >>> class D:
-        ...     def __init__(self): self.behaviour = B()
+        ...     def __init__(self): self.did, self.behaviour = 1, B()
         >>> class O:
-        ...     def __init__(self): self.driver = D()
+        ...     def __init__(self): self.driver, self.request = D(), object()
         >>> sim = DeliverySimulation.__new__(DeliverySimulation)
         >>> sim.time = 0
+        >>> sim.rejection_memo = RejectionMemo()
         >>> len(sim._filter_acceptances([O(), O()]))
         2
         """
+        memo = self.rejection_memo
         accepted = []
         for offer in offers:
             driver = offer.driver
+            if memo.is_rejected(driver, offer.request):
+                continue
             if driver.behaviour.decide(driver, offer, self.time):
                 accepted.append(offer)
+                if self.event_log is not None:
+                    self.event_log.accepted(self.time, driver.did, offer.request.rid)
+            else:
+                memo.add(driver, offer.request)
         return accepted
 
     def _resolve_conflicts(self, accepted: List[Offer]) -> List[Offer]:
@@ -232,71 +545,120 @@ class DeliverySimulation:
     def _apply_assignments(self, assignments: List[Offer]) -> None:
         """
         Assign drivers to requests.
-        """
-        for offer in assignments:
-            driver = offer.driver
-            req = offer.request
 
-            if driver.status != "IDLE" or req.status != "WAITING":
-                continue
+        The offers were already accepted in _filter_acceptances, so the
+        assignment is committed without asking the behaviour again.
 
-            driver.assign_request(req, self.time)
-            req.mark_assigned(driver.did)
+        --- DOCTEST ---
+        >>> class R:
+        ...     def __init__(self): self.status = "WAITING"
+        >>> class D:
+        ...     def __init__(self): self.calls = 0
+        ...     def commit_assignment(self, r, t):
+        ...         self.calls += 1
+        ...         r.status = "ASSIGNED"
+        ...         return True
+        >>> class O:
+        ...     def __init__(self, d, r): self.driver, self.request = d, r
+        >>> sim = DeliverySimulation.__new__(DeliverySimulation)
+        >>> sim.time = 0
+        >>> d = D()
+        >>> sim._apply_assignments([O(d, R()), O(d, R())])
+        >>> d.calls
+        2
+        """
+        for offer in assignments:
+            if offer.driver.commit_assignment(offer.request, self.time) and self.event_log is not None:
+                self.event_log.assigned(self.time, offer.driver.did, offer.request.rid)
 
-    def _move_drivers_and_handle_events(self) -> None:
+    def _move_drivers_and_handle_events(self, time: int) -> None:
         """
-        Move drivers and handle pickup/dropoff.
+        Move drivers through tick time and handle pickup/dropoff.
+
+        The trip schedule only returns the drivers whose arrival tick is
+        this tick; the other busy drivers are not touched.
         """
-        for d in self.drivers:
+        for d in self.trip_schedule.advance(time):
             req = d.current_request
             if req is None:
                 continue
 
-            before = req.status
-            d.step(tick=1)
+            before = req.status_code
+            if before <= ASSIGNED:
+                d.complete_pickup(time)
+                if self.event_log is not None and req.status_code == PICKED:
+                    self.event_log.picked(time, d.did, req.rid)
 
-            if before in ("WAITING", "ASSIGNED"):
-                d.complete_pickup(self.time)
-
-            elif before == "PICKED":
-                d.complete_dropoff(self.time)
+            elif before == PICKED:
+                d.complete_dropoff(time)
 
                 # Only update stats and clear request if dropoff was actually completed
-                if d.status == "IDLE":
+                if d.status_code == IDLE:
                     self.served_count += 1
-                    self.wait_times.append(self.time - req.creation_time)
+                    self.wait_times.append(time - req.creation_time)
 
-                    d.total_earnings += self._compute_earnings(req)
+                    earnings = self._compute_earnings(req)
+                    d.total_earnings += earnings
                     d.current_request = None
+                    if self.event_log is not None:
+                        self.event_log.delivered(time, d.did, req.rid, earnings)
 
     def _apply_mutations(self) -> None:
         """
         Possibly change driver behaviour.
+
+        Only the drivers the mutation scheduler says are due are passed to
+        the rule (all at once, see MutationRule.maybe_mutate_all); the rule
+        would leave the others unchanged.
         """
-        for d in self.drivers:
-            self.mutation_rule.maybe_mutate(d, self.time)
+        rule = self.mutation_rule
+        scheduler = self.mutation_scheduler
+        if scheduler.rule is not rule:
+            # The rule was replaced (e.g. by a Branch): check everybody now
+            scheduler.reset(rule, self.drivers, self.time - 1)
+        due = scheduler.due(self.time, self.drivers)
+        if not due:
+            return
+        log = self.event_log
+        if log is not None:
+            before = [(d.behaviour, d.behaviour_mutation_stamp) for d in due]
+        mutate_all = getattr(rule, "maybe_mutate_all", None)
+        if mutate_all is not None:
+            mutate_all(due, self.time)
+        else:
+            for d in due:
+                rule.maybe_mutate(d, self.time)
+        if log is not None:
+            for d, (behaviour, stamp) in zip(due, before):
+                if d.behaviour is not behaviour or d.behaviour_mutation_stamp != stamp:
+                    log.mutation(self.time, d.did, d.behaviour)
+        for d in due:
+            scheduler.checked(d, self.time)
 
     def _compute_earnings(self, req: Request) -> float:
         """
         Compute reward for a delivered request.
 
+        Uses the trip length (and the base fare when the fees are the
+        defaults) precomputed on the request.
+
         --- DOCTEST ---
-        >>> class P:
-        ...     def __init__(self, x, y): self.x, self.y = x, y
-        ...     def distance_to(self, o):
-        ...         return ((self.x-o.x)**2 + (self.y-o.y)**2) ** 0.5
         >>> class R:
         ...     def __init__(self):
-        ...         self.pickup = P(0, 0)
-        ...         self.dropoff = P(3, 4)
+        ...         self.trip_length = 5.0
+        ...         self.base_fare = 15.0
         >>> sim = DeliverySimulation.__new__(DeliverySimulation)
         >>> sim.base_fee = 10.0
         >>> sim.distance_fee = 2.0
         >>> sim._compute_earnings(R())
         20.0
+        >>> sim.distance_fee = 1.0
+        >>> sim._compute_earnings(R())
+        15.0
         """
-        distance = req.pickup.distance_to(req.dropoff)
-        return self.base_fee + self.distance_fee * distance
+        if self.base_fee == Request.BASE_FEE and self.distance_fee == Request.DISTANCE_FEE:
+            return req.base_fare
+        return self.base_fee + self.distance_fee * req.trip_length
 
     def _avg_wait(self) -> float:
         """
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Dict, List, TYPE_CHECKING
+
+from .status import IDLE, WAITING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+class DispatchIndex:
+    """
+    Idle drivers and waiting requests, kept up to date on status changes.
+
+    The dispatch policies only look at IDLE drivers and WAITING requests.
+    Instead of filtering all drivers and all active requests every tick,
+    the simulation keeps both sets here: drivers report themselves when
+    they are assigned, deliver or lose an expired request, and requests
+    when they are marked. Only the drivers and requests whose status
+    changed are touched.
+
+    Every driver and request gets an order key when it is added, so the
+    lists come out in the order of sim.drivers and sim.requests, exactly
+    like filtering those lists would give. This keeps runs deterministic.
+
+    --- DOCTEST ---
+    >>> from phase2.status import TO_PICKUP, EXPIRED
+    >>> class D:
+    ...     def __init__(self, did): self.did, self.status_code = did, IDLE
+    >>> class R:
+    ...     def __init__(self, rid): self.rid, self.status_code = rid, WAITING
+    >>> index = DispatchIndex()
+    >>> d1, d2 = D(1), D(2)
+    >>> index.add_driver(d1)
+    >>> index.add_driver(d2)
+    >>> d1.status_code = TO_PICKUP
+    >>> index.driver_changed(d1)
+    >>> [d.did for d in index.idle_drivers()]
+    [2]
+    >>> d1.status_code = IDLE
+    >>> index.driver_changed(d1)
+    >>> [d.did for d in index.idle_drivers()]
+    [1, 2]
+    >>> r = R(7)
+    >>> index.add_request(r)
+    >>> r.status_code = EXPIRED
+    >>> index.request_changed(r)
+    >>> index.waiting_requests()
+    []
+    """
+
+    def __init__(self) -> None:
+        self._driver_order: Dict[int, int] = {}
+        self._request_order: Dict[int, int] = {}
+        self._next_order = 0
+        self._idle: Dict[int, "Driver"] = {}
+        self._waiting: Dict[int, "Request"] = {}
+
+    def add_driver(self, driver: "Driver") -> None:
+        """
+        Start tracking a driver (after the drivers already added).
+        """
+        self._driver_order[id(driver)] = self._next_order
+        self._next_order += 1
+        self.driver_changed(driver)
+
+    def remove_driver(self, driver: "Driver") -> None:
+        order = self._driver_order.pop(id(driver), None)
+        if order is not None:
+            self._idle.pop(order, None)
+
+    def add_request(self, request: "Request") -> None:
+        """
+        Start tracking a request (after the requests already added).
+        """
+        self._request_order[id(request)] = self._next_order
+        self._next_order += 1
+        self.request_changed(request)
+
+    def driver_changed(self, driver: "Driver") -> None:
+        order = self._driver_order.get(id(driver))
+        if order is None:
+            return
+        if driver.status_code == IDLE:
+            self._idle[order] = driver
+        else:
+            self._idle.pop(order, None)
+
+    def request_changed(self, request: "Request") -> None:
+        order = self._request_order.get(id(request))
+        if order is None:
+            return
+        if request.status_code == WAITING:
+            self._waiting[order] = request
+        else:
+            # A request never waits again, so it is not needed any more
+            self._waiting.pop(order, None)
+            del self._request_order[id(request)]
+
+    def idle_drivers(self) -> List["Driver"]:
+        """
+        Return the IDLE drivers in the order they were added.
+        """
+        idle = self._idle
+        return [idle[order] for order in sorted(idle)]
+
+    def waiting_requests(self) -> List["Request"]:
+        """
+        Return the WAITING requests in the order they were added.
+        """
+        waiting = self._waiting
+        return [waiting[order] for order in sorted(waiting)]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
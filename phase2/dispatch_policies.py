@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import logging
+import math
+import time as _time
 from abc import ABC, abstractmethod
-from typing import List, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 from .offer import Offer
+from .spatial_index import DriverGrid
+from .status import IDLE, WAITING
 
 if TYPE_CHECKING:
     from .driver import Driver
     from .request import Request
 
+_LOG = logging.getLogger(__name__)
+
 
 class DispatchPolicy(ABC):
     """
@@ -16,8 +23,42 @@ class DispatchPolicy(ABC):
 
     A dispatch policy proposes offers to drivers.
     It must not change drivers or requests directly.
+
+    The simulation passes only the IDLE drivers and the WAITING requests
+    (from its DispatchIndex), in the order of sim.drivers and sim.requests.
+    The policies below still skip other statuses, so they can also be
+    called with full lists.
+
+    The policies below also skip drivers that cannot accept a request:
+    pickups beyond the acceptance radius of the driver's behaviour (see
+    DriverBehaviour.acceptance_radius) would be declined anyway, so
+    leaving them out does not change the outcome. With a timeout, a
+    driver that cannot reach the pickup before the request expires is
+    skipped as well. A request created at c is still waiting at tick
+    c + timeout, so a driver moving speed per tick from the current
+    tick reaches at most speed * (c + timeout - time + 1). This one does
+    change the outcome, because such a driver would otherwise accept
+    and be released when the request expires. The candidates are found
+    with range queries on a DriverGrid instead of looking at every idle
+    driver.
     """
 
+    # Below this many idle drivers a plain loop is faster than a grid
+    GRID_MIN_DRIVERS = 32
+
+    # Class default, so policies restored from older checkpoints have it too
+    timeout: Optional[int] = None
+
+    def __init__(self, timeout: Optional[int] = None):
+        """
+        Parameters
+        ----------
+        timeout : int
+            The request timeout of the simulation; None disables the
+            reachability bound.
+        """
+        self.timeout = timeout
+
     @abstractmethod
     def assign(
         self,
@@ -30,6 +71,69 @@ class DispatchPolicy(ABC):
         """
         raise NotImplementedError
 
+    def prepare(self, drivers: List["Driver"], time: int) -> Any:
+        """
+        Return what assign_prepared needs to know about the drivers.
+
+        A caller that dispatches the requests of one tick in several
+        calls (AnytimePolicy) prepares once and calls assign_prepared
+        per batch, so the work that only depends on the drivers is not
+        redone for every batch. The default just keeps the drivers.
+        """
+        return drivers
+
+    def assign_prepared(self, prepared: Any, requests: List["Request"], time: int) -> List[Offer]:
+        """
+        Return the offers for requests, given the result of prepare.
+        """
+        return self.assign(prepared, requests, time)
+
+    def _limits(self, idle: List["Driver"]) -> List[float]:
+        """
+        Return the acceptance radius of each idle driver.
+        """
+        limits = []
+        for d in idle:
+            behaviour = getattr(d, "behaviour", None)
+            if behaviour is None:
+                limits.append(math.inf)
+            else:
+                limits.append(behaviour.acceptance_radius(d))
+        return limits
+
+    def _reach(self, speed: float, request: "Request", time: int) -> float:
+        """
+        Return how far a driver with speed gets before the request expires.
+        """
+        if self.timeout is None:
+            return math.inf
+        ticks = request.creation_time + self.timeout - time + 1
+        # Slightly larger, so rounding in the movement never prunes a reachable pickup
+        return max(speed, 0.0) * ticks * (1 + 1e-9)
+
+
+class _IdleDrivers:
+    """
+    The idle drivers of a tick with their acceptance radii and (when
+    there are enough of them for it to pay off) a grid, built on first use.
+
+    unbounded holds the indices of the drivers without a finite radius
+    and finite_limit the largest finite radius (0 if there is none).
+    """
+
+    def __init__(self, policy: DispatchPolicy, drivers: List["Driver"]) -> None:
+        self.drivers = [d for d in drivers if getattr(d, "status_code", None) == IDLE]
+        self.limits = policy._limits(self.drivers)
+        self.unbounded = [i for i, limit in enumerate(self.limits) if math.isinf(limit)]
+        self.finite_limit = max((limit for limit in self.limits if not math.isinf(limit)), default=0.0)
+        self.use_grid = len(self.drivers) >= policy.GRID_MIN_DRIVERS
+        self._grid: Optional[DriverGrid] = None
+
+    def grid(self) -> Optional[DriverGrid]:
+        if self._grid is None and self.use_grid:
+            self._grid = DriverGrid(self.drivers)
+        return self._grid
+
 
 class NearestNeighborPolicy(DispatchPolicy):
     """
@@ -38,7 +142,7 @@ class NearestNeighborPolicy(DispatchPolicy):
     Each request is offered to the k nearest idle drivers.
     """
 
-    def __init__(self, k: int = 3):
+    def __init__(self, k: int = 3, timeout: Optional[int] = None):
         """
         Create a nearest-neighbor policy.
 
@@ -46,7 +150,10 @@ class NearestNeighborPolicy(DispatchPolicy):
         ----------
         k : int
             Number of drivers to offer each request to.
+        timeout : int
+            See DispatchPolicy.
         """
+        super().__init__(timeout)
         self.k = max(1, int(k))
 
     def assign(
@@ -68,30 +175,52 @@ class NearestNeighborPolicy(DispatchPolicy):
         ...         self.did = i
         ...         self.position = P(0, 0)
         ...         self.speed = 1.0
-        ...         self.status = "IDLE"
+        ...         self.status_code = IDLE
+        ...     def distance_to_pickup(self, r):
+        ...         return self.position.distance_to(r.pickup)
         >>> class R:
         ...     def __init__(self):
         ...         self.pickup = P(1, 0)
-        ...         self.status = "WAITING"
+        ...         self.status_code = WAITING
         >>> policy = NearestNeighborPolicy(k=1)
         >>> offers = policy.assign([D(1)], [R()], 0)
         >>> len(offers)
         1
         """
-        idle = [d for d in drivers if getattr(d, "status", None) == "IDLE"]
-        waiting = [r for r in requests if getattr(r, "status", None) == "WAITING"]
+        if not any(getattr(r, "status_code", None) == WAITING for r in requests):
+            return []
+        return self.assign_prepared(self.prepare(drivers, time), requests, time)
+
+    def prepare(self, drivers: List["Driver"], time: int) -> _IdleDrivers:
+        return _IdleDrivers(self, drivers)
+
+    def assign_prepared(self, prepared: _IdleDrivers, requests: List["Request"], time: int) -> List[Offer]:
+        idle = prepared.drivers
+        waiting = [r for r in requests if getattr(r, "status_code", None) == WAITING]
 
         offers: List[Offer] = []
 
         if not idle or not waiting:
             return offers
 
+        limits = prepared.limits
+        grid = prepared.grid()
+
         for r in waiting:
-            dists = [(d.position.distance_to(r.pickup), d) for d in idle]
-            dists.sort(key=lambda t: t[0])
+            if grid is None:
+                dists = [(d.distance_to_pickup(r), i) for i, d in enumerate(idle)]
+                dists.sort(key=lambda t: t[0])
+                nearest = [i for _, i in dists[: self.k]]
+            else:
+                nearest = grid.nearest(r.pickup, self.k, lambda i: idle[i].distance_to_pickup(r))
 
-            for dist, d in dists[: self.k]:
-                travel_time = dist / max(getattr(d, "speed", 1e-9), 1e-9)
+            for i in nearest:
+                d = idle[i]
+                dist = d.distance_to_pickup(r)
+                speed = getattr(d, "speed", 1e-9)
+                if dist > limits[i] or dist > self._reach(speed, r, time):
+                    continue
+                travel_time = dist / max(speed, 1e-9)
                 offers.append(
                     Offer(
                         driver=d,
@@ -130,29 +259,65 @@ class GlobalGreedyPolicy(DispatchPolicy):
         ...         self.did = 1
         ...         self.position = P(0, 0)
         ...         self.speed = 1.0
-        ...         self.status = "IDLE"
+        ...         self.status_code = IDLE
+        ...     def distance_to_pickup(self, r):
+        ...         return self.position.distance_to(r.pickup)
         >>> class R:
         ...     def __init__(self):
         ...         self.pickup = P(2, 0)
-        ...         self.status = "WAITING"
+        ...         self.status_code = WAITING
         >>> policy = GlobalGreedyPolicy()
         >>> offers = policy.assign([D()], [R()], 0)
         >>> len(offers)
         1
         """
-        idle = [d for d in drivers if getattr(d, "status", None) == "IDLE"]
-        waiting = [r for r in requests if getattr(r, "status", None) == "WAITING"]
+        if not any(getattr(r, "status_code", None) == WAITING for r in requests):
+            return []
+        return self.assign_prepared(self.prepare(drivers, time), requests, time)
 
-        pairs = []
-        for d in idle:
-            for r in waiting:
-                dist = d.position.distance_to(r.pickup)
-                pairs.append((dist, d, r))
+    def prepare(self, drivers: List["Driver"], time: int) -> _IdleDrivers:
+        return _IdleDrivers(self, drivers)
 
-        pairs.sort(key=lambda t: t[0])
+    def assign_prepared(self, prepared: _IdleDrivers, requests: List["Request"], time: int) -> List[Offer]:
+        idle = prepared.drivers
+        waiting = [r for r in requests if getattr(r, "status_code", None) == WAITING]
 
         offers: List[Offer] = []
-        for dist, d, r in pairs:
+        if not idle or not waiting:
+            return offers
+
+        limits = prepared.limits
+        max_limit = max(limits)
+        unbounded = prepared.unbounded
+        max_speed = max(getattr(d, "speed", 1e-9) for d in idle)
+        # Without a timeout there is nothing to prune if no driver has a finite radius
+        grid = prepared.grid() if self.timeout is not None or len(unbounded) < len(idle) else None
+        everyone = range(len(idle))
+
+        # (distance, driver index, request index) orders the pairs like a
+        # stable sort by distance of the full driver x request loop
+        pairs = []
+        for j, r in enumerate(waiting):
+            reach = self._reach(max_speed, r, time)
+            if grid is None:
+                candidates = everyone
+            elif not math.isinf(reach) or not unbounded:
+                candidates = grid.within(r.pickup, min(max_limit, reach))
+            else:
+                # Query with the largest finite radius, then add the drivers
+                # without one (Naive, fast EarningsMax) in index order
+                near = grid.within(r.pickup, prepared.finite_limit)
+                candidates = sorted(set(near).union(unbounded))
+            for i in candidates:
+                d = idle[i]
+                dist = d.distance_to_pickup(r)
+                if dist > limits[i] or dist > self._reach(getattr(d, "speed", 1e-9), r, time):
+                    continue
+                pairs.append((dist, i, j, d, r))
+
+        pairs.sort(key=lambda t: (t[0], t[1], t[2]))
+
+        for dist, _, _, d, r in pairs:
             travel_time = dist / max(getattr(d, "speed", 1e-9), 1e-9)
             offers.append(
                 Offer(
@@ -166,6 +331,147 @@ class GlobalGreedyPolicy(DispatchPolicy):
         return offers
 
 
+class AnytimePolicy(DispatchPolicy):
+    """
+    Run another policy within a wall-clock budget per tick.
+
+    For live GUI runs, where a slow assign on a backlog of waiting
+    requests would drop frames. The waiting requests are handed to the
+    wrapped policy in batches, in priority order: first the requests the
+    previous tick did not reach, then the oldest first (all requests
+    have the same timeout, so the oldest is the nearest to expiry).
+    After each batch the time is checked. When the budget is used up the
+    offers made so far are returned, and the requests not reached are
+    carried to the next tick. At least one batch is done per tick, so
+    dispatch always makes progress.
+
+    The work on the drivers is done once per tick (see
+    DispatchPolicy.prepare). The batches are sized from the measured
+    time per request to use the rest of the budget (at most twice the
+    previous batch, so a slow batch does not overshoot the budget by
+    much); the first batch of a tick is sized from the time per request
+    of the previous tick.
+
+    The offers of different batches are not ranked against each other
+    (a GlobalGreedyPolicy inside ranks the pairs of one batch), and what
+    fits in the budget depends on the machine, so runs with a budget
+    are not reproducible. Use it for live runs, not for experiments.
+
+    Overruns (ticks where dispatch took longer than the budget) are
+    counted, see stats(), and logged at DEBUG level.
+
+    --- DOCTEST ---
+    >>> class Inner(DispatchPolicy):
+    ...     def assign(self, drivers, requests, time):
+    ...         return [r.rid for r in requests]
+    >>> class R:
+    ...     def __init__(self, rid, t): self.rid, self.creation_time, self.status_code = rid, t, WAITING
+    >>> policy = AnytimePolicy(Inner(), budget=0.0, batch=2)
+    >>> requests = [R(3, 5), R(1, 2), R(2, 2), R(4, 6)]
+    >>> policy.assign(["driver"], requests, 7)
+    [1, 2]
+    >>> policy.deferred
+    2
+    >>> policy.assign(["driver"], requests, 8)
+    [3]
+    >>> stats = policy.stats()
+    >>> stats["ticks"], stats["overruns"], stats["deferred"]
+    (2, 2, 3)
+    >>> AnytimePolicy(Inner(), budget=1.0).assign(["driver"], requests, 9)
+    [1, 2, 3, 4]
+    """
+
+    # Wall clock used for the budget
+    clock = staticmethod(_time.perf_counter)
+
+    def __init__(self, policy: DispatchPolicy, budget: float = 0.005, batch: int = 8):
+        """
+        Parameters
+        ----------
+        policy : DispatchPolicy
+            The policy that makes the offers.
+        budget : float
+            Seconds of dispatch per tick.
+        batch : int
+            Requests in the first batch, until the time per request is known.
+        """
+        super().__init__(policy.timeout)
+        self.policy = policy
+        self.budget = budget
+        self.batch = max(1, int(batch))
+        # Ids of the requests the last tick did not reach
+        self._carried: List[int] = []
+        # Seconds per request measured in the last tick (0 = not known)
+        self._per_request = 0.0
+
+        self.ticks = 0
+        self.overruns = 0
+        self.last_elapsed = 0.0
+        self.max_elapsed = 0.0
+        self.deferred = 0
+
+    def assign(
+        self,
+        drivers: List["Driver"],
+        requests: List["Request"],
+        time: int,
+    ) -> List[Offer]:
+        """
+        Return the offers the wrapped policy makes within the budget.
+        """
+        start = self.clock()
+        waiting = [r for r in requests if getattr(r, "status_code", None) == WAITING]
+        if not drivers or not waiting:
+            return []
+
+        carried = set(self._carried)
+        waiting.sort(key=lambda r: (r.rid not in carried, r.creation_time, r.rid))
+
+        prepared = self.policy.prepare(drivers, time)
+        offers: List[Offer] = []
+        done = 0
+        size = self.batch
+        if self._per_request > 0:
+            size = max(1, int(self.budget / self._per_request))
+        while True:
+            offers.extend(self.policy.assign_prepared(prepared, waiting[done:done + size], time))
+            done += size
+            elapsed = self.clock() - start
+            left = self.budget - elapsed
+            if done >= len(waiting) or left <= 0:
+                break
+            per_request = elapsed / done
+            size = max(1, min(2 * size, int(left / per_request) if per_request > 0 else 2 * size))
+
+        done = min(done, len(waiting))
+        self._per_request = elapsed / done
+        self._carried = [r.rid for r in waiting[done:]]
+        self.deferred = len(self._carried)
+        self.ticks += 1
+        self.last_elapsed = elapsed
+        self.max_elapsed = max(self.max_elapsed, elapsed)
+        if elapsed > self.budget:
+            self.overruns += 1
+            _LOG.debug(
+                "Dispatch at tick %d took %.2f ms, budget %.2f ms (%d requests carried)",
+                time, elapsed * 1e3, self.budget * 1e3, self.deferred,
+            )
+        return offers
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the instrumentation counters as a dict.
+        """
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "last_elapsed": self.last_elapsed,
+            "max_elapsed": self.max_elapsed,
+            "deferred": self.deferred,
+            "budget": self.budget,
+        }
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
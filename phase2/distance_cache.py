@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+class DistanceCache:
+    """
+    Tick-scoped memo of driver -> pickup distances.
+
+    Within one tick the same distance is needed by the dispatch policy,
+    by the behaviour deciding on the offer and again when the driver is
+    assigned. The first stage that asks computes the distance and the
+    later stages reuse it. The simulation clears the cache at the end of
+    every tick, because drivers move and the distances change.
+
+    The hits and misses counters are kept across ticks so the removed
+    redundancy can be seen.
+
+    --- DOCTEST ---
+    >>> class P:
+    ...     def __init__(self, x, y): self.x, self.y = x, y
+    ...     def distance_to(self, o):
+    ...         return ((self.x-o.x)**2 + (self.y-o.y)**2) ** 0.5
+    >>> class D:
+    ...     def __init__(self): self.did, self.position = 1, P(0, 0)
+    >>> class R:
+    ...     def __init__(self): self.rid, self.pickup = 7, P(3, 4)
+    >>> cache = DistanceCache()
+    >>> d, r = D(), R()
+    >>> cache.distance(d, r), cache.distance(d, r)
+    (5.0, 5.0)
+    >>> cache.hits, cache.misses
+    (1, 1)
+    >>> cache.clear()
+    >>> len(cache)
+    0
+    """
+
+    def __init__(self) -> None:
+        self._distances: Dict[Tuple[int, int], float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def distance(self, driver: "Driver", request: "Request") -> float:
+        """
+        Return the distance from the driver to the pickup of the request.
+        """
+        key = (driver.did, request.rid)
+        dist = self._distances.get(key)
+        if dist is None:
+            self.misses += 1
+            dist = driver.position.distance_to(request.pickup)
+            self._distances[key] = dist
+        else:
+            self.hits += 1
+        return dist
+
+    def clear(self) -> None:
+        """
+        Forget all distances (called at the end of every tick).
+        """
+        self._distances.clear()
+
+    def hit_rate(self) -> float:
+        """
+        Return the share of lookups answered from the cache.
+        """
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def __len__(self) -> int:
+        return len(self._distances)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -6,6 +6,24 @@ from .driver_behaviour import DriverBehaviour
 from .request import Request
 from .point import Point
 from .offer import Offer
+from .distance_cache import DistanceCache
+from .change_tracker import ChangeTracker
+from .dispatch_index import DispatchIndex
+from .mutation_scheduler import MutationScheduler
+from .trips import Trip, TripSchedule
+from .status import (
+    DRIVER_STATUS_NAMES,
+    DRIVER_TRANSITIONS,
+    EXPIRED,
+    IDLE,
+    TO_DROPOFF,
+    TO_PICKUP,
+    WAITING,
+    DriverStatus,
+    check_transition,
+    driver_status,
+    is_driver_status,
+)
 
 class HistoryEvent:
     """This dataclass are to define a history event structure that easy can be 
@@ -56,6 +74,8 @@ class Driver:
     def __init__(self, did: int, position: Point, speed: float, status: str, current_request: Request | None, behaviour: DriverBehaviour):
         if self.is_valid(did, position, speed, status, behaviour, current_request):
             self.did = did
+            self.trip: Trip | None = None
+            self.trip_schedule: TripSchedule | None = None
             self.position = position
             self.speed = speed
             self.status = status
@@ -66,6 +86,10 @@ class Driver:
             self.idle_time = 0
             self.idle_stattime = 0
             self.behaviour_mutation_stamp: int = 0
+            self.distance_cache: DistanceCache | None = None
+            self.change_tracker: ChangeTracker | None = None
+            self.dispatch_index: DispatchIndex | None = None
+            self.mutation_scheduler: MutationScheduler | None = None
         else:
             raise ValueError("invalid valie for one of the driver attributes values")
     
@@ -80,7 +104,7 @@ class Driver:
             return False
         if not isinstance(position, Point):
             return False
-        if status not in ("IDLE", "TO_PICKUP", "TO_DROPOFF"):
+        if not is_driver_status(status):
             return False
         if behaviour is not None and not isinstance(behaviour, DriverBehaviour):
             return False
@@ -100,6 +124,8 @@ class Driver:
         bliver kaldt men den skal arbejde sammen med denne del.
         """
         self.history.append(HistoryEvent(timestamp, event, behaviour, request_id, earnings))    
+        if self.mutation_scheduler is not None:
+            self.mutation_scheduler.history_changed(self)
 
     # help for mutation rule classes
     def all_events_since_last_mutation(self):
@@ -120,6 +146,74 @@ class Driver:
     # help for mutation rule classes
     #def 
     
+    def distance_to_pickup(self, request: Request) -> float:
+        """This method returns the distance from the driver to the pickup of the 
+        request. When the driver is in a simulation the distance is looked up in the
+        tick cache of the simulation, so the dispatch policy, the behaviour and 
+        assign_request do not calculate the same distance more than one time per tick.
+        """
+        if self.distance_cache is None:
+            return self.position.distance_to(request.pickup)
+        return self.distance_cache.distance(self, request)
+
+    @property
+    def position(self) -> Point:
+        """The position of the driver. While the driver is on a trip in a simulation
+        it is not updated every tick, but computed from the trip when it is read 
+        (see phase2.trips). Setting it ends the trip."""
+        trip = self.trip
+        if trip is None:
+            return self._position
+        return trip.position(self.trip_schedule.tick)
+
+    @position.setter
+    def position(self, value: Point) -> None:
+        self._position = value
+        self.trip = None
+
+    def _depart(self) -> None:
+        """This method tells the trip schedule of the simulation (if there is one) 
+        that the driver have a new target, so it starts moving in the next tick.
+        """
+        if self.trip_schedule is not None:
+            self.trip_schedule.depart(self)
+
+    def _changed(self) -> None:
+        """This method tells the change tracker of the simulation (if there is one)
+        that the driver have moved or changed status, so the GUI can be sent only
+        the drivers that changed.
+        """
+        if self.change_tracker is not None:
+            self.change_tracker.driver_changed(self)
+
+    @property
+    def status(self) -> str:
+        """The name of the status code (status_code, a DriverStatus see phase2.status).
+        Setting it with a name or a code sets status_code without checking the 
+        transition."""
+        return DRIVER_STATUS_NAMES[self.status_code]
+
+    @status.setter
+    def status(self, value) -> None:
+        self.status_code = driver_status(value)
+
+    def _set_status(self, status: DriverStatus) -> None:
+        """This method changes the status code if the transition table allows the 
+        change and raises a ValueError otherwise. The callers tell the simulation 
+        with _status_changed() when the rest of the driver is updated.
+        """
+        check_transition(DRIVER_TRANSITIONS, self.status_code, status, "driver")
+        self.status_code = status
+
+    def _status_changed(self) -> None:
+        """This method is called when the status of the driver have changed. Besides
+        the change tracker it also tells the dispatch index of the simulation, so the
+        simulation knows witch drivers are idle without looking at all of them.
+        """
+        self._changed()
+        if self.dispatch_index is not None:
+            self.dispatch_index.driver_changed(self)
+
     def decide(self, offer: Offer, time: int) -> bool:
         return self.behaviour.decide(self, offer, time)
 
@@ -145,22 +239,41 @@ class Driver:
         First of all this method will first check that the request status is 
         "WAITING", else then the driver should not take the request. 
         """
-        if self.status != "IDLE":
+        if self.status_code != IDLE:
             return
-        if request.status == "WAITING":
+        if request.status_code == WAITING:
             # Create an Offer object for the behaviour.decide method
             offer = Offer(self, request, 0.0, 0.0)
             if self.behaviour.decide(self, offer, current_time):
-                request.mark_assigned(self.did)
-                self.current_request = request
-                self.status = "TO_PICKUP"
-                self.log_event(current_time, "ASSIGNED", request.rid)
-                self.idle_time = 0
-                self.idle_stattime = 0
+                self.commit_assignment(request, current_time)
             else: # ved ikke om det er here den skal decline??? 
                 self.idle_time = current_time - self.idle_stattime
             #self.idle_since = current_time
 
+    def commit_assignment(self, request: Request, current_time: int) -> bool:
+        """This method is for the simulation engine. The engine have alredy asked
+        the behaviour of the driver in the offer round, and the driver accepted the 
+        offer, so the behaviour is not asked again here. A second decide could give 
+        another answer for behaviours that have a state and it also doubles the 
+        number of decide calls.
+
+        The assignment is only done if the driver is "IDLE" and the request is 
+        "WAITING". Both the driver and the request is updated here, so the engine 
+        should not call request.mark_assigned() itself. It returns True if the 
+        assignment was done and False otherwise. 
+        """
+        if self.status_code != IDLE or request.status_code != WAITING:
+            return False
+        request.mark_assigned(self.did)
+        self.current_request = request
+        self._set_status(TO_PICKUP)
+        self.log_event(current_time, "ASSIGNED", self.behaviour, request.rid)
+        self.idle_time = 0
+        self.idle_stattime = 0
+        self._status_changed()
+        self._depart()
+        return True
+
     def target_point(self) -> Optional[Point]:
         """This method makes the driver class able to obtain a target point
         from the current request of the driver whit the working os the 
@@ -168,9 +281,9 @@ class Driver:
         """
         if self.current_request is None:
             return None # er ikke sikker på om denne skal være der eller det efter "and"
-        if self.status == "TO_PICKUP" and self.current_request:
+        if self.status_code == TO_PICKUP and self.current_request:
             return self.current_request.pickup
-        if self.status == "TO_DROPOFF" and self.current_request:
+        if self.status_code == TO_DROPOFF and self.current_request:
             return self.current_request.dropoff
         return None
 
@@ -211,6 +324,10 @@ class Driver:
         New position : ((x' = X + Nx * max_move), (y' = Y + Ny * max_move))
 
         Math about vectors read from: book : hardcore programming for mechanical engineers        
+
+        The simulation do not call this method. It moves its drivers with a trip 
+        schedule (see phase2.trips) that gives the same positions without stepping
+        every driver every tick.
         """
         target = self.target_point()
         if target is None:
@@ -222,6 +339,7 @@ class Driver:
 
         dist_from_driver_to_target = self.position.distance_to(target)
 
+        self._changed()
         if dist_from_driver_to_target <= max_move:
             self.position = Point(target.x, target.y)
             return 
@@ -255,14 +373,16 @@ class Driver:
             return None
         
         # Don't complete pickup if request has expired
-        if self.current_request.status == "EXPIRED":
+        if self.current_request.status_code == EXPIRED:
             return None
             
-        if self.status == "TO_PICKUP":
+        if self.status_code == TO_PICKUP:
             if math.isclose(self.position.x, self.current_request.pickup.x) and math.isclose(self.position.y, self.current_request.pickup.y):
                 self.current_request.mark_picked(time)
-                self.status = "TO_DROPOFF"
+                self._set_status(TO_DROPOFF)
                 self.log_event(time, "PICKED", self.behaviour, self.current_request.rid)
+                self._status_changed()
+                self._depart()
 
 
     def complete_dropoff(self, time: int) -> None: # ,earning
@@ -275,17 +395,18 @@ class Driver:
             return None
         
         # Don't complete dropoff if request has expired
-        if self.current_request.status == "EXPIRED":
+        if self.current_request.status_code == EXPIRED:
             return None
             
-        if self.status == "TO_DROPOFF":
+        if self.status_code == TO_DROPOFF:
             if math.isclose(self.position.x, self.current_request.dropoff.x) and math.isclose(self.position.y, self.current_request.dropoff.y):
                 self.current_request.mark_delivered(time)
                 self.log_event(time, "DELIVERED", self.behaviour, self.current_request.rid) # ,earning
                 #self.total_earnings += earning
                 self.current_request = None
-                self.status = "IDLE"
+                self._set_status(IDLE)
                 self.idle_stattime = time
+                self._status_changed()
 
     def release_expired_request(self, time: int) -> None:
         """Release current request when it expires and return driver to IDLE.
@@ -299,10 +420,13 @@ class Driver:
         # Log the expiration event in driver's history
         self.log_event(time, "expired", self.behaviour, self.current_request.rid)
         
-        # Release the request and return to idle
+        # Release the request and return to idle where the driver is now
+        if self.trip is not None:
+            self.position = self.position
         self.current_request = None
-        self.status = "IDLE"
+        self._set_status(IDLE)
         self.idle_stattime = time
+        self._status_changed()
 
 
     def __str__(self):
@@ -393,10 +517,7 @@ class Driver:
         if name == "speed":
             return isinstance(value, (int, float))
         if name == "status":
-            if value in ("IDLE", "TO_PICKUP", "TO_DROPOFF"):
-                return True
-            else:
-                return False
+            return is_driver_status(value)
         return False
 
 
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import math
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
@@ -9,6 +10,9 @@ if TYPE_CHECKING:
     
 from .offer import Offer
 
+# (class, args, kwargs) -> shared instance, see DriverBehaviour.shared
+_SHARED: dict = {}
+
 
 class DriverBehaviour(ABC):
     """This class is to set the ground for different driver beheveour and how it can
@@ -28,7 +32,40 @@ class DriverBehaviour(ABC):
 
     This is a abstrack class thtat have no methods but only defines the methods that
     class will support. The methods is implem,enteted in derived classes. 
+
+    decision_inputs is the names of the driver attributes that the desision depends
+    on (besides the request and the parameters of the behaviour). The simulation 
+    uses it to not ask a driver again about a request it rejected, as long as none
+    of the inputs have changed. None means that it is not known, so the driver is 
+    always asked. 
+
+    parameters is the names of the attributes set in __init__ that change how the 
+    behaviour decides. decide do not change them (or anything else on the 
+    behaviour), so one instance can be used by many drivers. The mutation rules 
+    use shared() to give drivers the same instance instead of making a new one 
+    at every mutation. The parameters of the driver are then the parameters of
+    its behaviour instance, and BatchSimulation reads them into arrays with one
+    entry per driver. 
     """
+    decision_inputs: tuple[str, ...] | None = None
+    parameters: tuple[str, ...] = ()
+
+    @classmethod
+    def shared(cls, *args, **kwargs) -> DriverBehaviour:
+        """Return the one instance of the class made with these arguments. Do not 
+        change its parameters, all the drivers with it would change.
+
+        >>> Naive.shared() is Naive.shared()
+        True
+        >>> LazyBehaviour.shared(close=3) is LazyBehaviour.shared()
+        False
+        """
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        instance = _SHARED.get(key)
+        if instance is None:
+            instance = _SHARED[key] = cls(*args, **kwargs)
+        return instance
+
     def decide(self, driver: Driver, offer: Offer, time: int) -> bool:
         """This will return True if the driver accepts the offer of the request, Flase
         otherwise.
@@ -37,6 +74,14 @@ class DriverBehaviour(ABC):
         """
         raise NotImplementedError
 
+    def acceptance_radius(self, driver: Driver) -> float:
+        """This method returns the largest distance to a pickup that the driver could
+        accept. It have to be conservative: a pickup further away than this is always
+        declined, so the dispatch policies do not offer it to the driver at all. 
+        The defoult is that there is no limit.
+        """
+        return math.inf
+
 class GreedyDistanceBehaviour(DriverBehaviour):
     """This subclass to the driverbehaviour class decribes the behaviour for accepting
     or declinging requests by the logic:
@@ -65,21 +110,43 @@ class GreedyDistanceBehaviour(DriverBehaviour):
     and use the calculation for the validation of accept or not accept. 
 
     """
+    decision_inputs = ("position", "speed")
+    parameters = ("max_distance", "expiretime")
+
     def __init__(self, expiretime: int = 20, max_distance: float = 0.0):
         self.max_distance = max_distance
         self.expiretime = expiretime
 
-    def decide(self, driver: Driver, offer: Offer, time: int) -> bool:
+    def _max_distance(self, driver: Driver) -> float:
+        """max_distance 0 means that it is found from the speed of the driver. It is
+        not saved on the behaviour, so drivers with other speeds can share it.
+
+        >>> b = GreedyDistanceBehaviour(expiretime=20)
+        >>> b._max_distance(type("D", (), {"speed": 1.5})()), b._max_distance(type("D", (), {"speed": 2})())
+        (30.0, 40)
+        """
         if self.max_distance == 0:
-            self.max_distance = driver.speed * self.expiretime
+            return driver.speed * self.expiretime
+        return self.max_distance
 
-        max_distance_to_pickup = self.max_distance / 3
-        pick_dist = driver.position.distance_to(offer.request.pickup)
-        drop_dist = offer.request.pickup.distance_to(offer.request.dropoff)
+    def decide(self, driver: Driver, offer: Offer, time: int) -> bool:
+        max_distance = self._max_distance(driver)
+        max_distance_to_pickup = max_distance / 3
+        pick_dist = driver.distance_to_pickup(offer.request)
+        drop_dist = offer.request.trip_length
 
-        if pick_dist <= max_distance_to_pickup and drop_dist <= self.max_distance:
+        if pick_dist <= max_distance_to_pickup and drop_dist <= max_distance:
             return True
         return False
+
+    def acceptance_radius(self, driver: Driver) -> float:
+        """The driver never accepts a pickup further away than a third of the max
+        distance.
+
+        >>> GreedyDistanceBehaviour(expiretime=20).acceptance_radius(type("D", (), {"speed": 1.5})())
+        10.0
+        """
+        return self._max_distance(driver) / 3
    
     
 
@@ -127,12 +194,15 @@ class EarningsMaxBehaviour(DriverBehaviour):
     - denne metode skulle jeg så have lavet en anden klasse eller method der beregner
     reference ratio så den kunne bruges her. 
     """
+    decision_inputs = ("position", "speed")
+    parameters = ("min_ratio",)
+
     def __init__(self, min_ratio: float = 0.3):
         self.min_ratio = min_ratio
         
     def decide(self, driver: Driver, offer: Offer, time: int) -> bool:
-        driver_to_pickup_dist = driver.position.distance_to(offer.request.pickup)
-        pickup_to_dropoff_dist = offer.request.pickup.distance_to(offer.request.dropoff)
+        driver_to_pickup_dist = driver.distance_to_pickup(offer.request)
+        pickup_to_dropoff_dist = offer.request.trip_length
         total_distance = driver_to_pickup_dist + pickup_to_dropoff_dist
         earning_distancde = total_distance - 5 
         expected_earning = 5 + (earning_distancde // 5)
@@ -143,6 +213,26 @@ class EarningsMaxBehaviour(DriverBehaviour):
         else: 
             return False
 
+    def acceptance_radius(self, driver: Driver) -> float:
+        """The expected earning is at most 4 + total_distance / 5, so the ratio is at
+        most speed * (4 / total_distance + 1 / 5). When speed / 5 is below min_ratio
+        the ratio is to low for all total distances above 4 / (min_ratio / speed - 1 / 5),
+        and the distance to the pickup is never longer than the total distance. 
+        Otherwise long trips pay enough and there is no limit. 
+
+        >>> round(EarningsMaxBehaviour(min_ratio=0.3).acceptance_radius(type("D", (), {"speed": 1.0})()), 6)
+        40.0
+        >>> EarningsMaxBehaviour(min_ratio=0.3).acceptance_radius(type("D", (), {"speed": 2.0})())
+        inf
+        """
+        if driver.speed <= 0:
+            return math.inf
+        excess = self.min_ratio / driver.speed - 1 / 5
+        if excess <= 0:
+            return math.inf
+        # Slightly larger, so rounding never prunes an offer decide would accept
+        return 4 / excess * (1 + 1e-9)
+
 
 class LazyBehaviour(DriverBehaviour):
     """"This subclass to the driverbehaviour class decribes the behaviour for accepting
@@ -152,6 +242,9 @@ class LazyBehaviour(DriverBehaviour):
 
     OBS: max_idle_time er nok lidt lav
     """
+    decision_inputs = ("position", "idle_time")
+    parameters = ("close", "max_idle_time")
+
     def __init__(self, close = 5, max_idle_time = 6):
         """This class have been given a defoult value for the distance for when a 
         driver consider the pickup pace to be close by and the defoult value of 
@@ -168,14 +261,20 @@ class LazyBehaviour(DriverBehaviour):
         behavior of the driver
         """
         idle_time = driver.idle_time
-        distance_to_pickup = driver.position.distance_to(offer.request.pickup)
+        distance_to_pickup = driver.distance_to_pickup(offer.request)
         if distance_to_pickup <= self.close and idle_time >= self.max_idle_time:
             return True
         else:
             return False
+
+    def acceptance_radius(self, driver: Driver) -> float:
+        """Pickups further away than close are never accepted."""
+        return self.close
         
 
 class Naive(DriverBehaviour):
     """This behavior accepts ALL!"""
+    decision_inputs = ()
+
     def decide(self, driver, offer, time):
         return True
\ No newline at end of file
@@ -0,0 +1,343 @@
+"""
+Append-only event log of a simulation run and replay from it.
+
+While a log is attached (DeliverySimulation.start_event_log), the engine
+records every arrival, accepted offer, assignment, pickup, dropoff,
+expiry and behaviour mutation with its tick. Each event is a small
+fixed-size binary record:
+
+    kind (uint8) | tick (uint32) | fields of the kind
+
+A mutation refers to the new behaviour by index. Each distinct behaviour
+(encoded like in a checkpoint) is written once, in a BEHAVIOUR record
+before its first use. A CHECKPOINT record marks the end of a tick for which
+a checkpoint file was written next to the log. The engine only packs
+the records; the records of one tick are handed to a writer thread as
+one block and written through a buffered file, so the simulation does
+not wait for the disk.
+
+The Replayer rebuilds the state at any logged tick: it loads the
+nearest checkpoint at or before that tick and applies the logged
+events after it. Dispatch and the driver behaviours are not run again,
+the outcome of every decision is taken from the log. Only the movement
+of the drivers (which is deterministic) is recomputed.
+"""
+
+from __future__ import annotations
+
+import marshal
+import queue
+import struct
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from . import checkpoint
+from .point import Point
+from .request import Request
+
+if TYPE_CHECKING:
+    from .delivery_simulation import DeliverySimulation
+
+
+# Event kinds
+ARRIVAL = 1
+ACCEPTED = 2
+ASSIGNED = 3
+PICKED = 4
+DELIVERED = 5
+EXPIRED = 6
+MUTATION = 7
+CHECKPOINT = 8
+END = 9
+BEHAVIOUR = 10
+
+_ARRIVAL = struct.Struct(">BIqdddd")    # rid, pickup x/y, dropoff x/y
+_PAIR = struct.Struct(">BIqq")          # did, rid (EXPIRED: rid, released did or 0)
+_DELIVERED = struct.Struct(">BIqqd")    # did, rid, earnings
+_MUTATION = struct.Struct(">BIqI")      # did, behaviour index
+_MARKER = struct.Struct(">BI")          # CHECKPOINT, END
+_BEHAVIOUR = struct.Struct(">BIII")     # behaviour index, length of the encoding that follows
+
+_RECORDS = {
+    ARRIVAL: _ARRIVAL,
+    ACCEPTED: _PAIR,
+    ASSIGNED: _PAIR,
+    PICKED: _PAIR,
+    DELIVERED: _DELIVERED,
+    EXPIRED: _PAIR,
+    MUTATION: _MUTATION,
+    CHECKPOINT: _MARKER,
+    END: _MARKER,
+    BEHAVIOUR: _BEHAVIOUR,
+}
+
+_BUFFER_SIZE = 1 << 20
+
+
+def checkpoint_path(log_path: str, tick: int) -> str:
+    """
+    Return the path of the checkpoint written with the log at tick.
+    """
+    return f"{log_path}.{tick}.dsck"
+
+
+class EventLog:
+    """
+    Writer side of the event log; created by DeliverySimulation.start_event_log.
+
+    The engine calls the record methods while a tick runs and end_tick()
+    when it is done. Records are collected in a list and the block is
+    passed to the writer thread at the end of the tick.
+
+    Parameters
+    ----------
+    path : str
+        File the events are written to (an existing file is replaced).
+    checkpoint_every : int
+        Write a checkpoint (see checkpoint_path) every N ticks, so the
+        Replayer does not have to start far from the tick it rebuilds.
+    """
+
+    def __init__(self, path: str, checkpoint_every: int = 1000) -> None:
+        if checkpoint_every <= 0:
+            raise ValueError("checkpoint_every must be positive")
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.error: Optional[BaseException] = None
+        self._records: List[bytes] = []
+        self._behaviours: Dict[bytes, int] = {}
+        self._queue: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+        self._file = open(path, "wb", buffering=_BUFFER_SIZE)
+        self._thread = threading.Thread(target=self._write_loop, name="event-log", daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------
+    # Records (called by the engine)
+    # --------------------------------------------------
+
+    def arrival(self, tick: int, request: Request) -> None:
+        self._records.append(_ARRIVAL.pack(
+            ARRIVAL, tick, request.rid,
+            request.pickup.x, request.pickup.y, request.dropoff.x, request.dropoff.y,
+        ))
+
+    def accepted(self, tick: int, did: int, rid: int) -> None:
+        self._records.append(_PAIR.pack(ACCEPTED, tick, did, rid))
+
+    def assigned(self, tick: int, did: int, rid: int) -> None:
+        self._records.append(_PAIR.pack(ASSIGNED, tick, did, rid))
+
+    def picked(self, tick: int, did: int, rid: int) -> None:
+        self._records.append(_PAIR.pack(PICKED, tick, did, rid))
+
+    def delivered(self, tick: int, did: int, rid: int, earnings: float) -> None:
+        self._records.append(_DELIVERED.pack(DELIVERED, tick, did, rid, earnings))
+
+    def expired(self, tick: int, rid: int, released_did: int = 0) -> None:
+        self._records.append(_PAIR.pack(EXPIRED, tick, rid, released_did))
+
+    def mutation(self, tick: int, did: int, behaviour: Any) -> None:
+        blob = marshal.dumps(checkpoint._encode_value(behaviour))
+        index = self._behaviours.get(blob)
+        if index is None:
+            index = self._behaviours[blob] = len(self._behaviours)
+            self._records.append(_BEHAVIOUR.pack(BEHAVIOUR, tick, index, len(blob)) + blob)
+        self._records.append(_MUTATION.pack(MUTATION, tick, did, index))
+
+    def end_tick(self, sim: "DeliverySimulation") -> None:
+        """
+        Hand the records of this tick to the writer thread.
+
+        Every checkpoint_every ticks a checkpoint is saved in the
+        background and a CHECKPOINT record is added after the tick.
+        """
+        if sim.time % self.checkpoint_every == 0:
+            self.mark_checkpoint(sim)
+        self._push()
+
+    def mark_checkpoint(self, sim: "DeliverySimulation") -> None:
+        sim.save_checkpoint(checkpoint_path(self.path, sim.time), background=True)
+        self._records.append(_MARKER.pack(CHECKPOINT, sim.time))
+
+    def _push(self) -> None:
+        if self._records:
+            self._queue.put(b"".join(self._records))
+            self._records = []
+
+    # --------------------------------------------------
+    # Writer thread
+    # --------------------------------------------------
+
+    def _write_loop(self) -> None:
+        while True:
+            block = self._queue.get()
+            if block is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self._file.write(block)
+            except BaseException as exc:  # reported by close()
+                self.error = exc
+
+    def close(self, tick: Optional[int] = None) -> None:
+        """
+        Write the remaining records, stop the writer thread and close the file.
+
+        tick is the last tick of the run; it is recorded so the Replayer
+        also covers the last ticks when they had no events. Raises the
+        error the writer thread ran into, if any.
+        """
+        if tick is not None:
+            self._records.append(_MARKER.pack(END, tick))
+        self._push()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+
+def read_events(data: bytes, offset: int = 0) -> Iterator[Tuple[int, int, Tuple[Any, ...]]]:
+    """
+    Yield (offset after the record, kind, fields) for each record from offset.
+
+    fields start with the tick. For BEHAVIOUR the last field is the
+    encoded behaviour (see decode_behaviour) instead of its length.
+    """
+    size = len(data)
+    while offset < size:
+        record = _RECORDS[data[offset]]
+        fields = record.unpack_from(data, offset)
+        offset += record.size
+        if fields[0] == BEHAVIOUR:
+            length = fields[3]
+            fields = fields[:3] + (data[offset:offset + length],)
+            offset += length
+        yield offset, fields[0], fields[1:]
+
+
+def decode_behaviour(blob: bytes) -> Any:
+    """
+    Return a new behaviour from a BEHAVIOUR record.
+    """
+    return checkpoint._decode_value(marshal.loads(blob))
+
+
+class Replayer:
+    """
+    Rebuild the state of a logged run at any tick.
+
+    The log and its checkpoints must be complete, so close the log
+    (DeliverySimulation.stop_event_log) before replaying it. The
+    returned simulation is meant to be inspected: the random generators
+    are not restored, so ticking it further does not continue the
+    original run.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+
+        # (tick, offset after the CHECKPOINT record) in log order
+        self._checkpoints: List[Tuple[int, int]] = []
+        self._behaviours: Dict[int, bytes] = {}
+        self.last_tick = 0
+        for offset, kind, fields in read_events(self._data):
+            self.last_tick = fields[0]
+            if kind == CHECKPOINT:
+                self._checkpoints.append((fields[0], offset))
+            elif kind == BEHAVIOUR:
+                self._behaviours[fields[1]] = fields[2]
+        if not self._checkpoints:
+            raise ValueError(f"Event log {path!r} has no checkpoint")
+        self.first_tick = self._checkpoints[0][0]
+
+    def state_at(self, tick: int) -> "DeliverySimulation":
+        """
+        Return a new simulation in the state it had at the end of tick.
+        """
+        if not self.first_tick <= tick <= self.last_tick:
+            raise ValueError(
+                f"Tick {tick} is outside the logged ticks {self.first_tick}..{self.last_tick}"
+            )
+
+        ticks = [t for t, _ in self._checkpoints]
+        start, offset = self._checkpoints[bisect_right(ticks, tick) - 1]
+        sim = checkpoint.restore_state(
+            checkpoint.read(checkpoint_path(self.path, start)), restore_rng=False
+        )
+
+        by_tick: dict = {}
+        for _, kind, fields in read_events(self._data, offset):
+            if fields[0] > tick:
+                break
+            by_tick.setdefault(fields[0], []).append((kind, fields))
+
+        for t in range(start + 1, tick + 1):
+            _apply_tick(sim, t, by_tick.get(t, ()), self._behaviours)
+        return sim
+
+
+def _apply_tick(
+    sim: "DeliverySimulation",
+    tick: int,
+    events: Iterable[Tuple[int, Tuple[Any, ...]]],
+    behaviours: Dict[int, bytes],
+) -> None:
+    """
+    Redo one tick of DeliverySimulation.tick from its logged events.
+
+    The phases run in the same order as in the engine: arrivals,
+    expiries, assignments, movement with pickups and dropoffs,
+    mutations and metrics.
+    """
+    sim.time = tick
+    sim.change_tracker.begin_frame(tick)
+    drivers = sim._drivers_by_id
+    requests = sim._requests_by_id
+
+    by_kind: dict = {}
+    for kind, fields in events:
+        by_kind.setdefault(kind, []).append(fields)
+
+    for _, rid, px, py, dx, dy in by_kind.get(ARRIVAL, ()):
+        sim._add_request(Request(rid, Point(px, py), Point(dx, dy), tick))
+
+    for _, rid, released in by_kind.get(EXPIRED, ()):
+        requests[rid].mark_expired(tick)
+        sim.expired_count += 1
+        if released:
+            drivers[released].release_expired_request(tick)
+
+    for _, did, rid in by_kind.get(ASSIGNED, ()):
+        drivers[did].commit_assignment(requests[rid], tick)
+
+    sim.trip_schedule.advance(tick)
+
+    for _, did, _rid in by_kind.get(PICKED, ()):
+        drivers[did].complete_pickup(tick)
+
+    for _, did, rid, earnings in by_kind.get(DELIVERED, ()):
+        d = drivers[did]
+        req = requests[rid]
+        d.complete_dropoff(tick)
+        sim.served_count += 1
+        sim.wait_times.append(tick - req.creation_time)
+        d.total_earnings += earnings
+        d.current_request = None
+
+    for _, did, index in by_kind.get(MUTATION, ()):
+        drivers[did].update_behaviour_and_stamp(tick, decode_behaviour(behaviours[index]))
+
+    if tick % sim.record_interval == 0:
+        sim.metrics.record_snapshot(
+            time=tick,
+            served_count=sim.served_count,
+            expired_count=sim.expired_count,
+            wait_times=sim.wait_times,
+            drivers=sim.drivers,
+            requests=sim.requests,
+        )
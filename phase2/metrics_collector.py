@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Dict, List, TYPE_CHECKING
+
+from .status import IDLE
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+class MetricsCollector:
+    """
+    Time series of the simulation results, one row per recorded tick.
+
+    DeliverySimulation calls record_snapshot every record_interval ticks.
+    A row holds the counters at that tick, the average wait so far and
+    the number of idle drivers. The rows are kept as plain columns of
+    numbers, so the collector can be checkpointed and the columns handed
+    to a plot as they are.
+
+    The average wait is kept as a running sum over the wait times that
+    were added since the previous row, so recording a row does not cost
+    more as the run goes on.
+
+    --- DOCTEST ---
+    >>> class D:
+    ...     def __init__(self, code): self.status_code = code
+    >>> metrics = MetricsCollector()
+    >>> metrics.record_snapshot(time=1, served_count=0, expired_count=0, wait_times=[],
+    ...                         drivers=[D(0), D(1)], requests=[])
+    >>> metrics.record_snapshot(time=2, served_count=2, expired_count=1, wait_times=[3, 6],
+    ...                         drivers=[D(0), D(0)], requests=[])
+    >>> metrics.times, metrics.served, metrics.avg_wait
+    ([1, 2], [0, 2], [0.0, 4.5])
+    >>> metrics.latest()["idle_drivers"]
+    2
+    """
+
+    def __init__(self) -> None:
+        self.times: List[int] = []
+        self.served: List[int] = []
+        self.expired: List[int] = []
+        self.avg_wait: List[float] = []
+        self.idle_drivers: List[int] = []
+        self._wait_sum = 0
+        self._wait_count = 0
+
+    def record_snapshot(
+        self,
+        time: int,
+        served_count: int,
+        expired_count: int,
+        wait_times: List[int],
+        drivers: List["Driver"],
+        requests: List["Request"],
+    ) -> None:
+        """
+        Add a row for the state at time.
+        """
+        if len(wait_times) > self._wait_count:
+            self._wait_sum += sum(wait_times[self._wait_count:])
+            self._wait_count = len(wait_times)
+        self.times.append(time)
+        self.served.append(served_count)
+        self.expired.append(expired_count)
+        self.avg_wait.append(self._wait_sum / self._wait_count if self._wait_count else 0.0)
+        self.idle_drivers.append(sum(1 for d in drivers if d.status_code == IDLE))
+
+    def latest(self) -> Dict[str, float]:
+        """
+        Return the last row as a dict (empty before the first row).
+        """
+        if not self.times:
+            return {}
+        return {
+            "time": self.times[-1],
+            "served": self.served[-1],
+            "expired": self.expired[-1],
+            "avg_wait": self.avg_wait[-1],
+            "idle_drivers": self.idle_drivers[-1],
+        }
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
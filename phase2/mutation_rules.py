@@ -1,5 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from typing import Sequence
 from .driver import Driver
 from .driver_behaviour import (
     GreedyDistanceBehaviour,
@@ -8,6 +9,44 @@ from .driver_behaviour import (
     Naive
 )
 import random
+import numpy
+
+# The behaviours a random mutation picks from, in this order
+_BEHAVIOURS = (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive)
+_GREEDY, _EARNINGS, _LAZY, _NAIVE, _OTHER = range(5)
+_BEHAVIOUR_CODES = {cls: code for code, cls in enumerate(_BEHAVIOURS)}
+_KEEP, _RANDOM = -1, -2
+
+
+def _mutation_table() -> numpy.ndarray:
+    """Return the new behaviour code for each (4*A + 2*B + C, current behaviour code)
+    of DecisionTreeRule.maybe_mutate. _KEEP means no mutation and _RANDOM a random
+    behaviour. Drivers with any other behaviour have _OTHER.
+
+    >>> table = _mutation_table()
+    >>> int(table[4, _GREEDY]) == _LAZY, int(table[4, _NAIVE]) == _GREEDY
+    (True, True)
+    >>> int(table[0, _OTHER]) == _KEEP
+    True
+    """
+    # (A, B, C) -> (new behaviour, new behaviour when the driver already has it)
+    rules = {
+        (True, False, False): (_GREEDY, _LAZY),
+        (False, True, False): (_EARNINGS, _GREEDY),
+        (False, False, True): (_NAIVE, _EARNINGS),
+        (True, True, False): (_GREEDY, _RANDOM),
+        (False, True, True): (_EARNINGS, _NAIVE),
+        (True, False, True): (_LAZY, _RANDOM),
+        (True, True, True): (_RANDOM, _RANDOM),
+    }
+    table = numpy.full((8, _OTHER + 1), _KEEP, dtype=numpy.int8)
+    for (a, b, c), (new, otherwise) in rules.items():
+        for current in range(_OTHER + 1):
+            table[4 * a + 2 * b + c, current] = otherwise if current == new else new
+    return table
+
+
+_MUTATION_TABLE = _mutation_table()
 
 class MutationThresholds:
     """This class purpose is to be a object holder for all mutations thresholds.
@@ -50,6 +89,21 @@ class MutationRule(ABC):
         """Return true if the driver should mutate / will mutate and False
         otherwise. Right now there is only one rule"""
         raise NotImplementedError
+
+    def maybe_mutate_all(self, drivers: Sequence[Driver], time: int) -> None:
+        """Call maybe_mutate for all the drivers, in order. Rules can override this
+        to handle the whole fleet at once."""
+        for driver in drivers:
+            self.maybe_mutate(driver, time)
+
+    def next_check(self, driver: Driver, time: int) -> int:
+        """Return the first tick after time where maybe_mutate could change the
+        driver, if the driver do not log any new events before that. The simulation
+        do not call maybe_mutate for the driver before that tick (see 
+        MutationScheduler). The defoult is the next tick, so the driver is checked
+        every tick. A rule that overrides this must not use the random generators
+        in the ticks it skips."""
+        return time + 1
     
 class DecisionTreeRule(MutationRule):
     """This mutation rule will follow a decision tree. 
@@ -73,18 +127,42 @@ class DecisionTreeRule(MutationRule):
         - Lasy hebavior
         - Lasy hebavior
         - Random = takes a ramdon behavior from the options above
+
+    rng is used by maybe_mutate_all. Without it maybe_mutate_all calls maybe_mutate 
+    for one driver at a time (the reference implementation that draws from the 
+    random module). With a numpy Generator (or a seed) it decides for all drivers
+    at once with numpy, and draws the random behaviours from rng. The mutations are
+    the same except for which random behaviour is picked. 
     """
-    def __init__(self, thresholds: MutationThresholds) -> None:
+    def __init__(self, thresholds: MutationThresholds, rng: numpy.random.Generator | int | None = None) -> None:
         self.thresholds = thresholds
+        if rng is not None and not isinstance(rng, numpy.random.Generator):
+            rng = numpy.random.default_rng(rng)
+        self.rng = rng
 
     @staticmethod
     def _random_behaviour():
-        return random.choice([
-            GreedyDistanceBehaviour,
-            EarningsMaxBehaviour,
-            LazyBehaviour,
-            Naive
-        ])
+        return random.choice(list(_BEHAVIOURS))
+
+    @staticmethod
+    def _counts_since_stamp(driver: Driver) -> tuple[int, float, int]:
+        """Return the number of expired, the earnings and the number of accepted
+        events since the last mutation. The history is in time order, so the events
+        since the stamp are at the end.
+        """
+        stamp = driver.behaviour_mutation_stamp
+        expired = accepted = 0
+        earnings = 0
+        for ev in reversed(driver.history):
+            if ev.timestamp < stamp:
+                break
+            if ev.event == "expired":
+                expired += 1
+            elif ev.event == "accepted":
+                accepted += 1
+            elif ev.event == "DELIVERED" and ev.earnings is not None:
+                earnings += ev.earnings
+        return expired, earnings, accepted
 
     def maybe_mutate(self, driver: Driver, time: int) -> None:
         """Earmings calculation follows same logic as the calculation of the ratio in
@@ -93,7 +171,7 @@ class DecisionTreeRule(MutationRule):
         # ------- mutation based on time since last mutation ------------
         time_since_last = time - driver.behaviour_mutation_stamp
         if time_since_last >= self.thresholds.lasttime_mutation_thr:
-            driver.update_behaviour_and_stamp(time, self._random_behaviour())
+            driver.update_behaviour_and_stamp(time, self._random_behaviour().shared())
             return
         
         # ------- collect infomation based on reasent history ------------
@@ -119,25 +197,112 @@ class DecisionTreeRule(MutationRule):
         NaiveBe = Naive
 
         if A and not B and not C:
-            driver.behaviour = GreedyBe() if type(current_behaviour) != GreedyBe else LasyBe()
+            driver.behaviour = GreedyBe.shared() if type(current_behaviour) != GreedyBe else LasyBe.shared()
 
         elif B and not A and not C:
-            driver.behaviour = EarningBe() if type(current_behaviour) != EarningBe else GreedyBe()
+            driver.behaviour = EarningBe.shared() if type(current_behaviour) != EarningBe else GreedyBe.shared()
         
         elif C and not A and not B:
-            driver.behaviour = NaiveBe() if type(current_behaviour) != NaiveBe else EarningBe()
+            driver.behaviour = NaiveBe.shared() if type(current_behaviour) != NaiveBe else EarningBe.shared()
 
         elif A and B and not C:
-            driver.behaviour = GreedyBe() if type(current_behaviour) != GreedyBe else self._random_behaviour()()
+            driver.behaviour = GreedyBe.shared() if type(current_behaviour) != GreedyBe else self._random_behaviour().shared()
 
         elif B and C and not A:
-            driver.behaviour = EarningBe() if type(current_behaviour) != EarningBe else NaiveBe()
+            driver.behaviour = EarningBe.shared() if type(current_behaviour) != EarningBe else NaiveBe.shared()
 
         elif A and C and not B:
-            driver.behaviour = LasyBe() if type(current_behaviour) != LasyBe else self._random_behaviour()()
+            driver.behaviour = LasyBe.shared() if type(current_behaviour) != LasyBe else self._random_behaviour().shared()
 
         elif A and B and C:
-            driver.behaviour = self._random_behaviour()()
+            driver.behaviour = self._random_behaviour().shared()
 
         # ------- Update mutation timestamp on driver ------------
-        driver.behaviour_mutation_stamp = time
\ No newline at end of file
+        driver.behaviour_mutation_stamp = time
+
+    @staticmethod
+    def _first_below(total: float, threshold: float, start: int) -> int | None:
+        """Return the smallest time_since_last >= start where total / time_since_last
+        is below the threshold (with the same float division as maybe_mutate), or None
+        if that never happens.
+
+        >>> DecisionTreeRule._first_below(0, 0.25, 1)
+        1
+        >>> DecisionTreeRule._first_below(10, 0.25, 1)
+        41
+        >>> DecisionTreeRule._first_below(10, 0.0, 1) is None
+        True
+        """
+        if total / start < threshold:
+            return start
+        if threshold <= 0:
+            return None
+        since = max(start, int(total / threshold))
+        while not total / since < threshold:
+            since += 1
+        while since > start and total / (since - 1) < threshold:
+            since -= 1
+        return since
+
+    def next_check(self, driver: Driver, time: int) -> int:
+        """The inputs of maybe_mutate only change when the driver logs an event,
+        except for the time since the last mutation. The time based mutation happens
+        when it reaches lasttime_mutation_thr, and the earnings and accepted ratios 
+        only get smaller as it grows (so B and C can only turn true). This finds the 
+        first tick where one of them happens.
+        """
+        stamp = driver.behaviour_mutation_stamp
+        thresholds = self.thresholds
+        start = time + 1 - stamp
+        if start >= thresholds.lasttime_mutation_thr:
+            return time + 1
+
+        expired, earnings, accepted = self._counts_since_stamp(driver)
+        if expired >= thresholds.expire_thr:
+            return time + 1
+
+        since = thresholds.lasttime_mutation_thr
+        for total, threshold in ((earnings, thresholds.earning_thr), (accepted, thresholds.accepted_thr)):
+            first = self._first_below(total, threshold, start)
+            if first is not None and first < since:
+                since = first
+        return stamp + since
+
+    def maybe_mutate_all(self, drivers: Sequence[Driver], time: int) -> None:
+        """Does the same as maybe_mutate for every driver, but finds A, B and C for
+        all drivers as arrays, and looks the new behaviour up in a table 
+        (_MUTATION_TABLE) instead of going though the if/elif chain. All random 
+        behaviours are drawn from rng in one call, in the order of drivers. 
+        """
+        if self.rng is None:
+            super().maybe_mutate_all(drivers, time)
+            return
+        n = len(drivers)
+        if n == 0:
+            return
+        thresholds = self.thresholds
+
+        # ------- per driver counters since last mutation ------------
+        stamps = numpy.fromiter((d.behaviour_mutation_stamp for d in drivers), dtype=numpy.int64, count=n)
+        counts = numpy.array([self._counts_since_stamp(d) for d in drivers], dtype=numpy.float64)
+        current = numpy.fromiter((_BEHAVIOUR_CODES.get(type(d.behaviour), _OTHER) for d in drivers), dtype=numpy.int8, count=n)
+
+        # ------- check threshold ------------
+        time_since_last = time - stamps
+        by_time = time_since_last >= thresholds.lasttime_mutation_thr
+        if (time_since_last[~by_time] == 0).any():
+            raise ZeroDivisionError("division by zero")  # as in maybe_mutate
+        since = numpy.where(by_time, 1, time_since_last)
+        A = counts[:, 0] >= thresholds.expire_thr
+        B = counts[:, 1] / since < thresholds.earning_thr
+        C = counts[:, 2] / since < thresholds.accepted_thr
+
+        new = _MUTATION_TABLE[4 * A + 2 * B + C, current]
+        new[by_time] = _RANDOM
+        random_rows = numpy.flatnonzero(new == _RANDOM)
+        if len(random_rows):
+            new[random_rows] = self.rng.integers(0, len(_BEHAVIOURS), size=len(random_rows))
+
+        # ------- mutate ------------
+        for i in numpy.flatnonzero(new != _KEEP).tolist():
+            drivers[i].update_behaviour_and_stamp(time, _BEHAVIOURS[new[i]].shared())
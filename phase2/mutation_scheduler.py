@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import heapq
+from typing import Any, Dict, List, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+
+
+class MutationScheduler:
+    """
+    Decide which drivers the mutation rule has to look at in a tick.
+
+    Calling maybe_mutate on every driver every tick is wasted work when
+    the rule's inputs did not change. After a driver is checked, the
+    rule's next_check tells the first tick at which it could mutate the
+    driver if the driver logs no new events (see MutationRule.next_check),
+    and the driver is put in a timer bucket for that tick. Drivers report
+    themselves when they log an event (Driver.log_event), and they are
+    checked again in the same tick. Every other driver is skipped. The
+    rule would have left those drivers unchanged without using the random
+    generators, so the result is the same as checking everybody.
+
+    Due drivers are checked in the order of sim.drivers, like a loop over
+    all drivers, so the random mutations draw from the random generator
+    in the same order.
+
+    New drivers (and all drivers after reset) are due in the next tick.
+    The schedule assumes the rule and its thresholds do not change
+    between checks. The simulation calls reset when the rule is
+    replaced. Call it yourself after changing thresholds in place.
+
+    --- DOCTEST ---
+    >>> class Rule:
+    ...     def next_check(self, driver, time): return time + 3
+    >>> class D:
+    ...     pass
+    >>> scheduler = MutationScheduler(Rule())
+    >>> a, b = D(), D()
+    >>> scheduler.add_driver(a, 0)
+    >>> scheduler.add_driver(b, 0)
+    >>> due = scheduler.due(1, [a, b])
+    >>> due == [a, b]
+    True
+    >>> for d in due: scheduler.checked(d, 1)
+    >>> scheduler.due(2, [a, b])
+    []
+    >>> scheduler.history_changed(b)
+    >>> scheduler.due(3, [a, b]) == [b]
+    True
+    >>> scheduler.checked(b, 3)
+    >>> scheduler.due(4, [a, b]) == [a]
+    True
+    """
+
+    def __init__(self, rule: Any) -> None:
+        self.rule = rule
+        self._next_check = getattr(rule, "next_check", None)
+        self._order: Dict[int, int] = {}
+        self._next_order = 0
+        self._due: Dict[int, int] = {}
+        self._buckets: Dict[int, List["Driver"]] = {}
+        self._ticks: List[int] = []
+        self._dirty: Dict[int, "Driver"] = {}
+        self.checks = 0
+
+    def _schedule(self, driver: "Driver", tick: int) -> None:
+        key = id(driver)
+        if self._due.get(key) == tick:
+            return
+        self._due[key] = tick
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            self._buckets[tick] = [driver]
+            heapq.heappush(self._ticks, tick)
+        else:
+            bucket.append(driver)
+
+    def add_driver(self, driver: "Driver", time: int) -> None:
+        """
+        Start scheduling a driver; it is checked in the next tick.
+        """
+        self._order[id(driver)] = self._next_order
+        self._next_order += 1
+        self._schedule(driver, time + 1)
+
+    def remove_driver(self, driver: "Driver") -> None:
+        key = id(driver)
+        self._order.pop(key, None)
+        self._due.pop(key, None)
+        self._dirty.pop(key, None)
+
+    def reset(self, rule: Any, drivers: Sequence["Driver"], time: int) -> None:
+        """
+        Use a new rule and check all drivers in the next tick.
+        """
+        self.rule = rule
+        self._next_check = getattr(rule, "next_check", None)
+        self._due.clear()
+        self._buckets.clear()
+        self._ticks.clear()
+        self._dirty.clear()
+        for d in drivers:
+            self._schedule(d, time + 1)
+
+    def history_changed(self, driver: "Driver") -> None:
+        """
+        Called by the driver when it logs an event.
+        """
+        if id(driver) in self._order:
+            self._dirty[id(driver)] = driver
+
+    def due(self, time: int, drivers: Sequence["Driver"]) -> List["Driver"]:
+        """
+        Return the drivers to check in this tick, in the order of drivers.
+        """
+        found = self._dirty
+        self._dirty = {}
+        ticks = self._ticks
+        while ticks and ticks[0] <= time:
+            tick = heapq.heappop(ticks)
+            for d in self._buckets.pop(tick):
+                key = id(d)
+                # Drivers rescheduled since are in a later bucket
+                if self._due.get(key) == tick:
+                    found[key] = d
+        if not found:
+            return []
+
+        order = self._order
+        if len(found) * 4 > len(order):
+            return [d for d in drivers if id(d) in found]
+        keys = sorted((order[key], key) for key in found if key in order)
+        return [found[key] for _, key in keys]
+
+    def checked(self, driver: "Driver", time: int) -> None:
+        """
+        Schedule the next check of a driver the rule just looked at.
+        """
+        self.checks += 1
+        next_check = self._next_check
+        tick = time + 1
+        if next_check is not None:
+            tick = max(next_check(driver, time), tick)
+        self._schedule(driver, tick)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
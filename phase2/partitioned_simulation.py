@@ -0,0 +1,353 @@
+"""
+A large world split into tiles, each simulated by its own worker process.
+
+The grid (see Point.set_grid_size) is cut into vertical strips of equal
+width. Every tile is owned by one worker process that runs an ordinary
+DeliverySimulation for the drivers in the tile and the requests whose
+pickup is in the tile, so dispatch, movement, expiry and mutation run in
+parallel for all tiles.
+
+Requests arrive in each tile with the tile's share of the rate (a
+Poisson process split by area is again Poisson), so arrivals over the
+whole world are the same as in one DeliverySimulation. Dropoffs can be
+anywhere. A driver keeps its request until the dropoff, even when that
+is in another tile; once it is idle in a tile it does not own, it is
+handed off to the owner of that tile.
+
+After every tick each worker sends one message (the drivers it hands
+off, possibly none) to every other worker through a queue and waits for
+one message from each of them. This acts as the tick barrier, so all
+tiles advance in lockstep. Handed-off drivers are added in tile order,
+which keeps a run deterministic for a given seed.
+
+The result is statistically equivalent to one DeliverySimulation,
+except that a request is only offered to drivers in its own tile:
+near a tile border the nearest driver may be in the neighbouring tile.
+With wide tiles (compared to the distance a driver travels to a
+pickup) the effect is small.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import random
+import traceback
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy
+
+from .point import Point
+from .request import Request
+from .request_generator import RequestGenerator
+from .status import IDLE
+
+if TYPE_CHECKING:
+    from .delivery_simulation import DeliverySimulation
+    from .dispatch_policies import DispatchPolicy
+    from .driver import Driver
+    from .mutation_rules import MutationRule
+
+
+def _tile_of(x: float, tile_width: float, tiles: int) -> int:
+    """
+    Return the tile that owns x (the last tile also owns the right edge).
+
+    --- DOCTEST ---
+    >>> _tile_of(0.0, 12.5, 4), _tile_of(12.5, 12.5, 4), _tile_of(50.0, 12.5, 4)
+    (0, 1, 3)
+    """
+    return min(int(x // tile_width), tiles - 1)
+
+
+class TileRequestGenerator(RequestGenerator):
+    """
+    Request generator for one tile of a PartitionedSimulation.
+
+    Pickups are uniform in the tile (x_min <= x <= x_max), dropoffs in the
+    whole world. Request ids start at next_id and step by id_step, so the
+    tiles never hand out the same id.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        x_min: float,
+        x_max: float,
+        width: Optional[float] = None,
+        height: Optional[float] = None,
+        next_id: int = 1,
+        id_step: int = 1,
+        scheduled: Optional[List[Request]] = None,
+    ):
+        super().__init__(rate, width, height, next_id, scheduled)
+        self.x_min = x_min
+        self.x_max = x_max
+        self.id_step = id_step
+
+    def req_generate(self, time: int, req_rate: float) -> List[Request]:
+        requests = []
+        count = numpy.random.poisson(req_rate)
+        for _ in range(count):
+            rid = self._next_rid
+            self._next_rid += self.id_step
+            pickup = Point(random.uniform(self.x_min, self.x_max), random.uniform(0, self.height))
+            dropoff = Point(random.uniform(0, self.width), random.uniform(0, self.height))
+            requests.append(Request(rid=rid, pickup=pickup, dropoff=dropoff, creation_time=time))
+        return requests
+
+
+def _tile_summary(sim: "DeliverySimulation") -> Dict[str, Any]:
+    return {
+        "time": sim.time,
+        "served": sim.served_count,
+        "expired": sim.expired_count,
+        "wait_sum": sum(sim.wait_times),
+        "earnings": sum(d.total_earnings for d in sim.drivers),
+        "drivers": len(sim.drivers),
+    }
+
+
+def _exchange(
+    sim: "DeliverySimulation",
+    tile: int,
+    tiles: int,
+    tile_width: float,
+    inboxes: list,
+    early: Dict[int, List[Tuple[int, List["Driver"]]]],
+) -> None:
+    """
+    Hand off idle drivers that left the tile and take in the ones that arrived.
+    """
+    outgoing: List[List["Driver"]] = [[] for _ in range(tiles)]
+    for d in sim.drivers:
+        if d.status_code == IDLE:
+            owner = _tile_of(d.position.x, tile_width, tiles)
+            if owner != tile:
+                outgoing[owner].append(d)
+    leaving = [d for batch in outgoing for d in batch]
+    if leaving:
+        sim.remove_drivers(leaving)
+
+    for other in range(tiles):
+        if other != tile:
+            inboxes[other].put((sim.time, tile, outgoing[other]))
+
+    # Messages of the next tick can arrive before the last one of this tick
+    received = early.pop(sim.time, [])
+    while len(received) < tiles - 1:
+        time, source, drivers = inboxes[tile].get()
+        if time == sim.time:
+            received.append((source, drivers))
+        else:
+            early.setdefault(time, []).append((source, drivers))
+
+    for _, drivers in sorted(received, key=lambda message: message[0]):
+        if drivers:
+            sim.add_drivers(drivers)
+
+
+def _tile_worker(
+    tile: int,
+    tiles: int,
+    config: Dict[str, Any],
+    drivers: List["Driver"],
+    scheduled: List[Request],
+    inboxes: list,
+    conn,
+) -> None:
+    """
+    Run one tile: a DeliverySimulation driven by commands from conn.
+    """
+    try:
+        from .delivery_simulation import DeliverySimulation
+
+        Point.set_grid_size(config["width"], config["height"])
+        seeds = numpy.random.SeedSequence([config["seed"], tile]).generate_state(2)
+        random.seed(int(seeds[0]))
+        numpy.random.seed(int(seeds[1]))
+
+        tile_width = config["width"] / tiles
+        generator = TileRequestGenerator(
+            config["rate"] / tiles,
+            tile * tile_width,
+            (tile + 1) * tile_width,
+            config["width"],
+            config["height"],
+            next_id=config["first_rid"] + tile,
+            id_step=tiles,
+            scheduled=scheduled,
+        )
+        sim = DeliverySimulation(
+            drivers,
+            config["dispatch_policy"],
+            generator,
+            config["mutation_rule"],
+            config["timeout"],
+            base_fee=config["base_fee"],
+            distance_fee=config["distance_fee"],
+            record_interval=config["record_interval"],
+        )
+        early: Dict[int, List[Tuple[int, List["Driver"]]]] = {}
+
+        while True:
+            command, arg = conn.recv()
+            if command == "run":
+                for _ in range(arg):
+                    sim.tick()
+                    _exchange(sim, tile, tiles, tile_width, inboxes, early)
+                conn.send(("ok", _tile_summary(sim)))
+            elif command == "stop":
+                conn.send(("ok", None))
+                return
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+
+
+class PartitionedSimulation:
+    """
+    One simulation split into tiles run by worker processes.
+
+    The parameters are those of DeliverySimulation. Only the rate,
+    width, height and scheduled requests of request_generator are used;
+    each tile gets its own TileRequestGenerator. The width and height
+    are the size of the world; the workers call Point.set_grid_size
+    with them (call it in this process too before making drivers
+    outside the default grid).
+
+    Parameters
+    ----------
+    tiles : int
+        Number of tiles (and worker processes); None uses one per CPU.
+    seed : int
+        Seed of the random generators of the tiles.
+
+    Use it as a context manager, or call close() to stop the workers.
+    """
+
+    def __init__(
+        self,
+        drivers: List["Driver"],
+        dispatch_policy: "DispatchPolicy",
+        request_generator: RequestGenerator,
+        mutation_rule: "MutationRule",
+        timeout: int,
+        *,
+        tiles: Optional[int] = None,
+        base_fee: float = Request.BASE_FEE,
+        distance_fee: float = Request.DISTANCE_FEE,
+        record_interval: int = 1,
+        seed: int = 0,
+    ) -> None:
+        self.tiles = tiles or multiprocessing.cpu_count()
+        self.width = request_generator.width
+        self.height = request_generator.height
+        self.time = 0
+        tile_width = self.width / self.tiles
+
+        tile_drivers: List[List["Driver"]] = [[] for _ in range(self.tiles)]
+        for d in drivers:
+            tile_drivers[_tile_of(d.position.x, tile_width, self.tiles)].append(d)
+        tile_scheduled: List[List[Request]] = [[] for _ in range(self.tiles)]
+        for r in request_generator.scheduled:
+            tile_scheduled[_tile_of(r.pickup.x, tile_width, self.tiles)].append(r)
+
+        config = {
+            "width": self.width,
+            "height": self.height,
+            "rate": request_generator.rate,
+            "first_rid": max([r.rid for r in request_generator.scheduled], default=0) + 1,
+            "dispatch_policy": dispatch_policy,
+            "mutation_rule": mutation_rule,
+            "timeout": timeout,
+            "base_fee": base_fee,
+            "distance_fee": distance_fee,
+            "record_interval": record_interval,
+            "seed": seed,
+        }
+
+        inboxes = [multiprocessing.Queue() for _ in range(self.tiles)]
+        self._conns = []
+        self._workers = []
+        for tile in range(self.tiles):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_tile_worker,
+                args=(tile, self.tiles, config, tile_drivers[tile], tile_scheduled[tile], inboxes, child),
+                name=f"tile-{tile}",
+                daemon=True,
+            )
+            worker.start()
+            child.close()
+            self._conns.append(parent)
+            self._workers.append(worker)
+        self._summaries: List[Dict[str, Any]] = []
+
+    def _command(self, command: str, arg: Any = None) -> List[Any]:
+        """
+        Send a command to every worker and return their answers in tile order.
+
+        If a worker fails, all workers are stopped (the others would wait
+        for it at the next tick barrier) and a RuntimeError is raised.
+        """
+        for conn in self._conns:
+            conn.send((command, arg))
+        answers: Dict[int, Any] = {}
+        remaining = dict(enumerate(self._conns))
+        while remaining:
+            for conn in wait(list(remaining.values())):
+                tile = self._conns.index(conn)
+                status, value = conn.recv()
+                if status == "error":
+                    self._terminate()
+                    raise RuntimeError(f"Tile {tile} failed:\n{value}")
+                answers[tile] = value
+                del remaining[tile]
+        return [answers[tile] for tile in range(self.tiles)]
+
+    def run(self, ticks: int) -> Dict[str, Any]:
+        """
+        Advance every tile by ticks time steps and return summary().
+        """
+        self._summaries = self._command("run", ticks)
+        self.time = self._summaries[0]["time"]
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the results of the whole world (keys of branching.summarize)
+        and the number of drivers in each tile.
+        """
+        served = sum(s["served"] for s in self._summaries)
+        return {
+            "time": self.time,
+            "served": served,
+            "expired": sum(s["expired"] for s in self._summaries),
+            "avg_wait": sum(s["wait_sum"] for s in self._summaries) / served if served else 0.0,
+            "earnings": sum(s["earnings"] for s in self._summaries),
+            "drivers_per_tile": [s["drivers"] for s in self._summaries],
+        }
+
+    def _terminate(self) -> None:
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        self._conns = []
+
+    def close(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        if self._workers:
+            self._command("stop")
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+        self._conns = []
+
+    def __enter__(self) -> "PartitionedSimulation":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
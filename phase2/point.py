@@ -11,11 +11,31 @@ class Point:
     can not have a higher value than 50.0 and the y-coordinat can not have a higher value of 
     30.0. The constand of the grid size are defined as the first thing in this class in order
     to make it more easy to change if neede later. 
+
+    The grid size can be changed for the whole simulation with set_grid_size, so
+    larger worlds can be simulated. 
     """
-    # Grid size constants
+    # Grid size constants (default world, see set_grid_size)
     GRID_WIDTH = 50.0
     GRID_HEIGHT = 30.0
 
+    @classmethod
+    def set_grid_size(cls, width: float, height: float) -> None:
+        """This method changes the size of the grid for all points. It have to be 
+        called before the points, drivers and requests are made, becouse points
+        that already exist are not validated again. The request and driver
+        generators use the grid size as their default width and height. 
+
+        >>> Point.set_grid_size(100, 60)
+        >>> Point.is_valid(80, 50)
+        True
+        >>> Point.set_grid_size(50.0, 30.0)
+        """
+        if not isinstance(width, (int, float)) or not isinstance(height, (int, float)) or width <= 0 or height <= 0:
+            raise ValueError("The grid width and height have to be positive numbers")
+        cls.GRID_WIDTH = float(width)
+        cls.GRID_HEIGHT = float(height)
+
     def __init__(self, x = 0.0, y = 0.0) -> None:
         """This is the main part of the class and decribes the objects of the class. 
         It also validate the input if the object added are acceptable for the class to make a Point. 
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+from .status import WAITING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .request import Request
+
+
+class RejectionMemo:
+    """
+    Remember which offers drivers rejected, so they are not asked again.
+
+    A waiting request is offered to the same nearby idle drivers on every
+    tick until it is taken or expires. When a driver did not move and did
+    not change, its behaviour gives the same answer again. Behaviours list
+    the driver attributes their decision depends on in decision_inputs
+    (see DriverBehaviour). When a driver rejects an offer, the memo saves
+    a signature of those inputs: the behaviour type and parameters, the
+    listed driver attributes, and the pickup and dropoff of the request.
+    The next offer of the same pair is skipped without calling decide if
+    the signature has not changed. Any change, such as a move, a mutation
+    or an idle_time update, makes the driver be asked again.
+
+    Behaviours without decision_inputs (None) are always asked. Requests
+    that are no longer waiting are dropped by prune() after every dispatch.
+
+    --- DOCTEST ---
+    >>> from phase2.status import EXPIRED
+    >>> class B:
+    ...     decision_inputs = ("position",)
+    >>> class D:
+    ...     def __init__(self): self.did, self.position, self.behaviour = 1, (0, 0), B()
+    >>> class R:
+    ...     def __init__(self): self.pickup, self.dropoff, self.status_code = (1, 1), (2, 2), WAITING
+    >>> memo = RejectionMemo()
+    >>> d, r = D(), R()
+    >>> memo.add(d, r)
+    >>> memo.is_rejected(d, r)
+    True
+    >>> d.position = (0, 1)
+    >>> memo.is_rejected(d, r)
+    False
+    >>> r.status_code = EXPIRED
+    >>> memo.prune()
+    >>> len(memo)
+    0
+    """
+
+    def __init__(self) -> None:
+        # id(request) -> (request, {did: signature})
+        self._rejected: Dict[int, Tuple["Request", Dict[int, tuple]]] = {}
+        self.hits = 0
+
+    @staticmethod
+    def signature(driver: "Driver", request: "Request") -> Optional[tuple]:
+        """
+        Return everything the decision depends on, or None if that is unknown.
+        """
+        behaviour = driver.behaviour
+        inputs = getattr(behaviour, "decision_inputs", None)
+        if inputs is None:
+            return None
+        return (
+            type(behaviour),
+            tuple(vars(behaviour).values()),
+            request.pickup,
+            request.dropoff,
+            *[getattr(driver, name) for name in inputs],
+        )
+
+    def is_rejected(self, driver: "Driver", request: "Request") -> bool:
+        """
+        Return True if the driver rejected this request and nothing changed since.
+        """
+        entry = self._rejected.get(id(request))
+        if entry is None:
+            return False
+        saved = entry[1].get(driver.did)
+        if saved is None or saved != self.signature(driver, request):
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, driver: "Driver", request: "Request") -> None:
+        """
+        Remember that the driver rejected the request (call it after decide).
+        """
+        signature = self.signature(driver, request)
+        if signature is None:
+            return
+        entry = self._rejected.get(id(request))
+        if entry is None:
+            entry = self._rejected[id(request)] = (request, {})
+        entry[1][driver.did] = signature
+
+    def prune(self) -> None:
+        """
+        Forget the requests that are no longer waiting.
+        """
+        done = [key for key, (request, _) in self._rejected.items() if request.status_code != WAITING]
+        for key in done:
+            del self._rejected[key]
+
+    def __len__(self) -> int:
+        return len(self._rejected)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -1,4 +1,16 @@
 from .point import Point
+from .status import (
+    REQUEST_STATUS_NAMES,
+    REQUEST_TRANSITIONS,
+    ASSIGNED,
+    DELIVERED,
+    EXPIRED,
+    PICKED,
+    RequestStatus,
+    check_transition,
+    is_request_status,
+    request_status,
+)
 
 class Request:
     """This reprecents a single food-delivery request with pickup and dropoff locations
@@ -15,6 +27,9 @@ class Request:
     * creation_time: Is the time for when the request was made. So when it come to excist. 
     * status: Is the status of the request. This can be changed whougout time as actions for
     compleating the order/request is progressing. It can be one of folloing: ("WAITING", "ASSIGNED", "PICKED", "DELIVERED", "EXPIRED")
+    The status is saved as a code in status_code (a RequestStatus, see phase2.status) and 
+    status is the name of it. The mark methods change it though the transition table
+    of phase2.status. 
     * assigned_driver_id: IS the id of the driver that accepted the request and if the request got
     expired so the id of the driver that failed. 
 
@@ -44,7 +59,18 @@ class Request:
     : Hvor i vores kode skal der stå at den ikke længere skal opdatere 
     på request wait_time når den er blevet leveret/ expired? 
     : Når/ hvis ordreren er delivered eller expired skal så assigned_driver_id fjernes fra ordreren? I forhold til at dette ikke skal stå i vejen for at driver kan påtage en ny ordre. -> må gerne forblive
+
+    The trip length (the distance from pickup to dropoff) and the base fare of the request
+    is calculated one time when the request is created and saved in trip_length and base_fare.
+    The behaviours and the simulation read these instead of calculating the distance again 
+    every time the request is offered. If the pickup or dropoff is changed though
+    set_request_pickup() or set_request_dropoff() they are calculated again. 
+    The fee constants are defined as the first thing in the class like the grid size in Point.
     """
+    # Fare constants (same defaults as the simulation)
+    BASE_FEE = 10.0
+    DISTANCE_FEE = 1.0
+
     def __init__(self, rid: int, pickup: Point, dropoff: Point, creation_time: int = 0, status: str = "WAITING", assigned_driver_id: int = 0, wait_time: int = 0, pickup_wait_time: int = 0, delivered_wait_time: int = 0, expired_wait_time: int = 0):
         """This method is the initial method that specefic the objects for this class. For this
         it uses the is_valid to validate the input objects to evaluate if they are of the rigtig
@@ -90,8 +116,19 @@ class Request:
             self.pickup_wait_time = pickup_wait_time
             self.delivered_wait_time = delivered_wait_time
             self.expired_wait_time = expired_wait_time
+            self.change_tracker = None
+            self.dispatch_index = None
+            self._update_trip()
         else:
             raise ValueError("invalid value for one of the request attributes values")
+
+    def _update_trip(self) -> None:
+        """This method calculate the trip length from pickup to dropoff and the base fare
+        for the trip and save them on the request. It is called when the request is 
+        created and every time the pickup or dropoff is set to a new point. 
+        """
+        self.trip_length = self.pickup.distance_to(self.dropoff)
+        self.base_fare = Request.BASE_FEE + Request.DISTANCE_FEE * self.trip_length
     
     @staticmethod
     def is_valid(rid, pickup, dropoff, creation_time, status, assigned_driver_id, wait_time, pickup_wait_time, delivered_wait_time, expired_wait_time) -> bool:
@@ -106,7 +143,7 @@ class Request:
             return False
         if not isinstance(creation_time, int) or creation_time < 0:
             return False
-        if status not in ("WAITING", "ASSIGNED", "PICKED", "DELIVERED", "EXPIRED"):
+        if not is_request_status(status):
             return False
         if assigned_driver_id is not None and not isinstance(assigned_driver_id, int) or assigned_driver_id < 0:
             return False
@@ -169,13 +206,29 @@ class Request:
         wait_time: 0
         """
         self.creation_time = t
+
+    @property
+    def status(self) -> str:
+        """The name of the status code (status_code). Setting it with a name or a code
+        sets status_code without checking the transition."""
+        return REQUEST_STATUS_NAMES[self.status_code]
+
+    @status.setter
+    def status(self, value) -> None:
+        self.status_code = request_status(value)
+
+    def _set_status(self, status: RequestStatus) -> None:
+        """This method changes the status code if the transition table allows the 
+        change and raises a ValueError otherwise.
+        """
+        check_transition(REQUEST_TRANSITIONS, self.status_code, status, "request")
+        self.status_code = status
     
     def is_active(self) -> bool:
         """Returns True if the request is still waiting, assigned, or picked 
         (that is, not delivered or expired).
-        If it is delivered or expired then it will return False and if it is something entirly else
-        then it will raise an error becouse it should not be able to be anything else than those 
-        listet. 
+        If it is delivered or expired then it will return False. The status codes of the active
+        statuses are the lowest, so it is one integer comparison. 
 
         >>> pickupPoint = Point()
         >>> pickupPoint.set_point(0, 0)
@@ -214,13 +267,19 @@ class Request:
         >>> r.is_active()
         False
         """
-        if self.status in ("WAITING", "ASSIGNED", "PICKED"):
-            return True
-        elif self.status in ("DELIVERED", "EXPIRED"):
-            return False
-        else:
-            raise ValueError("There have been an major error to the status, so that is something it should not be able to be")
+        return self.status_code <= PICKED
         
+    def _changed(self) -> None:
+        """This method tells the change tracker of the simulation (if there is one)
+        that the status of the request have changed. It is called by all the mark 
+        methods. The dispatch index of the simulation is told as well, so it knows
+        witch requests are still waiting.
+        """
+        if self.change_tracker is not None:
+            self.change_tracker.request_changed(self)
+        if self.dispatch_index is not None:
+            self.dispatch_index.request_changed(self)
+
     def mark_assigned(self, driver_id: int) -> None:
         """This will mark / assign a driver_id to the request. 
         This method will make it posible to assign a driver_id to a request or change it. 
@@ -257,8 +316,9 @@ class Request:
         
         : Det kan være der skal være en if: i forhold til accepted eller ej ellers også så skal det være et andet sted. -> altså hvis driver accepts the request and first then the assigned_driver_id can be changed.-> nej hvis driver accepter skal den bare kalde på denne
         """
-        self.status = "ASSIGNED"
+        self._set_status(ASSIGNED)
         self.assigned_driver_id = driver_id
+        self._changed()
 
     def mark_picked(self, t: int) -> None:
         """This method shall change the status to picked and set the wait_time to zero again.
@@ -296,8 +356,9 @@ class Request:
         delivered_wait_time: 0,
         expired_wait_time: 0
         """
-        self.status = "PICKED"
+        self._set_status(PICKED)
         self.pickup_wait_time = t - self.creation_time
+        self._changed()
 
     
     def mark_delivered(self, t: int) -> None:
@@ -338,8 +399,9 @@ class Request:
         OBS: How long it took the driver to deliver the request is this time,
         should there be a return for the statistic futher down the code???
         """
-        self.status = "DELIVERED"
+        self._set_status(DELIVERED)
         self.delivered_wait_time = ((t - self.creation_time) - self.pickup_wait_time)
+        self._changed()
 
 
     def mark_expired(self, t: int) -> None:
@@ -379,8 +441,9 @@ class Request:
         expired_wait_time: 6
         """
         #Opffange hvilken status ordreren var nået til da ordreren expired)?
-        self.status = "EXPIRED"
+        self._set_status(EXPIRED)
         self.expired_wait_time = t - self.creation_time
+        self._changed()
 
     def update_wait(self, current_time: int) -> None:
         """Updates wait_time according to current_time.
@@ -757,6 +820,7 @@ class Request:
         """
         if self.is_one_valid("pickup", pickup):
              self.pickup = pickup
+             self._update_trip()
              return self
         else:
              raise ValueError("Invalid value for the picup object. The value have to be of the Point class")
@@ -802,6 +866,7 @@ class Request:
         """
         if self.is_one_valid("dropoff", dropoff):
             self.dropoff = dropoff
+            self._update_trip()
             return self
         else:
             raise ValueError("Invalid value for the dropoff objedt. The value have to be of the Point class")
@@ -892,6 +957,7 @@ class Request:
         """
         if self.is_one_valid("status", status):
             self.status = status
+            self._changed()
             return self
         else:
             raise ValueError("Invalid value for status")
@@ -1194,10 +1260,7 @@ class Request:
         if name == "creation_time":
             return isinstance(value, int) and value >= 0
         if name == "status":
-            if value in ("WAITING", "ASSIGNED", "PICKED", "DELIVERED", "EXPIRED"):
-                return True
-            else:
-                return False
+            return is_request_status(value)
         if name == "assigned_driver_id":
             return isinstance(value, int)
         if name == "wait_time":
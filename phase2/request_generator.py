@@ -7,10 +7,11 @@ import numpy
 class RequestGenerator:
     """This class has to able to genereate requests pr. timestamp. 
     """
-    def __init__(self, rate: float, width: float = 50.0, height: float = 30.0, next_id: int = 1, scheduled: list = None):
+    def __init__(self, rate: float, width: float | None = None, height: float | None = None, next_id: int = 1, scheduled: list = None):
         self.rate = rate
-        self.width = width
-        self.height = height
+        # Default to the grid size of Point (see Point.set_grid_size)
+        self.width = Point.GRID_WIDTH if width is None else width
+        self.height = Point.GRID_HEIGHT if height is None else height
         self._next_rid = next_id
         self.scheduled = scheduled or []
 
@@ -26,31 +27,44 @@ class RequestGenerator:
         
         return result
 
+    def generate_between(self, start: int, end: int) -> list[Request]:
+        """Return the requests created in the ticks after start up to and including 
+        end, for a simulation step that covers several ticks (DeliverySimulation 
+        with dt > 1). The random requests of the step are drawn as one Poisson count
+        with rate * (end - start) and their creation ticks are spread uniformly over
+        the step, so the creation times (and the wait times) stay per tick.
+        """
+        result = [r for r in self.scheduled if start < r.creation_time <= end]
+        self.scheduled = [r for r in self.scheduled if not start < r.creation_time <= end]
+
+        count = numpy.random.poisson(self.rate * (end - start))
+        for time in sorted(random.randint(start + 1, end) for _ in range(count)):
+            result.append(self._random_request(time))
+        return result
+
     def req_generate(self, time: int, req_rate: float) -> list[Request]:
-        requests = []
         count = numpy.random.poisson(req_rate)
-        for _ in range(count):
-            this_rid = self._next_rid
-            self._next_rid += 1
-
-            pickuppoint = Point(
-                random.uniform(0, self.width),
-                random.uniform(0, self.height)
-            )
-            dropoffpoint = Point(
-                random.uniform(0, self.width),
-                random.uniform(0, self.height)
-            )
-
-            req = Request(
-                rid = this_rid,
-                pickup = pickuppoint,
-                dropoff = dropoffpoint,
-                creation_time=time
-            )
-
-            requests.append(req)
-        return requests
+        return [self._random_request(time) for _ in range(count)]
+
+    def _random_request(self, time: int) -> Request:
+        this_rid = self._next_rid
+        self._next_rid += 1
+
+        pickuppoint = Point(
+            random.uniform(0, self.width),
+            random.uniform(0, self.height)
+        )
+        dropoffpoint = Point(
+            random.uniform(0, self.width),
+            random.uniform(0, self.height)
+        )
+
+        return Request(
+            rid = this_rid,
+            pickup = pickuppoint,
+            dropoff = dropoffpoint,
+            creation_time=time
+        )
     
     def load_from_cvs(self, path: str):
         requests = []
@@ -93,11 +107,11 @@ class RequestGenerator:
                 raise ValueError(f"Error : Csv file rows have the incorrect number of values. Each row must contain either 5 or 6 values corresponding to x coordinat, y coordinat, and optional speed where speed is optional to include, the error occured in row no. {count_id_gridchek}.")
                     # print(f"Error : Csv file rows have the incorrect number of values. Each row must contain either 5 or 6 values corresponding to x coordinat, y coordinat, and optional speed where speed is optional to include, the error occured in row no. {count_id_gridchek}.")
                     # system stop or call the function again
-            if not (row[1] <= 50.0) and (row[3] <=50.0): # Chek tht the x coordinates (witch) from the file is not highter than the defould grid width (50.0)
+            if not (row[1] <= Point.GRID_WIDTH) and (row[3] <= Point.GRID_WIDTH): # Chek tht the x coordinates (witch) from the file is not highter than the defould grid width (50.0)
                 raise ValueError(f"Error : An x coordinates that cooresponds to the placement in the grid width are highter than the max width. The error is to be found in the columns of x picup and/or x delivery. The error occured in row no. {count_id_gridchek}.")
                 #print(f"Error : An x coordinates that cooresponds to the placement in the grid width are highter than the max width. The error is to be found in the columns of x picup and/or x delivery. The error occured in row no. {count_id_gridchek}.") 
                 # system stop
-            if not (row[2] <=30.0) and (row[4] <= 30.0): # Chek tht the y coordinates (hight) from the file is not highter than the defould grid hight (30.0)
+            if not (row[2] <= Point.GRID_HEIGHT) and (row[4] <= Point.GRID_HEIGHT): # Chek tht the y coordinates (hight) from the file is not highter than the defould grid hight (30.0)
                 raise ValueError(f"Error : An y coordinate that coorespond to the placement in the grid hight are higher than the max hight. The error is to be found in the columns of y picup and/or y delivery. The error occured in row no. {count_id_gridchek}.")
                 # print(f"Error : An y coordinate that coorespond to the placement in the grid hight are higher than the max hight. The error is to be found in the columns of y picup and/or y delivery. The error occured in row no. {count_id_gridchek}.")
             count_id_gridchek += 1
@@ -134,9 +148,9 @@ class RequestGenerator:
 class DriverGenerator:
     """This class has to be able to generate drivers as a one time thing but also
     be able to read a cvs file and use those drivers"""
-    def __init__(self, width: float = 50.0, height: float = 30.0):
-        self.width = width
-        self.height = height
+    def __init__(self, width: float | None = None, height: float | None = None):
+        self.width = Point.GRID_WIDTH if width is None else width
+        self.height = Point.GRID_HEIGHT if height is None else height
         self._next_did = 1
 
     @staticmethod
@@ -209,7 +223,7 @@ class DriverGenerator:
                 # Check if the coordiantes are within the grid bounds.
                 x = parts_float[0]
                 y = parts_float[1]
-                if not (0 <= x <= 50.0) or not (0 <= y <= 30.0):
+                if not (0 <= x <= Point.GRID_WIDTH) or not (0 <= y <= Point.GRID_HEIGHT):
                     raise ValueError("Error : Coordinates for drivers are out of grid bounds.")
                     # print("Error : Coordinates for drivers are out of grid bounds.")
                     # """system stop"""
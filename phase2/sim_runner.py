@@ -0,0 +1,217 @@
+"""
+Run a DeliverySimulation on a background thread.
+
+The GUI loop and the simulation are decoupled: the worker thread calls
+tick() at a configurable rate and publishes a snapshot after every tick.
+Publishing swaps a reference to a finished snapshot (double buffering),
+so the GUI reads the latest frame without taking the engine's lock.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .delivery_simulation import DeliverySimulation
+
+
+class SimulationRunner:
+    """
+    Advance a simulation on a dedicated worker thread.
+
+    Parameters
+    ----------
+    sim : DeliverySimulation
+        The simulation to run. Only the worker thread touches it while
+        the runner is started.
+    snapshot : callable
+        Called on the worker thread after each tick. Must return a
+        (snapshot, metrics) pair built from the simulation state.
+    ticks_per_second : float or None
+        Target simulation rate. None (or 0) runs as fast as possible.
+    max_lead : int
+        Back-pressure: how many published frames the worker may get
+        ahead of the last frame the reader took with latest(). None
+        disables back-pressure.
+    lock : threading.Lock or None
+        Held by the worker while it ticks and builds the snapshot. Take
+        it to change the simulation safely between two ticks. A new
+        lock is used when none is given.
+
+    --- DOCTEST ---
+    >>> class Sim:
+    ...     def __init__(self): self.time = 0
+    ...     def tick(self): self.time += 1
+    >>> sim = Sim()
+    >>> runner = SimulationRunner(sim, lambda: ({"t": sim.time}, {}), max_lead=2)
+    >>> runner.start(paused=True)
+    >>> runner.step(3)
+    >>> runner.wait_for_frame(3, timeout=5)
+    True
+    >>> runner.latest()[0]
+    {'t': 3}
+    >>> runner.stop()
+    """
+
+    def __init__(
+        self,
+        sim: "DeliverySimulation",
+        snapshot: Callable[[], Tuple[Any, Any]],
+        ticks_per_second: Optional[float] = None,
+        max_lead: Optional[int] = 1,
+        lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.sim = sim
+        self._snapshot = snapshot
+        self.ticks_per_second = ticks_per_second
+        self.max_lead = max_lead
+        self.lock = lock if lock is not None else threading.Lock()
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._paused = False
+        self._pending_steps = 0
+
+        # Published (front) buffer and bookkeeping
+        self._front: Optional[Tuple[Any, Any]] = None
+        self.frame = 0
+        self._read_frame = 0
+        self.error: Optional[BaseException] = None
+
+    # ---------------- control (GUI thread) ----------------
+
+    def start(self, paused: bool = False) -> None:
+        """
+        Start the worker thread.
+        """
+        if self._thread is not None:
+            raise RuntimeError("Runner already started")
+        self._paused = paused
+        self._thread = threading.Thread(target=self._run, name="delivery-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker thread and wait for it to finish.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def pause(self) -> None:
+        with self._cond:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            # Steps not run yet must not run on the next pause
+            self._pending_steps = 0
+            self._cond.notify_all()
+
+    def step(self, n: int = 1) -> None:
+        """
+        Run n ticks while paused. Explicit steps ignore back-pressure.
+        The call is ignored when the runner is not paused.
+        """
+        with self._cond:
+            if not self._paused:
+                return
+            self._pending_steps += max(0, int(n))
+            self._cond.notify_all()
+
+    def set_rate(self, ticks_per_second: Optional[float]) -> None:
+        """
+        Change the target rate. None (or 0) means as fast as possible.
+        """
+        with self._cond:
+            self.ticks_per_second = ticks_per_second
+            self._cond.notify_all()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ---------------- reading (GUI thread) ----------------
+
+    def latest(self) -> Optional[Tuple[Any, Any]]:
+        """
+        Return the last published (snapshot, metrics), or None if no
+        tick has finished yet. Marks the frame as read for back-pressure.
+        """
+        frame = self.frame
+        front = self._front
+        if self._read_frame != frame:
+            with self._cond:
+                self._read_frame = frame
+                self._cond.notify_all()
+        return front
+
+    def wait_for_frame(self, frame: int, timeout: Optional[float] = None) -> bool:
+        """
+        Block until at least frame ticks have been published.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.frame >= frame or self.error is not None or self._stopping,
+                timeout,
+            ) and self.frame >= frame
+
+    # ---------------- worker thread ----------------
+
+    def _may_tick(self) -> bool:
+        if self._stopping:
+            return True
+        if self._paused and self._pending_steps == 0:
+            return False
+        if self.max_lead is not None and self.frame - self._read_frame >= self.max_lead:
+            return self._paused and self._pending_steps > 0
+        return True
+
+    def _run(self) -> None:
+        next_deadline = time.perf_counter()
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._may_tick)
+                if self._stopping:
+                    return
+                stepping = self._paused
+                if stepping:
+                    self._pending_steps -= 1
+                rate = self.ticks_per_second
+
+            try:
+                with self.lock:
+                    self.sim.tick()
+                    published = self._snapshot()
+            except BaseException as e:
+                with self._cond:
+                    self.error = e
+                    self._stopping = True
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                # Swap the finished buffer in; readers never see a half-built frame
+                self._front = published
+                self.frame += 1
+                self._cond.notify_all()
+
+            if rate and not stepping:
+                next_deadline = max(next_deadline + 1.0 / rate, time.perf_counter())
+                delay = next_deadline - time.perf_counter()
+                if delay > 0:
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopping, delay)
+            else:
+                next_deadline = time.perf_counter()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .driver import Driver
+    from .point import Point
+
+
+class DriverGrid:
+    """
+    Uniform grid over driver positions for range and nearest-driver queries.
+
+    The dispatch policies build one grid per tick over the idle drivers.
+    Drivers are referred to by their index in the list the grid was
+    built from, and every query returns indices in ascending order, so
+    a policy that uses the grid visits drivers in the same order as a
+    loop over the whole list would, and ties are broken the same way.
+
+    The cell size is chosen so that a cell holds about one driver on
+    average.
+
+    --- DOCTEST ---
+    >>> class P:
+    ...     def __init__(self, x, y): self.x, self.y = x, y
+    ...     def distance_to(self, o):
+    ...         return ((self.x-o.x)**2 + (self.y-o.y)**2) ** 0.5
+    >>> class D:
+    ...     def __init__(self, x, y): self.position = P(x, y)
+    >>> drivers = [D(0, 0), D(9, 9), D(1, 0), D(5, 5)]
+    >>> grid = DriverGrid(drivers)
+    >>> [i for i in grid.within(P(0, 0), 1.5) if drivers[i].position.distance_to(P(0, 0)) <= 1.5]
+    [0, 2]
+    >>> grid.nearest(P(6, 6), 2, lambda i: drivers[i].position.distance_to(P(6, 6)))
+    [3, 1]
+    """
+
+    def __init__(self, drivers: Sequence["Driver"], cell_size: float = 0.0) -> None:
+        self.drivers = drivers
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        if not drivers:
+            self.cell_size = 1.0
+            return
+
+        xs = [d.position.x for d in drivers]
+        ys = [d.position.y for d in drivers]
+        if cell_size <= 0:
+            area = max(max(xs) - min(xs), 1e-9) * max(max(ys) - min(ys), 1e-9)
+            cell_size = max(math.sqrt(area / len(drivers)), 1e-6)
+        self.cell_size = cell_size
+
+        cells = self._cells
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            key = (int(x // cell_size), int(y // cell_size))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [i]
+            else:
+                cell.append(i)
+
+        keys = list(cells)
+        self._min_cx = min(k[0] for k in keys)
+        self._max_cx = max(k[0] for k in keys)
+        self._min_cy = min(k[1] for k in keys)
+        self._max_cy = max(k[1] for k in keys)
+
+    def _cell_of(self, point: "Point") -> Tuple[int, int]:
+        return int(point.x // self.cell_size), int(point.y // self.cell_size)
+
+    def _ring(self, cx: int, cy: int, r: int) -> List[int]:
+        """
+        Return the driver indices in the cells at Chebyshev distance r from (cx, cy).
+        """
+        cells = self._cells
+        found: List[int] = []
+        if r == 0:
+            found.extend(cells.get((cx, cy), ()))
+            return found
+        for x in range(max(cx - r, self._min_cx), min(cx + r, self._max_cx) + 1):
+            if x == cx - r or x == cx + r:
+                for y in range(max(cy - r, self._min_cy), min(cy + r, self._max_cy) + 1):
+                    found.extend(cells.get((x, y), ()))
+            else:
+                for y in (cy - r, cy + r):
+                    found.extend(cells.get((x, y), ()))
+        return found
+
+    def within(self, point: "Point", radius: float) -> List[int]:
+        """
+        Return the indices of the drivers in the cells that a disk of radius
+        around point overlaps, in ascending order.
+
+        The result can hold drivers a bit further away than radius; the
+        caller checks the exact distance.
+        """
+        if not self._cells:
+            return []
+        if math.isinf(radius):
+            return list(range(len(self.drivers)))
+        size = self.cell_size
+        x0 = max(int((point.x - radius) // size), self._min_cx)
+        x1 = min(int((point.x + radius) // size), self._max_cx)
+        y0 = max(int((point.y - radius) // size), self._min_cy)
+        y1 = min(int((point.y + radius) // size), self._max_cy)
+        if x0 > x1 or y0 > y1:
+            return []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            found = [i for key, cell in self._cells.items()
+                     if x0 <= key[0] <= x1 and y0 <= key[1] <= y1 for i in cell]
+        else:
+            cells = self._cells
+            found = []
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    found.extend(cells.get((x, y), ()))
+        found.sort()
+        return found
+
+    def nearest(self, point: "Point", k: int, distance: Callable[[int], float]) -> List[int]:
+        """
+        Return the indices of the k drivers nearest to point, nearest first.
+
+        distance(i) gives the distance of driver i. Drivers at the same
+        distance are ordered by index, the same as a stable sort of all
+        drivers by distance would order them.
+        """
+        if not self._cells or k <= 0:
+            return []
+        cx, cy = self._cell_of(point)
+        max_r = max(
+            abs(cx - self._min_cx), abs(cx - self._max_cx),
+            abs(cy - self._min_cy), abs(cy - self._max_cy),
+        )
+        size = self.cell_size
+        # Every driver within r * size of point is in rings 0..r (see _ring)
+        found: List[Tuple[float, int]] = []
+        r = 0
+        while True:
+            found.extend((distance(i), i) for i in self._ring(cx, cy, r))
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] < r * size or r >= max_r:
+                    break
+            elif r >= max_r:
+                found.sort()
+                break
+            r += 1
+        return [i for _, i in found[:k]]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
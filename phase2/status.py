@@ -0,0 +1,130 @@
+"""
+Status codes of drivers and requests, and the status changes allowed.
+
+Drivers and requests keep their status as a small IntEnum code in
+status_code, so the simulation compares integers instead of strings and
+the codes can be written straight into NumPy status arrays (see
+ArraySnapshot and BatchSimulation). The status attribute is still there
+as a string view ("IDLE", "WAITING", ...) for the adapter, the GUI and
+older code; setting it with a name sets the code.
+
+Every status change made by the Driver and Request methods (assign,
+complete_*, release_expired_request, mark_*) goes through
+check_transition with the tables below, so a change that the simulation
+never makes (for example a delivered request that expires) raises a
+ValueError instead of silently corrupting the state. Setting the status
+attribute directly (set_request_status, checkpoint restores)
+is not checked.
+"""
+
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import FrozenSet, Tuple, Union
+
+
+class DriverStatus(IntEnum):
+    IDLE = 0
+    TO_PICKUP = 1
+    TO_DROPOFF = 2
+
+
+class RequestStatus(IntEnum):
+    WAITING = 0
+    ASSIGNED = 1
+    PICKED = 2
+    DELIVERED = 3
+    EXPIRED = 4
+
+
+# The members as module constants. Looking a member up on the Enum class
+# (DriverStatus.IDLE) is several times slower than a global, so the hot
+# paths compare with these.
+IDLE, TO_PICKUP, TO_DROPOFF = DriverStatus
+WAITING, ASSIGNED, PICKED, DELIVERED, EXPIRED = RequestStatus
+
+# Code -> name, for the string views (faster than IntEnum.name)
+DRIVER_STATUS_NAMES: Tuple[str, ...] = tuple(s.name for s in DriverStatus)
+REQUEST_STATUS_NAMES: Tuple[str, ...] = tuple(s.name for s in RequestStatus)
+
+# Allowed new statuses, indexed by the current status code
+DRIVER_TRANSITIONS: Tuple[FrozenSet[DriverStatus], ...] = (
+    frozenset({DriverStatus.TO_PICKUP}),                      # IDLE
+    frozenset({DriverStatus.TO_DROPOFF, DriverStatus.IDLE}),  # TO_PICKUP (IDLE when the request expires)
+    frozenset({DriverStatus.IDLE}),                           # TO_DROPOFF
+)
+REQUEST_TRANSITIONS: Tuple[FrozenSet[RequestStatus], ...] = (
+    frozenset({RequestStatus.ASSIGNED, RequestStatus.EXPIRED}),  # WAITING
+    # ASSIGNED (ASSIGNED again when mark_assigned changes the driver)
+    frozenset({RequestStatus.ASSIGNED, RequestStatus.PICKED, RequestStatus.EXPIRED}),
+    frozenset({RequestStatus.DELIVERED}),                        # PICKED
+    frozenset(),                                                 # DELIVERED
+    frozenset(),                                                 # EXPIRED
+)
+
+
+def driver_status(value: Union[str, int]) -> DriverStatus:
+    """
+    Return the code of a driver status given by name or code.
+
+    --- DOCTEST ---
+    >>> driver_status("TO_PICKUP") is DriverStatus.TO_PICKUP
+    True
+    >>> driver_status(2) is DriverStatus.TO_DROPOFF
+    True
+    """
+    if isinstance(value, str):
+        return DriverStatus[value]
+    return DriverStatus(value)
+
+
+def request_status(value: Union[str, int]) -> RequestStatus:
+    """
+    Return the code of a request status given by name or code.
+
+    --- DOCTEST ---
+    >>> request_status("EXPIRED") is RequestStatus.EXPIRED
+    True
+    """
+    if isinstance(value, str):
+        return RequestStatus[value]
+    return RequestStatus(value)
+
+
+def is_driver_status(value) -> bool:
+    """
+    Return True if value is a driver status name or code.
+    """
+    if isinstance(value, DriverStatus):
+        return True
+    return isinstance(value, str) and value in DriverStatus.__members__
+
+
+def is_request_status(value) -> bool:
+    """
+    Return True if value is a request status name or code.
+    """
+    if isinstance(value, RequestStatus):
+        return True
+    return isinstance(value, str) and value in RequestStatus.__members__
+
+
+def check_transition(transitions: Tuple[FrozenSet, ...], current: int, new: int, what: str) -> None:
+    """
+    Raise ValueError if the status change current -> new is not in transitions.
+
+    --- DOCTEST ---
+    >>> check_transition(REQUEST_TRANSITIONS, RequestStatus.WAITING, RequestStatus.ASSIGNED, "request")
+    >>> check_transition(REQUEST_TRANSITIONS, RequestStatus.DELIVERED, RequestStatus.EXPIRED, "request")
+    Traceback (most recent call last):
+    ...
+    ValueError: request status cannot change from DELIVERED to EXPIRED
+    """
+    if new not in transitions[current]:
+        names = DRIVER_STATUS_NAMES if transitions is DRIVER_TRANSITIONS else REQUEST_STATUS_NAMES
+        raise ValueError(f"{what} status cannot change from {names[current]} to {names[new]}")
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .point import Point
+
+if TYPE_CHECKING:
+    from .driver import Driver
+
+
+class Trip:
+    """
+    A driver travelling in a straight line from origin to target.
+
+    The driver leaves in tick start and moves speed units in every tick,
+    so after the movement of a tick its position is a linear function of
+    the tick; it reaches the target in the movement of tick arrival (None
+    when it never does, for a speed of 0). The positions are computed when
+    they are read, and the last one is kept, so reading a position more
+    than once in a tick builds one Point.
+
+    --- DOCTEST ---
+    >>> trip = Trip(Point(0, 0), Point(6, 8), 4, start=5)
+    >>> trip.arrival
+    7
+    >>> trip.position(4), trip.position(5), trip.position(6)
+    (Point(0, 0), Point(2.4, 3.2), Point(4.8, 6.4))
+    >>> trip.position(7)
+    Point(6, 8)
+    >>> trip.position(6) is trip.position(6)
+    True
+    """
+
+    __slots__ = ("origin", "target", "speed", "start", "arrival", "_ux", "_uy", "_tick", "_point")
+
+    def __init__(self, origin: Point, target: Point, speed: float, start: int) -> None:
+        self.origin = origin
+        self.target = target
+        self.speed = speed
+        self.start = start
+        dist = origin.distance_to(target)
+        if dist <= speed:
+            self.arrival: Optional[int] = start
+        elif speed <= 0:
+            self.arrival = None
+        else:
+            # Arrive in the k-th move, the first one with dist <= k * speed
+            self.arrival = start + math.ceil(dist / speed) - 1
+        self._ux = (target.x - origin.x) / dist if dist else 0.0
+        self._uy = (target.y - origin.y) / dist if dist else 0.0
+        self._tick: Optional[int] = None
+        self._point = origin
+
+    def position(self, tick: int) -> Point:
+        """
+        Return the position after the movement of tick.
+        """
+        if tick == self._tick:
+            return self._point
+        if self.arrival is not None and tick >= self.arrival:
+            point = Point(self.target.x, self.target.y)
+        elif tick < self.start:
+            point = self.origin
+        else:
+            move = self.speed * (tick - self.start + 1)
+            point = Point(self.origin.x + self._ux * move, self.origin.y + self._uy * move)
+        self._tick = tick
+        self._point = point
+        return point
+
+
+class TripSchedule:
+    """
+    Move the drivers of a simulation without touching them every tick.
+
+    A driver that gets a target (commit_assignment, complete_pickup) asks
+    the schedule to let it depart; in the movement phase of the next
+    advance it gets a Trip from its position to target_point(), and the
+    trip's arrival tick goes into a timer bucket. Until then nothing is
+    done for the driver: Driver.position interpolates the trip at tick,
+    the last tick whose movement is done. advance only starts the new
+    trips and puts the drivers whose arrival tick has come on their
+    target, so the movement of busy drivers costs nothing per tick.
+
+    The drivers are returned in the order they were added (the order of
+    sim.drivers), like a loop over all drivers would find them.
+
+    --- DOCTEST ---
+    >>> class D:
+    ...     def __init__(self, x, target):
+    ...         self.trip, self.trip_schedule, self.speed = None, None, 1.0
+    ...         self._position, self._target = Point(x, 0), target
+    ...     position = property(lambda self: self._position if self.trip is None
+    ...                         else self.trip.position(self.trip_schedule.tick))
+    ...     @position.setter
+    ...     def position(self, p): self._position, self.trip = p, None
+    ...     def target_point(self): return self._target
+    >>> schedule = TripSchedule()
+    >>> a, b = D(0, Point(3, 0)), D(0, Point(1, 0))
+    >>> for d in (a, b):
+    ...     d.trip_schedule = schedule
+    ...     schedule.add_driver(d)
+    ...     schedule.depart(d)
+    >>> schedule.advance(1) == [b]
+    True
+    >>> a.position, b.position
+    (Point(1.0, 0.0), Point(1, 0))
+    >>> schedule.advance(2), schedule.advance(3) == [a]
+    ([], True)
+    """
+
+    def __init__(self) -> None:
+        self.tick = 0
+        self._order: Dict[int, int] = {}
+        self._next_order = 0
+        self._departing: Dict[int, "Driver"] = {}
+        self._buckets: Dict[int, List[Tuple["Driver", Trip]]] = {}
+        self._ticks: List[int] = []
+
+    def add_driver(self, driver: "Driver") -> None:
+        """
+        Start moving a driver; a driver that already has a target departs
+        in the next advance.
+        """
+        self._order[id(driver)] = self._next_order
+        self._next_order += 1
+        if driver.target_point() is not None:
+            self.depart(driver)
+
+    def remove_driver(self, driver: "Driver") -> None:
+        """
+        Stop moving a driver, leaving it where it is now.
+        """
+        self.stop(driver)
+        self._order.pop(id(driver), None)
+        self._departing.pop(id(driver), None)
+
+    def depart(self, driver: "Driver") -> None:
+        """
+        Called by the driver when it gets a new target.
+        """
+        if id(driver) in self._order:
+            self._departing[id(driver)] = driver
+
+    def stop(self, driver: "Driver") -> None:
+        """
+        End the trip of a driver at its current position.
+        """
+        if driver.trip is not None:
+            driver.position = driver.position
+
+    def moving(self) -> List["Driver"]:
+        """
+        Return the drivers that are on a trip, in no particular order.
+        """
+        return [d for _, trips in self._buckets.items() for d, trip in trips if d.trip is trip]
+
+    def resume(self, driver: "Driver", origin: Point, start: int) -> None:
+        """
+        Put a driver back on the trip it started at origin in tick start
+        (for restored checkpoints).
+        """
+        self._departing.pop(id(driver), None)
+        self._begin(driver, Trip(origin, driver.target_point(), driver.speed, start))
+
+    def _begin(self, driver: "Driver", trip: Trip) -> None:
+        driver.trip = trip
+        if trip.arrival is None:
+            return
+        bucket = self._buckets.get(trip.arrival)
+        if bucket is None:
+            self._buckets[trip.arrival] = [(driver, trip)]
+            heapq.heappush(self._ticks, trip.arrival)
+        else:
+            bucket.append((driver, trip))
+
+    def advance(self, tick: int) -> List["Driver"]:
+        """
+        Do the movement of tick and return the drivers that reached their
+        target in it, in the order they were added.
+        """
+        departing = self._departing
+        if departing:
+            self._departing = {}
+            for d in departing.values():
+                target = d.target_point()
+                if target is not None:
+                    self._begin(d, Trip(d.position, target, d.speed, tick))
+        self.tick = tick
+
+        arrived: List[Tuple[int, "Driver"]] = []
+        ticks = self._ticks
+        order = self._order
+        while ticks and ticks[0] <= tick:
+            for d, trip in self._buckets.pop(heapq.heappop(ticks)):
+                # Trips that were stopped or replaced are skipped
+                if d.trip is trip:
+                    d.position = trip.position(tick)
+                    arrived.append((order[id(d)], d))
+        arrived.sort()
+        return [d for _, d in arrived]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
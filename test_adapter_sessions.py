@@ -0,0 +1,153 @@
+import random
+import threading
+import unittest
+
+import numpy
+
+from phase2 import adapter
+from phase2.dispatch_policies import AnytimePolicy, DispatchPolicy
+
+
+class BlockingPolicy(DispatchPolicy):
+    """Offers nothing and waits in assign until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def assign(self, drivers, requests, time):
+        self.entered.set()
+        self.release.wait(5)
+        return []
+
+
+def driver_dicts(n, rng):
+    return [{"id": i + 1, "x": rng.uniform(0, 50), "y": rng.uniform(0, 30), "speed": 1.5} for i in range(n)]
+
+
+def request_dicts(n, rng):
+    return [
+        {"id": i + 1, "px": rng.uniform(0, 50), "py": rng.uniform(0, 30),
+         "dx": rng.uniform(0, 50), "dy": rng.uniform(0, 30), "t": rng.randint(0, 5)}
+        for i in range(n)
+    ]
+
+
+class TestAdapterSessions(unittest.TestCase):
+    """Testing that sessions hosted by the adapter do not share state"""
+
+    def setUp(self):
+        random.seed(0)
+        numpy.random.seed(0)
+        self.reporter = adapter._ERROR_REPORTER
+        adapter.set_error_reporter("raise")
+        rng = random.Random(1)
+        self.drivers = driver_dicts(10, rng)
+        self.requests = request_dicts(8, rng)
+        self.opened = []
+
+    def tearDown(self):
+        for session_id in self.opened:
+            adapter.close_session(session_id)
+        adapter.set_error_reporter(self.reporter)
+
+    def create(self, **kwargs):
+        args = dict(drivers=self.drivers, requests=self.requests, timeout=20, req_rate=0.5, width=50, height=30)
+        args.update(kwargs)
+        session_id = adapter.create_session(**args)
+        self.opened.append(session_id)
+        return session_id
+
+    def test_sessions_advance_independently(self):
+        a, b = self.create(), self.create()
+
+        for _ in range(5):
+            adapter.simulate_step(session_id=a)
+        snapshot_b, _ = adapter.simulate_step(session_id=b)
+        snapshot_a = adapter.full_snapshot(session_id=a)
+
+        self.assertEqual((snapshot_a["t"], snapshot_b["t"]), (5, 1))
+        self.assertIsNot(adapter._session(a).sim, adapter._session(b).sim)
+        self.assertIsNot(adapter._session(a).sim.drivers[0], adapter._session(b).sim.drivers[0])
+        self.assertIn(a, adapter.list_sessions())
+        self.assertIn(b, adapter.list_sessions())
+
+    def test_closed_session_is_gone(self):
+        a, b = self.create(), self.create()
+
+        adapter.close_session(a)
+
+        self.assertNotIn(a, adapter.list_sessions())
+        with self.assertRaises(RuntimeError):
+            adapter.simulate_step(session_id=a)
+        self.assertEqual(adapter.simulate_step(session_id=b)[0]["t"], 1)
+
+    def test_default_session(self):
+        first = adapter.init_state(self.drivers, self.requests, 20, 0.5, 50, 30)["session"]
+        self.opened.append(first)
+        adapter.simulate_step()
+        other = self.create()
+
+        second = adapter.init_state(self.drivers, self.requests, 20, 0.5, 50, 30)["session"]
+        self.opened.append(second)
+
+        self.assertNotIn(first, adapter.list_sessions())
+        self.assertEqual(adapter.simulate_step()[0]["t"], 1)
+        self.assertEqual(adapter.full_snapshot(session_id=other)["t"], 0)
+
+    def test_background_session_blocks_only_itself(self):
+        a, b = self.create(), self.create()
+        adapter.start_background(paused=True, session_id=a)
+        try:
+            with self.assertRaises(RuntimeError):
+                adapter.simulate_step(session_id=a)
+            self.assertEqual(adapter.simulate_step(session_id=b)[0]["t"], 1)
+
+            adapter.step_background(2, session_id=a)
+            self.assertTrue(adapter._runner(a).wait_for_frame(2, timeout=5))
+            self.assertEqual(adapter.poll_background(session_id=a)[0]["t"], 2)
+        finally:
+            adapter.stop_background(session_id=a)
+        self.assertEqual(adapter.simulate_step(session_id=a)[0]["t"], 3)
+
+    def test_dispatch_budget_per_session(self):
+        a, b = self.create(), self.create()
+
+        adapter.set_dispatch_budget(5.0, session_id=a)
+        adapter.simulate_step(session_id=a)
+
+        self.assertEqual(adapter.dispatch_stats(session_id=a)["ticks"], 1)
+        self.assertIsNone(adapter.dispatch_stats(session_id=b))
+        adapter.set_dispatch_budget(None, session_id=a)
+        self.assertIsNone(adapter.dispatch_stats(session_id=a))
+
+
+    def test_dispatch_budget_waits_for_the_worker_tick(self):
+        a = self.create()
+        blocking = BlockingPolicy()
+        adapter._session(a).sim.dispatch_policy = blocking
+        adapter.start_background(paused=True, session_id=a)
+        try:
+            adapter.step_background(1, session_id=a)
+            self.assertTrue(blocking.entered.wait(5))
+
+            setter = threading.Thread(target=adapter.set_dispatch_budget, args=(2.0,), kwargs={"session_id": a})
+            setter.start()
+            setter.join(0.05)
+            # The worker is inside tick(), so the policy must not change yet
+            self.assertTrue(setter.is_alive())
+            self.assertIs(adapter._session(a).sim.dispatch_policy, blocking)
+
+            blocking.release.set()
+            setter.join(5)
+            policy = adapter._session(a).sim.dispatch_policy
+            self.assertIsInstance(policy, AnytimePolicy)
+            self.assertIs(policy.policy, blocking)
+        finally:
+            blocking.release.set()
+            adapter.stop_background(session_id=a)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import random
+import unittest
+
+from phase2 import checkpoint
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import AnytimePolicy, DispatchPolicy, GlobalGreedyPolicy, NearestNeighborPolicy
+from phase2.driver_behaviour import GreedyDistanceBehaviour, LazyBehaviour, Naive
+
+
+def random_drivers(n, rng):
+    behaviours = [GreedyDistanceBehaviour, LazyBehaviour, Naive]
+    return [
+        Driver(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), rng.uniform(0.5, 3), "IDLE", None,
+               behaviours[i % 3]())
+        for i in range(n)
+    ]
+
+
+def random_requests(n, rng):
+    return [
+        Request(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), Point(rng.uniform(0, 50), rng.uniform(0, 30)),
+                creation_time=rng.randint(0, 10))
+        for i in range(n)
+    ]
+
+
+class Recording(DispatchPolicy):
+    """Offers nothing, but records the batches and how often prepare was called"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.prepared = 0
+
+    def prepare(self, drivers, time):
+        self.prepared += 1
+        return drivers
+
+    def assign(self, drivers, requests, time):
+        self.batches.append([r.rid for r in requests])
+        return []
+
+
+class FakeClock:
+    """Every reading is step seconds after the previous one"""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestAnytimePolicy(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(2)
+        self.drivers = random_drivers(40, rng)
+        self.requests = random_requests(30, rng)
+
+    def test_oldest_first(self):
+        inner = Recording()
+        policy = AnytimePolicy(inner, budget=10.0, batch=4)
+
+        policy.assign(self.drivers, self.requests, 12)
+
+        order = [rid for batch in inner.batches for rid in batch]
+        expected = sorted(self.requests, key=lambda r: (r.creation_time, r.rid))
+        self.assertEqual(order, [r.rid for r in expected])
+        self.assertEqual(inner.prepared, 1)
+        self.assertEqual(policy.deferred, 0)
+
+    def test_budget_carries_the_rest(self):
+        inner = Recording()
+        policy = AnytimePolicy(inner, budget=2.5, batch=4)
+        policy.clock = FakeClock(1.0)
+
+        policy.assign(self.drivers, self.requests, 12)
+        first = [rid for batch in inner.batches for rid in batch]
+        self.assertLess(len(first), len(self.requests))
+        self.assertEqual(policy.deferred, len(self.requests) - len(first))
+
+        inner.batches.clear()
+        policy.assign(self.drivers, self.requests, 13)
+        second = [rid for batch in inner.batches for rid in batch]
+        carried = [r.rid for r in sorted(self.requests, key=lambda r: (r.creation_time, r.rid))
+                   if r.rid not in first]
+        # The carried requests come first, then the others oldest first again
+        self.assertEqual(second, (carried + first)[:len(second)])
+
+    def test_always_one_batch(self):
+        inner = Recording()
+        policy = AnytimePolicy(inner, budget=0.0, batch=3)
+
+        policy.assign(self.drivers, self.requests, 12)
+
+        self.assertEqual(len(inner.batches), 1)
+        self.assertEqual(len(inner.batches[0]), 3)
+
+    def test_overruns_counted_and_logged(self):
+        policy = AnytimePolicy(Recording(), budget=0.5, batch=100)
+        policy.clock = FakeClock(1.0)
+
+        with self.assertLogs("phase2.dispatch_policies", level="DEBUG") as logs:
+            policy.assign(self.drivers, self.requests, 12)
+
+        stats = policy.stats()
+        self.assertEqual((stats["ticks"], stats["overruns"]), (1, 1))
+        self.assertEqual(stats["last_elapsed"], 1.0)
+        self.assertIn("tick 12", logs.output[0])
+
+    def test_same_offers_as_wrapped_policy(self):
+        for inner in (NearestNeighborPolicy(k=2), GlobalGreedyPolicy()):
+            direct = {(o.driver.did, o.request.rid) for o in inner.assign(self.drivers, self.requests, 12)}
+            policy = AnytimePolicy(inner, budget=10.0, batch=5)
+            anytime = {(o.driver.did, o.request.rid) for o in policy.assign(self.drivers, self.requests, 12)}
+            self.assertEqual(anytime, direct)
+
+    def test_checkpoint_round_trip(self):
+        policy = AnytimePolicy(NearestNeighborPolicy(k=2), budget=0.003)
+        policy.assign(self.drivers, self.requests, 12)
+
+        restored = checkpoint._decode_value(checkpoint._encode_value(policy))
+
+        self.assertIsInstance(restored.policy, NearestNeighborPolicy)
+        self.assertEqual(restored.budget, 0.003)
+        self.assertEqual(restored.stats()["ticks"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.array_snapshot import ArraySnapshot
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+def make_simulation(seed):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    drivers = [
+        Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), 1.5, "IDLE", None,
+               (GreedyDistanceBehaviour if i % 2 else Naive)())
+        for i in range(15)
+    ]
+    return DeliverySimulation(drivers, NearestNeighborPolicy(k=3), RequestGenerator(2.0),
+                              DecisionTreeRule(MutationThresholds()), 20)
+
+
+class TestArraySnapshot(unittest.TestCase):
+    """Testing that the arrays hold the same state as the driver and request lists"""
+
+    def check(self, sim, arrays):
+        drivers = sim.drivers
+        self.assertEqual(arrays["driver_id"].tolist(), [d.did for d in drivers])
+        self.assertEqual(arrays["driver_xy"].tolist(), [[d.position.x, d.position.y] for d in drivers])
+        self.assertEqual(arrays["driver_status"].tolist(), [int(d.status_code) for d in drivers])
+        self.assertEqual(arrays["driver_earnings"].tolist(), [d.total_earnings for d in drivers])
+
+        active = [r for r in sim.requests if r.is_active()]
+        self.assertEqual(arrays["request_id"].tolist(), [r.rid for r in active])
+        self.assertEqual(arrays["request_pickup_xy"].tolist(), [[r.pickup.x, r.pickup.y] for r in active])
+        self.assertEqual(arrays["request_dropoff_xy"].tolist(), [[r.dropoff.x, r.dropoff.y] for r in active])
+        self.assertEqual(arrays["request_status"].tolist(), [int(r.status_code) for r in active])
+        self.assertEqual((arrays["time"], arrays["served"], arrays["expired"]),
+                         (sim.time, sim.served_count, sim.expired_count))
+
+    def test_matches_simulation(self):
+        sim = make_simulation(1)
+        for _ in range(40):
+            sim.tick()
+            self.check(sim, sim.get_array_snapshot())
+        self.assertGreater(sim.served_count, 0)
+
+    def test_buffers_reused_and_grown(self):
+        snap = ArraySnapshot(capacity=2)
+        drivers = [Driver(1, Point(1, 2), 1, "IDLE", None, Naive())]
+        requests = [Request(i, Point(i, i), Point(0, 0)) for i in range(1, 6)]
+
+        first = snap.update(drivers, requests[:2])
+        buffer = snap.driver_xy
+        second = snap.update(drivers, requests)
+
+        self.assertIs(snap.driver_xy, buffer)
+        self.assertEqual(second["request_id"].tolist(), [1, 2, 3, 4, 5])
+        self.assertGreaterEqual(snap._capacity, 5)
+        self.assertEqual(first["driver_xy"].tolist(), [[1.0, 2.0]])
+
+    def test_no_active_requests(self):
+        arrays = ArraySnapshot().update([], [])
+
+        self.assertEqual(arrays["driver_xy"].shape, (0, 2))
+        self.assertEqual(arrays["request_id"].shape, (0,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.batch_simulation import BatchSimulation, BEHAVIOURS, TO_DROPOFF, IDLE
+from phase2.branching import summarize
+from phase2.delivery_simulation import DeliverySimulation
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import DispatchPolicy, GlobalGreedyPolicy, NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+
+
+def make_batch(drivers, scheduled, policy=None, replicas=2, timeout=20):
+    return BatchSimulation(
+        drivers,
+        replicas,
+        policy or NearestNeighborPolicy(),
+        RequestGenerator(0, scheduled=scheduled),
+        DecisionTreeRule(MutationThresholds()),
+        timeout,
+        seed=0,
+    )
+
+
+class TestBatchSimulation(unittest.TestCase):
+    """Testing BatchSimulation with scheduled requests only (no randomness)"""
+
+    def test_pickup_and_dropoff(self):
+        driver = Driver(1, Point(0, 0), 2.0, "IDLE", None, Naive())
+        request = Request(1, Point(3, 0), Point(3, 4), creation_time=1)
+        batch = make_batch([driver], [request])
+
+        batch.tick()  # assigned and moved 2 towards the pickup
+        self.assertEqual(batch.x.tolist(), [[2.0], [2.0]])
+        batch.tick()  # at the pickup
+        self.assertTrue((batch.status == TO_DROPOFF).all())
+        batch.tick()
+        batch.tick()  # at the dropoff
+        self.assertTrue((batch.status == IDLE).all())
+        self.assertEqual(batch.served.tolist(), [1, 1])
+        self.assertEqual(batch.avg_wait().tolist(), [3.0, 3.0])
+        self.assertEqual(batch.summaries()[0]["earnings"], request.base_fare)
+
+    def test_expired_request_releases_driver(self):
+        driver = Driver(1, Point(0, 0), 0.5, "IDLE", None, Naive())
+        request = Request(1, Point(40, 0), Point(40, 10), creation_time=1)
+        batch = make_batch([driver], [request], timeout=3)
+
+        for _ in range(5):
+            batch.tick()
+        self.assertEqual(batch.expired.tolist(), [1, 1])
+        self.assertTrue((batch.status == IDLE).all())
+        self.assertTrue((batch.slot == -1).all())
+
+    def test_conflicts(self):
+        far = Request(1, Point(0, 9), Point(0, 10), creation_time=1)
+        near = Request(2, Point(1, 0), Point(1, 1), creation_time=1)
+
+        # NearestNeighborPolicy: the earliest request gets the driver
+        nearest = make_batch([Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())], [far, near])
+        nearest.tick()
+        self.assertEqual((nearest.x.tolist(), nearest.y.tolist()), ([[0.0], [0.0]], [[1.0], [1.0]]))
+
+        # GlobalGreedyPolicy: the closest request gets the driver
+        greedy = make_batch([Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())], [far, near], GlobalGreedyPolicy())
+        greedy.tick()
+        self.assertEqual((greedy.x.tolist(), greedy.y.tolist()), ([[1.0], [1.0]], [[0.0], [0.0]]))
+        self.assertTrue((greedy.status == TO_DROPOFF).all())
+
+    def test_greedy_behaviour_declines_far_pickup(self):
+        driver = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour(max_distance=6.0))
+        request = Request(1, Point(10, 0), Point(10, 1), creation_time=1)
+        batch = make_batch([driver], [request])
+
+        batch.tick()
+        self.assertTrue((batch.status == IDLE).all())
+        self.assertEqual(batch.x.tolist(), [[0.0], [0.0]])
+
+    def test_unreachable_pickup_not_offered(self):
+        driver = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        request = Request(1, Point(10, 0), Point(10, 1), creation_time=1)
+        batch = make_batch([driver], [request], NearestNeighborPolicy(timeout=5))
+
+        batch.tick()
+        self.assertTrue((batch.status == IDLE).all())
+
+    def test_unsupported_policy(self):
+        class Other(DispatchPolicy):
+            def assign(self, drivers, requests, time):
+                return []
+
+        with self.assertRaises(TypeError):
+            make_batch([Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())], [], Other())
+
+    def test_request_slots_grow(self):
+        drivers = [Driver(i + 1, Point(i, i), 1.0, "IDLE", None, Naive()) for i in range(3)]
+        scheduled = [Request(i + 1, Point(i, 0), Point(i, 5), creation_time=1) for i in range(40)]
+        batch = make_batch(drivers, scheduled)
+        capacity = batch.request_status.shape[1]
+
+        batch.tick()
+        self.assertGreaterEqual(batch.request_status.shape[1], 40)
+        self.assertGreater(batch.request_status.shape[1], capacity)
+        self.assertEqual((batch.request_status >= 0).sum(axis=1).tolist(), [40, 40])
+
+
+class TestMatchesDeliverySimulation(unittest.TestCase):
+    """Without random draws every replica must follow DeliverySimulation tick by tick"""
+
+    # No time based mutations and earnings and accepted ratios never below
+    # their threshold, so only the (deterministic) expiry mutations happen
+    thresholds = dict(lasttime_mutation_thr=10 ** 6, expire_thr=2, earning_thr=0, accepted_thr=0)
+
+    def make_world(self):
+        rng = random.Random(1)
+        behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+        drivers = [
+            Driver(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), rng.choice([0.5, 1, 1.5, 2, 3]),
+                   "IDLE", None, behaviours[i % 4]())
+            for i in range(15)
+        ]
+        scheduled = [
+            Request(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), Point(rng.uniform(0, 50), rng.uniform(0, 30)),
+                    creation_time=rng.randint(1, 80))
+            for i in range(120)
+        ]
+        scheduled.sort(key=lambda r: r.creation_time)
+        return drivers, RequestGenerator(0, scheduled=scheduled), DecisionTreeRule(MutationThresholds(**self.thresholds))
+
+    def check_same(self, policy):
+        drivers, generator, rule = self.make_world()
+        sim = DeliverySimulation(drivers, policy, generator, rule, 20)
+        drivers, generator, rule = self.make_world()
+        batch = BatchSimulation(drivers, 3, policy, generator, rule, 20, seed=0)
+
+        mutated = False
+        for _ in range(120):
+            sim.tick()
+            batch.tick()
+            expected = numpy.array([
+                [d.position.x for d in sim.drivers],
+                [d.position.y for d in sim.drivers],
+                [d.status_code for d in sim.drivers],
+                [d.total_earnings for d in sim.drivers],
+                [BEHAVIOURS.index(type(d.behaviour)) for d in sim.drivers],
+            ])
+            for b in range(3):
+                got = numpy.array([batch.x[b], batch.y[b], batch.status[b], batch.earnings[b], batch.behaviour[b]])
+                numpy.testing.assert_allclose(got, expected, rtol=0, atol=1e-9, err_msg=f"tick {sim.time}")
+            mutated = mutated or any(d.behaviour_mutation_stamp > 0 for d in sim.drivers)
+
+        self.assertTrue(mutated)
+        self.assertGreater(sim.served_count, 0)
+        self.assertGreater(sim.expired_count, 0)
+        for summary in batch.summaries():
+            self.assertEqual(summary.keys(), summarize(sim).keys())
+            for key, value in summarize(sim).items():
+                self.assertAlmostEqual(summary[key], value, places=9)
+
+    def test_nearest_neighbor(self):
+        self.check_same(NearestNeighborPolicy())
+
+    def test_global_greedy(self):
+        self.check_same(GlobalGreedyPolicy())
+
+
+if __name__ == '__main__':
+    unittest.main()
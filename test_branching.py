@@ -0,0 +1,120 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.branching import Branch, fork, run_branches, summarize
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.dispatch_policies import GlobalGreedyPolicy, NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+def make_simulation(seed, rng=None):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+    drivers = [
+        Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), random.choice([1, 1.5, 2]),
+               "IDLE", None, behaviours[i % 4]())
+        for i in range(20)
+    ]
+    return DeliverySimulation(drivers, NearestNeighborPolicy(k=3), RequestGenerator(1.0),
+                              DecisionTreeRule(MutationThresholds(), rng=rng), 20)
+
+
+def run(sim, ticks, seed):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    for _ in range(ticks):
+        sim.tick()
+    return summarize(sim), [(d.did, d.position.get_point(), d.status) for d in sim.drivers]
+
+
+class TestFork(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = make_simulation(3)
+        for _ in range(40):
+            self.sim.tick()
+
+    def test_fork_shares_no_objects(self):
+        copy, = fork(self.sim)
+
+        for original, d in zip(self.sim.drivers, copy.drivers):
+            self.assertIsNot(d, original)
+            self.assertIsNot(d.position, original.position)
+            self.assertEqual(d.position.get_point(), original.position.get_point())
+            self.assertIsNot(d.behaviour, original.behaviour)
+        for original, r in zip(self.sim.requests, copy.requests):
+            self.assertIsNot(r, original)
+            self.assertIsNot(r.pickup, original.pickup)
+        own = {id(r) for r in copy.requests}
+        self.assertTrue(all(id(d.current_request) in own for d in copy.drivers if d.current_request))
+
+    def test_fork_leaves_parent_alone(self):
+        before = run(fork(self.sim)[0], 0, 0)
+        run(fork(self.sim)[0], 50, 1)
+
+        self.assertEqual(run(self.sim, 0, 0), before)
+        self.assertEqual(self.sim.time, 40)
+
+    def test_same_seed_same_results(self):
+        a, b = fork(self.sim, 2)
+
+        result_a = run(a, 60, 9)
+        result_b = run(b, 60, 9)
+
+        self.assertEqual(result_a, result_b)
+        self.assertEqual(result_a[0]["time"], 100)
+
+    def test_fork_with_rule_rng(self):
+        sim = make_simulation(3, rng=5)
+        for _ in range(40):
+            sim.tick()
+
+        a, b = fork(sim, 2)
+
+        self.assertIsNot(a.mutation_rule.rng, sim.mutation_rule.rng)
+        self.assertEqual(run(a, 60, 9), run(b, 60, 9))
+
+
+class TestRunBranches(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = make_simulation(6)
+        for _ in range(30):
+            self.sim.tick()
+
+    def test_one_result_per_branch(self):
+        branches = [
+            Branch("nearest", seed=1),
+            Branch("greedy", dispatch_policy=GlobalGreedyPolicy(), seed=1),
+            Branch("nearest-again", seed=1),
+        ]
+
+        results = run_branches(self.sim, branches, ticks=40, processes=0)
+
+        self.assertEqual([r["branch"] for r in results], ["nearest", "greedy", "nearest-again"])
+        self.assertTrue(all(r["time"] == 70 for r in results))
+        same = {k: v for k, v in results[0].items() if k != "branch"}
+        self.assertEqual(same, {k: v for k, v in results[2].items() if k != "branch"})
+        self.assertEqual(self.sim.time, 30)
+
+    def test_process_pool_gives_the_same_results(self):
+        branches = [
+            Branch("a", seed=2),
+            Branch("b", mutation_rule=DecisionTreeRule(MutationThresholds(expire_thr=1)), seed=2),
+        ]
+
+        in_process = run_branches(self.sim, branches, ticks=20, processes=0)
+        pooled = run_branches(self.sim, branches, ticks=20, processes=2)
+
+        self.assertEqual(pooled, in_process)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.dispatch_policies import GlobalGreedyPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+def make_simulation(seed):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    behaviours = [GreedyDistanceBehaviour, LazyBehaviour, Naive]
+    drivers = [
+        Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), random.choice([1, 2]),
+               "IDLE", None, behaviours[i % 3]())
+        for i in range(15)
+    ]
+    return DeliverySimulation(drivers, GlobalGreedyPolicy(), RequestGenerator(2.0),
+                              DecisionTreeRule(MutationThresholds()), 10)
+
+
+class Client:
+    """Keeps a frame the way the GUI does and applies the deltas to it"""
+
+    def __init__(self, full):
+        self.frame = full["frame"]
+        self.drivers = {}
+        self.requests = {}
+        self.apply(full)
+
+    @staticmethod
+    def request_view(r):
+        return (r.pickup.get_point(), r.dropoff.get_point(), r.status)
+
+    def apply(self, delta):
+        if delta["full"]:
+            self.drivers.clear()
+            self.requests.clear()
+        for view in delta["drivers"]:
+            self.drivers[view["id"]] = view
+        for r in delta["added"] + delta["updated"]:
+            self.requests[r.rid] = self.request_view(r)
+        for rid in delta["removed"]:
+            self.requests.pop(rid, None)
+        self.frame = delta["frame"]
+
+
+def full_frame(sim):
+    snapshot = sim.get_delta_snapshot(-1)
+    return (
+        {view["id"]: view for view in snapshot["drivers"]},
+        {r.rid: Client.request_view(r) for r in snapshot["added"]},
+    )
+
+
+class TestDeltaSnapshot(unittest.TestCase):
+    """Testing that the deltas applied to the previous frame give the full frame"""
+
+    def run_client(self, every):
+        sim = make_simulation(5)
+        client = Client(sim.get_delta_snapshot(-1))
+        for _ in range(60):
+            sim.tick()
+            if sim.time % every == 0:
+                delta = sim.get_delta_snapshot(client.frame)
+                self.assertFalse(delta["full"])
+                client.apply(delta)
+                self.assertEqual((client.drivers, client.requests), full_frame(sim), f"tick {sim.time}")
+        return sim
+
+    def test_every_tick(self):
+        sim = self.run_client(1)
+        self.assertGreater(sim.served_count + sim.expired_count, 0)
+
+    def test_skipped_frames(self):
+        self.run_client(7)
+
+    def test_old_frame_gets_full_snapshot(self):
+        sim = make_simulation(5)
+        sim.change_tracker.max_frames = 4
+        for _ in range(10):
+            sim.tick()
+
+        delta = sim.get_delta_snapshot(2)
+
+        self.assertTrue(delta["full"])
+        self.assertEqual(len(delta["drivers"]), len(sim.drivers))
+        self.assertEqual((Client(delta).drivers, Client(delta).requests), full_frame(sim))
+
+    def test_unchanged_frame_is_empty(self):
+        sim = make_simulation(5)
+        for _ in range(10):
+            sim.tick()
+
+        delta = sim.get_delta_snapshot(sim.time)
+
+        self.assertEqual((delta["drivers"], delta["added"], delta["updated"], delta["removed"]), ([], [], [], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy
+
+from phase2 import checkpoint
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+def make_simulation(seed, rng=None):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+    drivers = [
+        Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), random.choice([1, 1.5, 2]),
+               "IDLE", None, behaviours[i % 4]())
+        for i in range(20)
+    ]
+    return DeliverySimulation(drivers, NearestNeighborPolicy(k=3), RequestGenerator(1.0),
+                              DecisionTreeRule(MutationThresholds(lasttime_mutation_thr=30), rng=rng), 20)
+
+
+def final_state(sim):
+    """The results of a run that a restored simulation must reproduce"""
+    return (
+        sim.time, sim.served_count, sim.expired_count, sim.wait_times,
+        [(d.did, d.position.get_point(), d.status, d.total_earnings, len(d.history),
+          type(d.behaviour).__name__) for d in sim.drivers],
+        [(r.rid, r.status, r.assigned_driver_id) for r in sim.requests],
+        (sim.metrics.times, sim.metrics.served, sim.metrics.avg_wait, sim.metrics.idle_drivers),
+    )
+
+
+class TestCheckpointEncoding(unittest.TestCase):
+    """Testing the parts of the checkpoint that do not need a full simulation"""
+
+    def test_requests_round_trip(self):
+        r = Request(4, Point(1.5, 2), Point(10, 20.25), creation_time=3)
+        r.mark_assigned(7)
+        r.mark_picked(5)
+
+        restored = checkpoint._decode_requests(checkpoint._encode_requests([r]))[0]
+
+        self.assertEqual(restored.rid, 4)
+        self.assertEqual(restored.status, "PICKED")
+        self.assertEqual(restored.assigned_driver_id, 7)
+        self.assertEqual(restored.pickup_wait_time, 2)
+        self.assertEqual(restored.dropoff.get_point(), (10, 20.25))
+        self.assertAlmostEqual(restored.trip_length, r.trip_length)
+
+    def test_config_objects_round_trip(self):
+        rule = DecisionTreeRule(MutationThresholds(expire_thr=5))
+        policy = NearestNeighborPolicy(k=2)
+
+        restored_rule = checkpoint._decode_value(checkpoint._encode_value(rule))
+        restored_policy = checkpoint._decode_value(checkpoint._encode_value(policy))
+
+        self.assertIsInstance(restored_rule, DecisionTreeRule)
+        self.assertEqual(restored_rule.thresholds.expire_thr, 5)
+        self.assertEqual(restored_policy.k, 2)
+
+    def test_generator_round_trip(self):
+        rng = numpy.random.default_rng(8)
+        rng.integers(0, 4, size=5)
+
+        restored = checkpoint._decode_value(checkpoint._encode_value(rng))
+
+        self.assertIsNot(restored, rng)
+        self.assertEqual(restored.integers(0, 1000, size=10).tolist(), rng.integers(0, 1000, size=10).tolist())
+
+    def test_shared_behaviour_stored_once(self):
+        table = checkpoint._ObjectTable()
+        shared = GreedyDistanceBehaviour(max_distance=12.0)
+
+        self.assertEqual(table.ref(shared), table.ref(shared))
+        self.assertEqual(table.ref(None), -1)
+        self.assertEqual(table.ref(Naive()), 1)
+        self.assertEqual(len(table.entries), 2)
+
+    def test_encode_decode_state(self):
+        state = {"time": 3, "wait_times": [1, 2], "rng": checkpoint._capture_rng()}
+
+        self.assertEqual(checkpoint.decode(checkpoint.encode(state)), state)
+
+    def test_decode_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            checkpoint.decode(b"NOPE\x00\x01data")
+
+
+class TestCheckpointRestore(unittest.TestCase):
+    """Testing that a restored simulation continues like the original one"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".dsck")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_restore_continues_the_run(self):
+        uninterrupted = make_simulation(5)
+        for _ in range(150):
+            uninterrupted.tick()
+
+        sim = make_simulation(5)
+        for _ in range(60):
+            sim.tick()
+        sim.save_checkpoint(self.path)
+        # Changes after the checkpoint must not leak into the restored run
+        for _ in range(10):
+            sim.tick()
+
+        restored = DeliverySimulation.load_checkpoint(self.path)
+        self.assertEqual(restored.time, 60)
+        for _ in range(90):
+            restored.tick()
+
+        self.assertGreater(restored.served_count, 0)
+        self.assertEqual(final_state(restored), final_state(uninterrupted))
+
+    def test_restore_continues_the_rule_rng(self):
+        uninterrupted = make_simulation(6, rng=3)
+        for _ in range(150):
+            uninterrupted.tick()
+
+        sim = make_simulation(6, rng=3)
+        for _ in range(60):
+            sim.tick()
+        sim.save_checkpoint(self.path)
+
+        restored = DeliverySimulation.load_checkpoint(self.path)
+        self.assertIsInstance(restored.mutation_rule.rng, numpy.random.Generator)
+        self.assertIsNot(restored.mutation_rule.rng, sim.mutation_rule.rng)
+        for _ in range(90):
+            restored.tick()
+
+        self.assertEqual(final_state(restored), final_state(uninterrupted))
+
+    def test_metrics_round_trip(self):
+        sim = make_simulation(2)
+        for _ in range(20):
+            sim.tick()
+
+        restored = checkpoint.restore_state(checkpoint.decode(checkpoint.encode(checkpoint.capture_state(sim))))
+
+        self.assertIsNot(restored.metrics, sim.metrics)
+        self.assertEqual(vars(restored.metrics), vars(sim.metrics))
+        self.assertEqual(len(restored.metrics), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
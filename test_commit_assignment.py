@@ -0,0 +1,54 @@
+import unittest
+
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.driver_behaviour import DriverBehaviour
+
+
+class CountingBehaviour(DriverBehaviour):
+    """Rejects every offer and counts how often it was asked"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def decide(self, driver, offer, time):
+        self.calls += 1
+        return False
+
+
+class TestDriverCommitAssignment(unittest.TestCase):
+    """Testing that the engine assignment do not ask the behaviour again"""
+
+    def setUp(self):
+        self.req = Request(1, Point(3, 4), Point(3, 4))
+        self.behaviour = CountingBehaviour()
+        self.driver = Driver(1, Point(0, 0), 1, "IDLE", None, self.behaviour)
+
+    def test_commit_assignment_skips_decide(self):
+        self.assertTrue(self.driver.commit_assignment(self.req, 3))
+
+        self.assertEqual(self.behaviour.calls, 0)
+        self.assertEqual(self.driver.status, "TO_PICKUP")
+        self.assertIs(self.driver.current_request, self.req)
+        self.assertEqual(self.req.status, "ASSIGNED")
+        self.assertEqual(self.req.assigned_driver_id, 1)
+        self.assertEqual(self.driver.history[-1].event, "ASSIGNED")
+
+    def test_commit_assignment_refuses_busy_driver(self):
+        self.driver.status = "TO_DROPOFF"
+
+        self.assertFalse(self.driver.commit_assignment(self.req, 3))
+        self.assertEqual(self.req.status, "WAITING")
+        self.assertIsNone(self.driver.current_request)
+
+    def test_commit_assignment_refuses_taken_request(self):
+        self.req.mark_assigned(2)
+
+        self.assertFalse(self.driver.commit_assignment(self.req, 3))
+        self.assertEqual(self.req.assigned_driver_id, 2)
+        self.assertEqual(self.driver.status, "IDLE")
+
+
+if __name__ == '__main__':
+    unittest.main()
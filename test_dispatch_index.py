@@ -0,0 +1,61 @@
+import unittest
+
+from phase2.dispatch_index import DispatchIndex
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.driver_behaviour import Naive
+
+
+def attach(index, drivers, requests):
+    for d in drivers:
+        d.dispatch_index = index
+        index.add_driver(d)
+    for r in requests:
+        r.dispatch_index = index
+        index.add_request(r)
+
+
+class TestDispatchIndex(unittest.TestCase):
+    """Testing that the index follows the status changes of drivers and requests"""
+
+    def setUp(self):
+        self.index = DispatchIndex()
+        self.drivers = [Driver(i, Point(i, 0), 1.0, "IDLE", None, Naive()) for i in (1, 2, 3)]
+        self.requests = [Request(i, Point(0, 1), Point(0, 2), creation_time=0) for i in (10, 11)]
+        attach(self.index, self.drivers, self.requests)
+
+    def test_assignment_removes_both(self):
+        d1, d2, d3 = self.drivers
+        d2.commit_assignment(self.requests[0], 1)
+        self.assertEqual(self.index.idle_drivers(), [d1, d3])
+        self.assertEqual(self.index.waiting_requests(), [self.requests[1]])
+
+    def test_released_driver_keeps_its_place(self):
+        d1, d2, d3 = self.drivers
+        d1.commit_assignment(self.requests[0], 1)
+        self.requests[0].mark_expired(5)
+        d1.release_expired_request(5)
+        self.assertEqual(self.index.idle_drivers(), [d1, d2, d3])
+        self.assertEqual(self.index.waiting_requests(), [self.requests[1]])
+
+    def test_dropoff_returns_driver(self):
+        d1 = self.drivers[0]
+        r = self.requests[0]
+        d1.commit_assignment(r, 1)
+        d1.position = Point(0, 1)
+        d1.complete_pickup(2)
+        d1.position = Point(0, 2)
+        d1.complete_dropoff(3)
+        self.assertIn(d1, self.index.idle_drivers())
+
+    def test_removed_driver_not_returned(self):
+        d1, d2, d3 = self.drivers
+        self.index.remove_driver(d2)
+        self.assertEqual(self.index.idle_drivers(), [d1, d3])
+        self.index.add_driver(d2)
+        self.assertEqual(self.index.idle_drivers(), [d1, d3, d2])
+
+
+if __name__ == "__main__":
+    unittest.main()
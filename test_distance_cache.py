@@ -0,0 +1,103 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.distance_cache import DistanceCache
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour
+from phase2.delivery_simulation import DeliverySimulation
+
+
+class TestDistanceCache(unittest.TestCase):
+    """Testing the hit and miss counters for driver/request pairs"""
+
+    def setUp(self):
+        self.cache = DistanceCache()
+        self.drivers = [Driver(i, Point(0, i), 1, "IDLE", None, GreedyDistanceBehaviour()) for i in (1, 2)]
+        self.requests = [Request(i, Point(3, 4 + i), Point(0, 0)) for i in (1, 2)]
+
+    def test_repeated_pairs_are_hits(self):
+        d1, d2 = self.drivers
+        r1, r2 = self.requests
+
+        first = self.cache.distance(d1, r1)
+        self.assertEqual(self.cache.distance(d1, r1), first)
+        self.cache.distance(d1, r2)
+        self.cache.distance(d2, r1)
+        self.cache.distance(d2, r1)
+
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
+        self.assertEqual(len(self.cache), 3)
+        self.assertAlmostEqual(self.cache.hit_rate(), 0.4)
+        self.assertAlmostEqual(first, d1.position.distance_to(r1.pickup))
+
+    def test_clear_keeps_counters(self):
+        d1, _ = self.drivers
+        self.cache.distance(d1, self.requests[0])
+        self.cache.clear()
+
+        self.assertEqual(len(self.cache), 0)
+        self.cache.distance(d1, self.requests[0])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+
+class TestDistanceCacheInSimulation(unittest.TestCase):
+    """Testing that the simulation shares distances within a tick and clears them after"""
+
+    def setUp(self):
+        random.seed(2)
+        numpy.random.seed(2)
+        behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour]
+        drivers = [
+            Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), 1.5, "IDLE", None,
+                   behaviours[i % 2]())
+            for i in range(20)
+        ]
+        self.sim = DeliverySimulation(drivers, NearestNeighborPolicy(k=3), RequestGenerator(2.0),
+                                      DecisionTreeRule(MutationThresholds()), 20)
+
+        # Record the size of the cache each time the simulation clears it
+        self.sizes = []
+        clear = self.sim.distance_cache.clear
+
+        def recording_clear():
+            self.sizes.append(len(self.sim.distance_cache))
+            clear()
+
+        self.sim.distance_cache.clear = recording_clear
+
+    def test_hits_within_tick_and_empty_after(self):
+        cache = self.sim.distance_cache
+        for _ in range(30):
+            self.sim.tick()
+            self.assertEqual(len(cache), 0)
+
+        self.assertEqual(len(self.sizes), 30)
+        self.assertGreater(max(self.sizes), 0)
+        # The behaviours reuse the distances the dispatch policy computed
+        self.assertGreater(cache.hits, 0)
+        self.assertGreater(cache.misses, 0)
+
+    def test_distances_not_reused_across_ticks(self):
+        request = Request(999, Point(25, 15), Point(0, 0))
+        moved = False
+
+        for _ in range(20):
+            positions = {d.did: d.position.get_point() for d in self.sim.drivers}
+            for d in self.sim.drivers:
+                d.distance_to_pickup(request)
+            self.sim.tick()
+            for d in self.sim.drivers:
+                self.assertAlmostEqual(d.distance_to_pickup(request), d.position.distance_to(request.pickup))
+            moved = moved or any(d.position.get_point() != positions[d.did] for d in self.sim.drivers)
+
+        self.assertTrue(moved)
+
+if __name__ == '__main__':
+    unittest.main()
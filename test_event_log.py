@@ -0,0 +1,149 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from phase2 import event_log
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import GlobalGreedyPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+class TestEventLog(unittest.TestCase):
+    """Testing the records written by EventLog and read back by read_events"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return [(kind, fields) for _, kind, fields in event_log.read_events(f.read())]
+
+    def test_records_round_trip(self):
+        log = event_log.EventLog(self.path)
+        log.arrival(3, Request(7, Point(1.5, 2), Point(10, 20.25), creation_time=3))
+        log.assigned(3, 2, 7)
+        log.picked(5, 2, 7)
+        log.delivered(9, 2, 7, 31.5)
+        log.expired(9, 8, 0)
+        log.close(tick=12)
+
+        self.assertEqual(self.read(), [
+            (event_log.ARRIVAL, (3, 7, 1.5, 2.0, 10.0, 20.25)),
+            (event_log.ASSIGNED, (3, 2, 7)),
+            (event_log.PICKED, (5, 2, 7)),
+            (event_log.DELIVERED, (9, 2, 7, 31.5)),
+            (event_log.EXPIRED, (9, 8, 0)),
+            (event_log.END, (12,)),
+        ])
+
+    def test_behaviour_written_once(self):
+        log = event_log.EventLog(self.path)
+        log.mutation(4, 1, GreedyDistanceBehaviour(max_distance=12.0))
+        log.mutation(4, 2, GreedyDistanceBehaviour(max_distance=12.0))
+        log.mutation(6, 1, Naive())
+        log.close()
+
+        events = self.read()
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds, [
+            event_log.BEHAVIOUR, event_log.MUTATION, event_log.MUTATION,
+            event_log.BEHAVIOUR, event_log.MUTATION,
+        ])
+        self.assertEqual(events[2][1], (4, 2, 0))
+        self.assertEqual(events[4][1], (6, 1, 1))
+
+        behaviour = event_log.decode_behaviour(events[0][1][2])
+        self.assertIsInstance(behaviour, GreedyDistanceBehaviour)
+        self.assertEqual(behaviour.max_distance, 12.0)
+        self.assertIsInstance(event_log.decode_behaviour(events[3][1][2]), Naive)
+
+    def test_replayer_needs_a_checkpoint(self):
+        log = event_log.EventLog(self.path)
+        log.assigned(1, 1, 1)
+        log.close()
+
+        with self.assertRaises(ValueError):
+            event_log.Replayer(self.path)
+
+
+class TestReplayer(unittest.TestCase):
+    """Testing that a replayed state equals the live simulation at that tick"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "run.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_simulation(self, rng=None):
+        random.seed(4)
+        numpy.random.seed(4)
+        behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+        drivers = [
+            Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), random.choice([1, 1.5, 2]),
+                   "IDLE", None, behaviours[i % 4]())
+            for i in range(25)
+        ]
+        return DeliverySimulation(drivers, GlobalGreedyPolicy(), RequestGenerator(1.5),
+                                  DecisionTreeRule(MutationThresholds(lasttime_mutation_thr=20), rng=rng), 20)
+
+    def summary(self, sim):
+        return (
+            sim.time, sim.served_count, sim.expired_count, list(sim.wait_times),
+            [(d.did, d.position.get_point(), d.status, d.total_earnings, d.behaviour_mutation_stamp,
+              type(d.behaviour).__name__,
+              [(e.timestamp, e.event, e.request_id, e.earnings) for e in d.history])
+             for d in sim.drivers],
+            [(r.rid, r.status, r.assigned_driver_id) for r in sim.requests],
+            list(sim.metrics.served),
+        )
+
+    def test_replay_equals_live(self):
+        sim = self.make_simulation()
+        for _ in range(30):
+            sim.tick()
+        sim.start_event_log(self.path, checkpoint_every=40)
+
+        live = {}
+        for _ in range(120):
+            sim.tick()
+            if sim.time in (31, 69, 70, 71, 111, 150):
+                live[sim.time] = self.summary(sim)
+        sim.stop_event_log()
+
+        replayer = event_log.Replayer(self.path)
+        self.assertEqual((replayer.first_tick, replayer.last_tick), (30, 150))
+        self.assertGreater(sim.served_count, 0)
+        for tick, state in live.items():
+            self.assertEqual(self.summary(replayer.state_at(tick)), state, f"tick {tick}")
+
+        with self.assertRaises(ValueError):
+            replayer.state_at(29)
+
+    def test_log_with_rule_rng(self):
+        sim = self.make_simulation(rng=2)
+        sim.start_event_log(self.path, checkpoint_every=25)
+        for _ in range(60):
+            sim.tick()
+        sim.stop_event_log()
+
+        replayer = event_log.Replayer(self.path)
+        self.assertEqual(self.summary(replayer.state_at(60)), self.summary(sim))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import phase2
+
+# Cold-import budget for the Point/Request/Driver path (microseconds)
+IMPORT_BUDGET_US = 100_000
+
+CORE_IMPORT = "import phase2; phase2.Point; phase2.Request; phase2.Driver"
+
+
+def importtime(code):
+    """Run code in a fresh interpreter with -X importtime and return a list
+    of (module, cumulative microseconds, top_level) for every import made
+    from the first phase2 import and on."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        top_level = not name.startswith("  ")
+        name = name.strip()
+        if name == "phase2":
+            started = True
+        if started:
+            rows.append((name, int(cumulative), top_level))
+    return rows
+
+
+class TestLazyImports(unittest.TestCase):
+    """Testing that the core classes can be used without the heavy imports"""
+
+    def test_core_classes_do_not_import_numpy_or_gui(self):
+        names = {name for name, _, _ in importtime(CORE_IMPORT)}
+
+        self.assertNotIn("numpy", names)
+        self.assertNotIn("dearpygui", names)
+        self.assertNotIn("phase1", names)
+
+    def test_core_import_time_under_budget(self):
+        rows = importtime(CORE_IMPORT)
+        total = sum(cumulative for _, cumulative, top_level in rows if top_level)
+
+        self.assertLess(total, IMPORT_BUDGET_US)
+
+    def test_unknown_attribute_raises(self):
+        with self.assertRaises(AttributeError):
+            phase2.NotAClass
+
+    def test_public_names_listed(self):
+        self.assertIn("DeliverySimulation", dir(phase2))
+        self.assertIn("Point", phase2.__all__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import random
+import unittest
+
+import numpy
+
+from phase2.delivery_simulation import DeliverySimulation
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.request_generator import RequestGenerator
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.driver_behaviour import (
+    GreedyDistanceBehaviour,
+    EarningsMaxBehaviour,
+    LazyBehaviour,
+    Naive,
+)
+
+BEHAVIOURS = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+
+
+def make_fleet(seed, n=200):
+    rng = random.Random(seed)
+    drivers = []
+    for i in range(n):
+        d = Driver(i + 1, Point(0, 0), 1.0, "IDLE", None, BEHAVIOURS[i % 4]())
+        d.behaviour_mutation_stamp = rng.randint(0, 4)
+        for t in range(6):
+            event = rng.choice(["expired", "accepted", "DELIVERED", "PICKED"])
+            d.log_event(t, event, "GreedyDistanceBehaviour", earnings=rng.randint(0, 4))
+        drivers.append(d)
+    return drivers
+
+
+class TestMaybeMutateAll(unittest.TestCase):
+    """The vectorized rule must mutate the same drivers the same way as maybe_mutate"""
+
+    thresholds = dict(lasttime_mutation_thr=8, expire_thr=2, earning_thr=0.6, accepted_thr=0.3)
+
+    def run_both(self, seed, time=6):
+        reference = make_fleet(seed)
+        vectorized = make_fleet(seed)
+        random.seed(seed)
+        DecisionTreeRule(MutationThresholds(**self.thresholds)).maybe_mutate_all(reference, time)
+        DecisionTreeRule(MutationThresholds(**self.thresholds), rng=seed).maybe_mutate_all(vectorized, time)
+        return reference, vectorized
+
+    def test_same_drivers_mutate(self):
+        for seed in range(5):
+            reference, vectorized = self.run_both(seed)
+            self.assertEqual(
+                [d.behaviour_mutation_stamp for d in reference],
+                [d.behaviour_mutation_stamp for d in vectorized],
+            )
+
+    def test_same_behaviour_unless_random(self):
+        # Drivers whose new behaviour does not depend on a random pick must agree
+        rule = DecisionTreeRule(MutationThresholds(**self.thresholds))
+        for seed in range(5):
+            fleet = make_fleet(seed)
+            reference, vectorized = self.run_both(seed)
+            compared = 0
+            for before, ref, vec in zip(fleet, reference, vectorized):
+                since = 6 - before.behaviour_mutation_stamp
+                if since >= rule.thresholds.lasttime_mutation_thr:
+                    continue
+                expired, earnings, accepted = rule._counts_since_stamp(before)
+                flags = (expired >= 2, earnings / since < 0.6, accepted / since < 0.3)
+                current = type(before.behaviour)
+                if flags == (True, True, True):
+                    continue
+                if flags == (True, True, False) and current is GreedyDistanceBehaviour:
+                    continue
+                if flags == (True, False, True) and current is LazyBehaviour:
+                    continue
+                self.assertIs(type(ref.behaviour), type(vec.behaviour))
+                compared += 1
+            self.assertGreater(compared, 100)
+
+    def test_time_mutation_stores_instance(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        DecisionTreeRule(MutationThresholds(lasttime_mutation_thr=5), rng=0).maybe_mutate_all([d], 5)
+        self.assertIn(type(d.behaviour), BEHAVIOURS)
+        self.assertIs(d.behaviour, type(d.behaviour).shared())
+        self.assertEqual(d.behaviour_mutation_stamp, 5)
+
+    def test_time_mutation_in_running_simulation(self):
+        thresholds = MutationThresholds(lasttime_mutation_thr=25, earning_thr=0, accepted_thr=0, expire_thr=2)
+        for rng in (None, 0):
+            random.seed(2)
+            numpy.random.seed(2)
+            drivers = [
+                Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), 1.0, "IDLE", None, BEHAVIOURS[i % 4]())
+                for i in range(20)
+            ]
+            sim = DeliverySimulation(drivers, NearestNeighborPolicy(), RequestGenerator(2.0), DecisionTreeRule(thresholds, rng=rng), 20)
+            for _ in range(80):
+                sim.tick()
+            self.assertTrue(all(d.behaviour_mutation_stamp > 0 for d in sim.drivers))
+            self.assertTrue(all(type(d.behaviour) in BEHAVIOURS for d in sim.drivers))
+
+    def test_seeded_generator_repeats(self):
+        a, b = make_fleet(1), make_fleet(1)
+        DecisionTreeRule(MutationThresholds(), rng=7).maybe_mutate_all(a, 6)
+        DecisionTreeRule(MutationThresholds(), rng=7).maybe_mutate_all(b, 6)
+        self.assertEqual([type(d.behaviour) for d in a], [type(d.behaviour) for d in b])
+
+    def test_zero_time_since_mutation_raises(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        d.behaviour_mutation_stamp = 3
+        with self.assertRaises(ZeroDivisionError):
+            DecisionTreeRule(MutationThresholds(), rng=0).maybe_mutate_all([d], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
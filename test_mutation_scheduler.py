@@ -0,0 +1,123 @@
+import unittest
+
+from phase2.mutation_scheduler import MutationScheduler
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.point import Point
+from phase2.driver import Driver
+from phase2.driver_behaviour import GreedyDistanceBehaviour
+
+
+class CountingRule(DecisionTreeRule):
+    """Records which drivers maybe_mutate looked at"""
+
+    def __init__(self, thresholds):
+        super().__init__(thresholds)
+        self.seen = []
+
+    def maybe_mutate(self, driver, time):
+        self.seen.append((time, driver.did))
+        super().maybe_mutate(driver, time)
+
+
+class TestNextCheck(unittest.TestCase):
+    """next_check must give the first tick where maybe_mutate would change the driver"""
+
+    def first_mutation(self, rule, driver, time, limit=200):
+        # Brute force: try maybe_mutate on copies of the driver at every later tick
+        for t in range(time + 1, time + limit):
+            d = Driver(driver.did, driver.position, driver.speed, "IDLE", None, driver.behaviour)
+            d.history = list(driver.history)
+            d.behaviour_mutation_stamp = driver.behaviour_mutation_stamp
+            rule.maybe_mutate(d, t)
+            if d.behaviour_mutation_stamp != driver.behaviour_mutation_stamp:
+                return t
+        return None
+
+    def check(self, thresholds, events, stamp=0, time=5):
+        rule = DecisionTreeRule(thresholds)
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour())
+        d.behaviour_mutation_stamp = stamp
+        for timestamp, event, earnings in events:
+            d.log_event(timestamp, event, "GreedyDistanceBehaviour", earnings=earnings)
+        expected = self.first_mutation(rule, d, time)
+        self.assertEqual(rule.next_check(d, time), expected)
+
+    def test_default_thresholds_due_next_tick(self):
+        self.check(MutationThresholds(), [])
+
+    def test_earnings_ratio_falls_below(self):
+        # 10 earned since tick 0 falls below 0.25 per tick at tick 41
+        self.check(MutationThresholds(lasttime_mutation_thr=100, accepted_thr=0), [(1, "DELIVERED", 10)])
+
+    def test_accepted_ratio_falls_below(self):
+        events = [(2, "accepted", None), (3, "accepted", None), (4, "accepted", None)]
+        self.check(MutationThresholds(lasttime_mutation_thr=100, earning_thr=0, accepted_thr=0.07), events)
+
+    def test_time_limit(self):
+        events = [(1, "DELIVERED", 100), (2, "accepted", None)]
+        self.check(MutationThresholds(lasttime_mutation_thr=30, accepted_thr=0.01), events, stamp=3, time=10)
+
+    def test_expired_is_due_now(self):
+        events = [(1, "expired", None), (2, "expired", None), (3, "expired", None)]
+        self.check(MutationThresholds(lasttime_mutation_thr=100, earning_thr=0, accepted_thr=0), events)
+
+    def test_events_before_stamp_ignored(self):
+        events = [(1, "expired", None), (2, "expired", None), (6, "DELIVERED", 4)]
+        self.check(MutationThresholds(expire_thr=2, lasttime_mutation_thr=100, accepted_thr=0), events, stamp=4, time=8)
+
+
+class TestMutationScheduler(unittest.TestCase):
+    """Only due drivers are checked, in driver order"""
+
+    def setUp(self):
+        self.rule = CountingRule(MutationThresholds(lasttime_mutation_thr=100, earning_thr=0, accepted_thr=0.1))
+        self.scheduler = MutationScheduler(self.rule)
+        self.drivers = [Driver(i, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour()) for i in range(1, 4)]
+        for d in self.drivers:
+            d.mutation_scheduler = self.scheduler
+            self.scheduler.add_driver(d, 0)
+
+    def run_tick(self, time):
+        for d in self.scheduler.due(time, self.drivers):
+            self.rule.maybe_mutate(d, time)
+            self.scheduler.checked(d, time)
+
+    def test_new_drivers_checked_in_order(self):
+        self.run_tick(1)
+        self.assertEqual(self.rule.seen, [(1, 1), (1, 2), (1, 3)])
+
+    def test_logged_event_makes_driver_due(self):
+        # 0 accepted since tick 0 is below the threshold at once, so every driver mutates
+        self.run_tick(1)
+        self.drivers[2].log_event(1, "accepted", "GreedyDistanceBehaviour")
+        self.drivers[2].log_event(1, "accepted", "GreedyDistanceBehaviour")
+        self.rule.seen.clear()
+        self.run_tick(2)
+        self.assertEqual(self.rule.seen, [(2, 1), (2, 2), (2, 3)])
+
+    def test_skipped_until_due(self):
+        self.run_tick(1)
+        # The drivers mutated at tick 1; with 2 accepted the ratio stays high until tick 22
+        for d in self.drivers:
+            d.log_event(1, "accepted", "GreedyDistanceBehaviour")
+            d.log_event(1, "accepted", "GreedyDistanceBehaviour")
+        self.rule.seen.clear()
+        for t in range(2, 23):
+            self.run_tick(t)
+        self.assertEqual(self.rule.seen, [(2, 1), (2, 2), (2, 3), (22, 1), (22, 2), (22, 3)])
+
+    def test_removed_driver_not_checked(self):
+        self.scheduler.remove_driver(self.drivers[1])
+        self.run_tick(1)
+        self.assertEqual(self.rule.seen, [(1, 1), (1, 3)])
+
+    def test_reset_checks_everybody(self):
+        self.run_tick(1)
+        self.rule.seen.clear()
+        self.scheduler.reset(self.rule, self.drivers, 1)
+        self.run_tick(2)
+        self.assertEqual([did for _, did in self.rule.seen], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
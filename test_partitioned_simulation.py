@@ -0,0 +1,81 @@
+import unittest
+
+from phase2.partitioned_simulation import PartitionedSimulation, TileRequestGenerator
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import Naive
+
+
+class TestGridSize(unittest.TestCase):
+    """Testing Point.set_grid_size and the generators that use it"""
+
+    def tearDown(self):
+        Point.set_grid_size(50.0, 30.0)
+
+    def test_generators_default_to_grid_size(self):
+        Point.set_grid_size(400.0, 100.0)
+        generator = RequestGenerator(1.0)
+        self.assertEqual((generator.width, generator.height), (400.0, 100.0))
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            Point.set_grid_size(0, 10)
+
+
+class TestTileRequestGenerator(unittest.TestCase):
+
+    def test_pickups_in_tile_and_ids_strided(self):
+        generator = TileRequestGenerator(50.0, 10.0, 20.0, 50.0, 30.0, next_id=3, id_step=4)
+        requests = generator.req_generate(1, generator.rate)
+        self.assertTrue(requests)
+        for r in requests:
+            self.assertTrue(10.0 <= r.pickup.x <= 20.0)
+        self.assertEqual([r.rid for r in requests[:3]], [3, 7, 11])
+
+
+class TestPartitionedSimulation(unittest.TestCase):
+    """Testing PartitionedSimulation with scheduled requests only (no randomness)"""
+
+    def make(self, drivers, scheduled):
+        return PartitionedSimulation(
+            drivers,
+            NearestNeighborPolicy(),
+            RequestGenerator(0, scheduled=scheduled),
+            DecisionTreeRule(MutationThresholds()),
+            20,
+            tiles=2,
+        )
+
+    def test_requests_served_in_their_tile(self):
+        drivers = [
+            Driver(1, Point(5, 5), 2.0, "IDLE", None, Naive()),
+            Driver(2, Point(45, 5), 2.0, "IDLE", None, Naive()),
+        ]
+        scheduled = [
+            Request(1, Point(5, 9), Point(5, 13), creation_time=1),
+            Request(2, Point(45, 9), Point(45, 13), creation_time=1),
+        ]
+        with self.make(drivers, scheduled) as sim:
+            result = sim.run(10)
+        self.assertEqual(result["served"], 2)
+        self.assertEqual(result["expired"], 0)
+        self.assertEqual(result["avg_wait"], 3.0)
+        self.assertEqual(result["drivers_per_tile"], [1, 1])
+
+    def test_idle_driver_handed_off(self):
+        # The dropoff is in the other tile, so the driver ends up there
+        drivers = [Driver(1, Point(20, 5), 2.0, "IDLE", None, Naive())]
+        scheduled = [Request(1, Point(22, 5), Point(40, 5), creation_time=1)]
+        with self.make(drivers, scheduled) as sim:
+            self.assertEqual(sim.run(1)["drivers_per_tile"], [1, 0])
+            result = sim.run(15)
+        self.assertEqual(result["served"], 1)
+        self.assertEqual(result["drivers_per_tile"], [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
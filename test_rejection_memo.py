@@ -0,0 +1,69 @@
+import unittest
+
+from phase2.rejection_memo import RejectionMemo
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.driver_behaviour import (
+    DriverBehaviour,
+    EarningsMaxBehaviour,
+    GreedyDistanceBehaviour,
+    LazyBehaviour,
+)
+
+
+class TestRejectionMemo(unittest.TestCase):
+    """Testing when a remembered rejection is still valid"""
+
+    def setUp(self):
+        self.memo = RejectionMemo()
+        self.request = Request(1, Point(40, 20), Point(45, 25), creation_time=0)
+
+    def test_unchanged_driver_is_skipped(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour())
+        self.memo.add(d, self.request)
+        self.assertTrue(self.memo.is_rejected(d, self.request))
+        self.assertEqual(self.memo.hits, 1)
+
+    def test_move_invalidates(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour())
+        self.memo.add(d, self.request)
+        d.position = Point(1, 0)
+        self.assertFalse(self.memo.is_rejected(d, self.request))
+
+    def test_idle_time_invalidates_lazy(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, LazyBehaviour())
+        self.memo.add(d, self.request)
+        d.idle_time = 10
+        self.assertFalse(self.memo.is_rejected(d, self.request))
+
+    def test_mutation_invalidates(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour())
+        self.memo.add(d, self.request)
+        d.update_behaviour_and_stamp(5, EarningsMaxBehaviour())
+        self.assertFalse(self.memo.is_rejected(d, self.request))
+        # A new instance with the same parameters decides the same way
+        self.memo.add(d, self.request)
+        d.update_behaviour_and_stamp(6, EarningsMaxBehaviour())
+        self.assertTrue(self.memo.is_rejected(d, self.request))
+
+    def test_undeclared_inputs_not_remembered(self):
+        class Moody(DriverBehaviour):
+            def decide(self, driver, offer, time):
+                return time % 2 == 0
+
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Moody())
+        self.memo.add(d, self.request)
+        self.assertFalse(self.memo.is_rejected(d, self.request))
+        self.assertEqual(len(self.memo), 0)
+
+    def test_prune_drops_finished_requests(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, GreedyDistanceBehaviour())
+        self.memo.add(d, self.request)
+        self.request.mark_expired(21)
+        self.memo.prune()
+        self.assertEqual(len(self.memo), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from phase2.replications import Estimate, run_replications, t_quantile
+
+
+class _FakeSim:
+    """Just enough of DeliverySimulation for branching.summarize"""
+
+    def __init__(self):
+        self.time = 0
+        self.served_count = 0
+        self.expired_count = 0
+        self.drivers = []
+
+    def tick(self):
+        self.time += 1
+        self.served_count += random.randint(0, 10)
+
+    def _avg_wait(self):
+        return 1.0
+
+
+def build_fake():
+    return _FakeSim()
+
+
+class TestEstimate(unittest.TestCase):
+    """Testing the confidence intervals"""
+
+    def test_t_quantile(self):
+        self.assertAlmostEqual(t_quantile(0.975, 1), 12.706, places=3)
+        self.assertAlmostEqual(t_quantile(0.975, 2), 4.303, places=3)
+        self.assertAlmostEqual(t_quantile(0.975, 3), 3.182, places=3)
+        self.assertAlmostEqual(t_quantile(0.995, 3), 5.841, places=3)
+        self.assertAlmostEqual(t_quantile(0.025, 3), -3.182, places=3)
+        self.assertAlmostEqual(t_quantile(0.995, 4), 4.604, places=3)
+        self.assertAlmostEqual(t_quantile(0.995, 5) / 4.032, 1, delta=0.001)
+        self.assertAlmostEqual(t_quantile(0.975, 10), 2.228, places=3)
+
+    def test_interval(self):
+        e = Estimate([10.0, 12.0, 11.0, 13.0, 9.0])
+        self.assertEqual(e.mean, 11.0)
+        self.assertAlmostEqual(e.low, 11.0 - e.half_width)
+        self.assertAlmostEqual(e.half_width, 2.776 * e.std / 5 ** 0.5, places=3)
+
+    def test_single_value_has_no_interval(self):
+        self.assertEqual(Estimate([3.0]).half_width, float("inf"))
+
+
+class TestRunReplications(unittest.TestCase):
+    """Testing the adaptive stopping (in this process)"""
+
+    def test_min_runs_without_targets(self):
+        result = run_replications(build_fake, 5, min_runs=4, processes=0)
+        self.assertEqual(result.n, 4)
+        self.assertTrue(result.converged)
+        self.assertEqual([run["seed"] for run in result.runs], [0, 1, 2, 3])
+
+    def test_stops_when_target_met(self):
+        result = run_replications(build_fake, 20, {"served": 5.0}, processes=0)
+        self.assertTrue(result.converged)
+        self.assertLess(result.n, 100)
+        self.assertLessEqual(result.estimates["served"].half_width, 5.0)
+
+    def test_max_runs(self):
+        result = run_replications(build_fake, 20, {"served": 0.0}, max_runs=7, processes=0)
+        self.assertFalse(result.converged)
+        self.assertEqual(result.n, 7)
+
+    def test_same_seeds_same_results(self):
+        a = run_replications(build_fake, 20, base_seed=3, processes=0)
+        b = run_replications(build_fake, 20, base_seed=3, processes=0)
+        self.assertEqual(a.runs, b.runs)
+
+    def test_random_state_restored(self):
+        random.seed(42)
+        expected = random.random()
+        random.seed(42)
+        run_replications(build_fake, 5, processes=0)
+        self.assertEqual(random.random(), expected)
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            run_replications(build_fake, 5, {"speed": 1.0}, processes=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
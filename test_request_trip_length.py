@@ -0,0 +1,33 @@
+import unittest
+
+from phase2.point import Point
+from phase2.request import Request
+
+
+class TestRequestTripLength(unittest.TestCase):
+    """Testing that the trip length and base fare is calculated when the
+    request is created and calculated again when pickup or dropoff is set"""
+
+    def setUp(self):
+        self.pickup = Point(0, 0)
+        self.dropoff = Point(20, 10)
+        self.req = Request(1, self.pickup, self.dropoff, creation_time=0)
+
+    def test_trip_length_on_creation(self):
+        self.assertAlmostEqual(self.req.trip_length, self.pickup.distance_to(self.dropoff))
+        self.assertAlmostEqual(self.req.base_fare, Request.BASE_FEE + Request.DISTANCE_FEE * self.req.trip_length)
+
+    def test_set_dropoff_updates_trip_length(self):
+        self.req.set_request_dropoff(Point(3, 4))
+
+        self.assertAlmostEqual(self.req.trip_length, 5.0)
+        self.assertAlmostEqual(self.req.base_fare, Request.BASE_FEE + Request.DISTANCE_FEE * 5.0)
+
+    def test_set_pickup_updates_trip_length(self):
+        self.req.set_request_pickup(Point(20, 13))
+
+        self.assertAlmostEqual(self.req.trip_length, 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
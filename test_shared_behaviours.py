@@ -0,0 +1,64 @@
+import random
+import unittest
+
+from phase2.point import Point
+from phase2.request import Request
+from phase2.offer import Offer
+from phase2.driver import Driver
+from phase2.driver_behaviour import (
+    GreedyDistanceBehaviour,
+    EarningsMaxBehaviour,
+    LazyBehaviour,
+    Naive,
+)
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+
+
+class TestSharedBehaviours(unittest.TestCase):
+    """Testing that one behaviour instance can serve many drivers"""
+
+    def test_shared_returns_same_instance(self):
+        self.assertIs(GreedyDistanceBehaviour.shared(), GreedyDistanceBehaviour.shared())
+        self.assertIs(LazyBehaviour.shared(close=3), LazyBehaviour.shared(close=3))
+        self.assertIsNot(LazyBehaviour.shared(close=3), LazyBehaviour.shared())
+        self.assertIsNot(Naive.shared(), GreedyDistanceBehaviour.shared())
+
+    def test_decide_does_not_change_behaviour(self):
+        behaviour = GreedyDistanceBehaviour.shared()
+        before = dict(vars(behaviour))
+        d = Driver(1, Point(0, 0), 2.0, "IDLE", None, behaviour)
+        behaviour.decide(d, Offer(d, Request(1, Point(5, 0), Point(9, 0), creation_time=0), 0.0, 0.0), 0)
+        self.assertEqual(vars(behaviour), before)
+
+    def test_greedy_max_distance_per_driver(self):
+        # max_distance 0 means speed * expiretime for each driver, also when shared
+        behaviour = GreedyDistanceBehaviour.shared(expiretime=20)
+        slow = Driver(1, Point(0, 0), 0.5, "IDLE", None, behaviour)
+        fast = Driver(2, Point(0, 0), 2.0, "IDLE", None, behaviour)
+        request = Request(1, Point(10, 0), Point(12, 0), creation_time=0)
+        self.assertTrue(behaviour.decide(fast, Offer(fast, request, 0.0, 0.0), 0))
+        self.assertFalse(behaviour.decide(slow, Offer(slow, request, 0.0, 0.0), 0))
+        self.assertTrue(behaviour.decide(fast, Offer(fast, request, 0.0, 0.0), 0))
+
+    def test_parameters_declared(self):
+        self.assertEqual(GreedyDistanceBehaviour.parameters, ("max_distance", "expiretime"))
+        self.assertEqual(EarningsMaxBehaviour.parameters, ("min_ratio",))
+        self.assertEqual(LazyBehaviour.parameters, ("close", "max_idle_time"))
+        self.assertEqual(Naive.parameters, ())
+        for cls in (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour):
+            for name in cls.parameters:
+                self.assertTrue(hasattr(cls(), name))
+
+    def test_mutations_reuse_shared_instances(self):
+        random.seed(1)
+        rule = DecisionTreeRule(MutationThresholds())
+        drivers = [Driver(i, Point(0, 0), 1.0, "IDLE", None, Naive()) for i in range(1, 21)]
+        for t in range(1, 6):
+            for d in drivers:
+                rule.maybe_mutate(d, t)
+        shared = {id(cls.shared()) for cls in (GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive)}
+        self.assertTrue({id(d.behaviour) for d in drivers} <= shared)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+
+from phase2.sim_runner import SimulationRunner
+
+
+class CountingSim:
+    """Counts its ticks; can be made to block in tick or to fail"""
+
+    def __init__(self, fail_at=None):
+        self.time = 0
+        self.fail_at = fail_at
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def tick(self):
+        self.gate.wait()
+        self.time += 1
+        if self.time == self.fail_at:
+            raise RuntimeError("broken tick")
+
+
+class TestSimulationRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = CountingSim()
+        self.runner = SimulationRunner(self.sim, lambda: ({"t": self.sim.time}, {}), max_lead=None)
+
+    def tearDown(self):
+        self.runner.stop(timeout=5)
+
+    def settle(self):
+        """Give the worker time to run ticks it should not run"""
+        time.sleep(0.05)
+
+    def test_paused_runner_only_steps(self):
+        self.runner.start(paused=True)
+        self.settle()
+        self.assertEqual(self.sim.time, 0)
+
+        self.runner.step(3)
+        self.assertTrue(self.runner.wait_for_frame(3, timeout=5))
+        self.settle()
+
+        self.assertEqual(self.sim.time, 3)
+        self.assertEqual(self.runner.latest()[0], {"t": 3})
+
+    def test_pause_and_resume(self):
+        self.runner.start()
+        self.assertTrue(self.runner.wait_for_frame(5, timeout=5))
+
+        self.runner.pause()
+        self.settle()
+        paused_at = self.sim.time
+        self.settle()
+        self.assertEqual(self.sim.time, paused_at)
+
+        self.runner.resume()
+        self.assertTrue(self.runner.wait_for_frame(paused_at + 5, timeout=5))
+
+    def test_step_ignored_while_running(self):
+        self.runner.start()
+        self.runner.step(10 ** 9)
+        self.runner.pause()
+        self.settle()
+        paused_at = self.sim.time
+        self.settle()
+
+        self.assertEqual(self.sim.time, paused_at)
+
+    def test_steps_left_at_resume_are_dropped(self):
+        self.sim.gate.clear()
+        self.runner.start(paused=True)
+        self.runner.step(50)
+        self.runner.resume()
+        self.runner.pause()
+        self.sim.gate.set()
+        self.settle()
+
+        # Only the tick that was already running may finish
+        self.assertLessEqual(self.sim.time, 1)
+
+    def test_stop_waits_for_worker(self):
+        self.runner.start()
+        self.assertTrue(self.runner.wait_for_frame(1, timeout=5))
+
+        self.runner.stop(timeout=5)
+
+        self.assertFalse(self.runner.is_running())
+        stopped_at = self.sim.time
+        self.settle()
+        self.assertEqual(self.sim.time, stopped_at)
+
+    def test_back_pressure(self):
+        runner = SimulationRunner(self.sim, lambda: ({"t": self.sim.time}, {}), max_lead=2)
+        runner.start()
+        try:
+            self.assertTrue(runner.wait_for_frame(2, timeout=5))
+            self.settle()
+            self.assertEqual(self.sim.time, 2)
+
+            runner.latest()
+            self.assertTrue(runner.wait_for_frame(4, timeout=5))
+        finally:
+            runner.stop(timeout=5)
+
+    def test_error_stops_the_worker(self):
+        sim = CountingSim(fail_at=3)
+        runner = SimulationRunner(sim, lambda: ({}, {}), max_lead=None)
+        runner.start()
+
+        self.assertFalse(runner.wait_for_frame(10, timeout=5))
+        runner.stop(timeout=5)
+
+        self.assertIsInstance(runner.error, RuntimeError)
+        self.assertEqual(runner.frame, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
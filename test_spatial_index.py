@@ -0,0 +1,113 @@
+import random
+import unittest
+from unittest import mock
+
+from phase2.spatial_index import DriverGrid
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import DispatchPolicy, GlobalGreedyPolicy, NearestNeighborPolicy
+from phase2.driver_behaviour import GreedyDistanceBehaviour, LazyBehaviour, Naive
+
+
+def random_drivers(n, rng):
+    behaviours = [GreedyDistanceBehaviour, LazyBehaviour, Naive]
+    return [
+        Driver(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), rng.uniform(0.5, 3), "IDLE", None,
+               behaviours[i % 3]())
+        for i in range(n)
+    ]
+
+
+def random_requests(n, rng):
+    return [
+        Request(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), Point(rng.uniform(0, 50), rng.uniform(0, 30)),
+                creation_time=rng.randint(0, 10))
+        for i in range(n)
+    ]
+
+
+def pairs(offers):
+    return [(o.driver.did, o.request.rid) for o in offers]
+
+
+class TestDriverGrid(unittest.TestCase):
+
+    def test_nearest_matches_sorting_all(self):
+        rng = random.Random(1)
+        drivers = random_drivers(200, rng)
+        grid = DriverGrid(drivers)
+        for _ in range(50):
+            p = Point(rng.uniform(0, 50), rng.uniform(0, 30))
+            expected = sorted(range(len(drivers)), key=lambda i: drivers[i].position.distance_to(p))[:4]
+            self.assertEqual(grid.nearest(p, 4, lambda i: drivers[i].position.distance_to(p)), expected)
+
+    def test_within_holds_every_driver_in_range(self):
+        rng = random.Random(2)
+        drivers = random_drivers(200, rng)
+        grid = DriverGrid(drivers)
+        p = Point(20, 10)
+        found = set(grid.within(p, 6.0))
+        for i, d in enumerate(drivers):
+            if d.position.distance_to(p) <= 6.0:
+                self.assertIn(i, found)
+
+
+class TestPolicyPruning(unittest.TestCase):
+    """The grid must give the same offers as the plain loop"""
+
+    def tearDown(self):
+        DispatchPolicy.GRID_MIN_DRIVERS = 32
+
+    def check_same(self, policy):
+        rng = random.Random(3)
+        drivers = random_drivers(120, rng)
+        requests = random_requests(15, rng)
+        DispatchPolicy.GRID_MIN_DRIVERS = 10 ** 9
+        plain = pairs(policy.assign(drivers, requests, 12))
+        DispatchPolicy.GRID_MIN_DRIVERS = 1
+        self.assertEqual(pairs(policy.assign(drivers, requests, 12)), plain)
+        return plain
+
+    def test_nearest_neighbor(self):
+        self.check_same(NearestNeighborPolicy(k=3))
+        self.check_same(NearestNeighborPolicy(k=3, timeout=5))
+
+    def test_global_greedy(self):
+        self.check_same(GlobalGreedyPolicy())
+        self.check_same(GlobalGreedyPolicy(timeout=5))
+
+    def test_unbounded_driver_keeps_the_range_query(self):
+        rng = random.Random(4)
+        drivers = [
+            Driver(i + 1, Point(rng.uniform(0, 50), rng.uniform(0, 30)), 1.0, "IDLE", None, LazyBehaviour(close=3))
+            for i in range(100)
+        ]
+        drivers[7].behaviour = Naive()
+        requests = random_requests(10, rng)
+        DispatchPolicy.GRID_MIN_DRIVERS = 10 ** 9
+        plain = pairs(GlobalGreedyPolicy().assign(drivers, requests, 12))
+        DispatchPolicy.GRID_MIN_DRIVERS = 1
+        with mock.patch.object(DriverGrid, "within", autospec=True, side_effect=DriverGrid.within) as within:
+            pruned = pairs(GlobalGreedyPolicy().assign(drivers, requests, 12))
+
+        self.assertEqual(within.call_count, len(requests))
+        self.assertEqual(pruned, plain)
+        self.assertEqual(sorted(rid for did, rid in pruned if did == 8), [r.rid for r in requests])
+
+    def test_out_of_radius_not_offered(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, LazyBehaviour(close=5))
+        near = Request(1, Point(3, 0), Point(3, 4))
+        far = Request(2, Point(30, 0), Point(30, 4))
+        self.assertEqual(pairs(GlobalGreedyPolicy().assign([d], [near, far], 0)), [(1, 1)])
+
+    def test_unreachable_not_offered(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        r = Request(1, Point(10, 0), Point(10, 4), creation_time=0)
+        # At tick 5 with timeout 5 the driver can move 6 before the request expires
+        self.assertEqual(NearestNeighborPolicy(timeout=5).assign([d], [r], 5), [])
+        self.assertEqual(len(NearestNeighborPolicy(timeout=20).assign([d], [r], 5)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
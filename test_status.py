@@ -0,0 +1,111 @@
+import unittest
+
+import numpy
+
+from phase2.status import DriverStatus, RequestStatus, DRIVER_TRANSITIONS, REQUEST_TRANSITIONS
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.driver_behaviour import Naive
+
+
+class TestStatusCodes(unittest.TestCase):
+    """Testing the status codes and their string views"""
+
+    def test_string_view(self):
+        r = Request(1, Point(0, 0), Point(1, 0))
+        self.assertEqual(r.status, "WAITING")
+        self.assertIs(r.status_code, RequestStatus.WAITING)
+        r.mark_assigned(3)
+        self.assertEqual(r.status, "ASSIGNED")
+        self.assertEqual(r.get_request_status(), "ASSIGNED")
+
+    def test_set_by_name_or_code(self):
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        d.status = "TO_PICKUP"
+        self.assertIs(d.status_code, DriverStatus.TO_PICKUP)
+        d.status = DriverStatus.TO_DROPOFF
+        self.assertEqual(d.status, "TO_DROPOFF")
+        with self.assertRaises(KeyError):
+            d.status = "SLEEPING"
+
+    def test_constructor_accepts_codes(self):
+        r = Request(1, Point(0, 0), Point(1, 0), status=RequestStatus.PICKED)
+        self.assertEqual(r.status, "PICKED")
+        with self.assertRaises(ValueError):
+            Request(1, Point(0, 0), Point(1, 0), status="LOST")
+        with self.assertRaises(ValueError):
+            Driver(1, Point(0, 0), 1.0, 0, None, Naive())
+
+    def test_codes_fill_numpy_arrays(self):
+        drivers = [Driver(i, Point(0, 0), 1.0, s, None, Naive()) for i, s in enumerate(("IDLE", "TO_DROPOFF"), 1)]
+        status = numpy.array([d.status_code for d in drivers], dtype=numpy.int8)
+        self.assertEqual(status.tolist(), [0, 2])
+
+    def test_is_active(self):
+        for status in RequestStatus:
+            r = Request(1, Point(0, 0), Point(1, 0), status=status)
+            self.assertEqual(r.is_active(), status.name in ("WAITING", "ASSIGNED", "PICKED"))
+
+
+class TestTransitions(unittest.TestCase):
+    """Testing that the mark and complete methods follow the transition tables"""
+
+    def test_request_lifecycle(self):
+        r = Request(1, Point(0, 0), Point(1, 0))
+        r.mark_assigned(1)
+        r.mark_picked(2)
+        r.mark_delivered(5)
+        self.assertEqual(r.status, "DELIVERED")
+
+    def test_reassign_request(self):
+        r = Request(1, Point(0, 0), Point(1, 0))
+        r.mark_assigned(1)
+        r.mark_assigned(4)
+        self.assertEqual(r.status, "ASSIGNED")
+        self.assertEqual(r.assigned_driver_id, 4)
+        r.mark_picked(2)
+        with self.assertRaises(ValueError):
+            r.mark_assigned(5)
+
+    def test_delivered_request_cannot_expire(self):
+        r = Request(1, Point(0, 0), Point(1, 0))
+        r.mark_assigned(1)
+        r.mark_picked(2)
+        r.mark_delivered(5)
+        with self.assertRaises(ValueError):
+            r.mark_expired(30)
+        self.assertEqual(r.status, "DELIVERED")
+
+    def test_waiting_request_cannot_be_picked(self):
+        r = Request(1, Point(0, 0), Point(1, 0))
+        with self.assertRaises(ValueError):
+            r.mark_picked(2)
+
+    def test_driver_lifecycle(self):
+        r = Request(1, Point(0, 0), Point(0, 0))
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        self.assertTrue(d.commit_assignment(r, 0))
+        self.assertEqual(d.status, "TO_PICKUP")
+        d.complete_pickup(1)
+        self.assertEqual(d.status, "TO_DROPOFF")
+        d.complete_dropoff(2)
+        self.assertEqual(d.status, "IDLE")
+        self.assertEqual(r.status, "DELIVERED")
+
+    def test_release_expired_request(self):
+        r = Request(1, Point(5, 0), Point(6, 0))
+        d = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        d.commit_assignment(r, 0)
+        r.mark_expired(20)
+        d.release_expired_request(20)
+        self.assertEqual(d.status, "IDLE")
+        self.assertIsNone(d.current_request)
+
+    def test_tables_cover_every_status(self):
+        self.assertEqual(len(DRIVER_TRANSITIONS), len(DriverStatus))
+        self.assertEqual(len(REQUEST_TRANSITIONS), len(RequestStatus))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy
+
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.dispatch_policies import NearestNeighborPolicy
+from phase2.request_generator import RequestGenerator
+from phase2.mutation_rules import DecisionTreeRule, MutationThresholds
+from phase2.driver_behaviour import GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive
+from phase2.delivery_simulation import DeliverySimulation
+
+
+def make_simulation(seed, **kwargs):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    behaviours = [GreedyDistanceBehaviour, EarningsMaxBehaviour, LazyBehaviour, Naive]
+    drivers = [
+        Driver(i + 1, Point(random.uniform(0, 50), random.uniform(0, 30)), random.choice([1, 1.5, 2]),
+               "IDLE", None, behaviours[i % 4]())
+        for i in range(20)
+    ]
+    return DeliverySimulation(drivers, NearestNeighborPolicy(k=3), RequestGenerator(1.0),
+                              DecisionTreeRule(MutationThresholds()), 20, **kwargs)
+
+
+class TestGenerateBetween(unittest.TestCase):
+    """Requests of a step covering several ticks (DeliverySimulation with dt > 1)"""
+
+    def test_scheduled_requests_in_the_step(self):
+        scheduled = [Request(i, Point(1, 1), Point(2, 2), creation_time=t) for i, t in enumerate((3, 5, 6, 9), 1)]
+        generator = RequestGenerator(rate=0, scheduled=scheduled)
+
+        self.assertEqual([r.rid for r in generator.generate_between(4, 8)], [2, 3])
+        self.assertEqual([r.rid for r in generator.scheduled], [1, 4])
+
+    def test_creation_times_spread_over_the_step(self):
+        numpy.random.seed(3)
+        random.seed(3)
+        generator = RequestGenerator(rate=4.0)
+
+        requests = generator.generate_between(10, 20)
+
+        times = [r.creation_time for r in requests]
+        self.assertGreater(len(requests), 10)
+        self.assertEqual(times, sorted(times))
+        self.assertTrue(all(10 < t <= 20 for t in times))
+        self.assertGreater(len(set(times)), 1)
+        self.assertEqual([r.rid for r in requests], list(range(1, len(requests) + 1)))
+
+    def test_rate_scales_with_step(self):
+        numpy.random.seed(1)
+        random.seed(1)
+        generator = RequestGenerator(rate=2.0)
+
+        count = sum(len(generator.generate_between(t, t + 5)) for t in range(0, 5000, 5))
+
+        self.assertAlmostEqual(count / 5000, 2.0, delta=0.1)
+
+
+
+class TestCoarseStep(unittest.TestCase):
+    """DeliverySimulation with dt > 1"""
+
+    def run_one_request(self, dt):
+        driver = Driver(1, Point(0, 0), 1.0, "IDLE", None, Naive())
+        request = Request(1, Point(3, 0), Point(3, 4), creation_time=5)
+        sim = DeliverySimulation([driver], NearestNeighborPolicy(), RequestGenerator(rate=0, scheduled=[request]),
+                                 DecisionTreeRule(MutationThresholds()), 20, dt=dt)
+        while sim.time < 20:
+            sim.tick()
+        return [(e.timestamp, e.event) for e in driver.history], sim.wait_times
+
+    def test_pickup_and_dropoff_at_their_exact_tick(self):
+        history, wait_times = self.run_one_request(5)
+
+        self.assertEqual(history, [(5, "ASSIGNED"), (7, "PICKED"), (11, "DELIVERED")])
+        self.assertEqual((history, wait_times), self.run_one_request(1))
+
+    def test_metrics_when_a_step_crosses_the_interval(self):
+        sim = make_simulation(1, dt=3, record_interval=5)
+        for _ in range(8):
+            sim.tick()
+
+        self.assertEqual(sim.time, 24)
+        self.assertEqual(sim.metrics.times, [6, 12, 15, 21])
+
+    def test_event_log_needs_dt_1(self):
+        sim = make_simulation(1, dt=2)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "run.log")
+
+        with self.assertRaises(ValueError):
+            sim.start_event_log(path)
+        self.assertIsNone(sim.event_log)
+        self.assertEqual(os.listdir(directory), [])
+        os.rmdir(directory)
+
+    def test_dt_1_unchanged(self):
+        # Results of this run from before dt was added
+        sim = make_simulation(7, dt=1)
+        for _ in range(200):
+            sim.tick()
+
+        self.assertEqual((sim.time, sim.served_count, sim.expired_count, sum(sim.wait_times)), (200, 120, 50, 3095))
+        self.assertAlmostEqual(sum(d.total_earnings for d in sim.drivers), 3681.839397, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+
+from phase2.trips import Trip, TripSchedule
+from phase2.point import Point
+from phase2.request import Request
+from phase2.driver import Driver
+from phase2.driver_behaviour import Naive
+
+
+def make_driver(did, x, y, speed):
+    return Driver(did, Point(x, y), speed, "IDLE", None, Naive())
+
+
+class TestTrip(unittest.TestCase):
+    """A trip must give the positions of a driver that steps every tick"""
+
+    def check_against_step(self, start, target, speed):
+        stepped = make_driver(1, start[0], start[1], speed)
+        stepped.current_request = Request(1, Point(*target), Point(0, 0), 0)
+        stepped.status = "TO_PICKUP"
+        trip = Trip(Point(*start), Point(*target), speed, start=10)
+
+        for tick in range(10, 60):
+            stepped.step(tick=1)
+            position = trip.position(tick)
+            self.assertAlmostEqual(position.x, stepped.position.x, places=9)
+            self.assertAlmostEqual(position.y, stepped.position.y, places=9)
+            at_target = (stepped.position.x, stepped.position.y) == target
+            self.assertEqual(tick >= trip.arrival, at_target)
+
+    def test_positions_match_step(self):
+        self.check_against_step((1, 2), (40, 25), 1.7)
+        self.check_against_step((30, 5), (2, 29), 3.0)
+        self.check_against_step((10, 10), (13, 14), 2.5)
+
+    def test_already_there(self):
+        trip = Trip(Point(4, 4), Point(4, 4), 1.0, start=3)
+
+        self.assertEqual(trip.arrival, 3)
+        self.assertEqual(trip.position(3).get_point(), (4, 4))
+
+    def test_zero_speed_never_arrives(self):
+        trip = Trip(Point(4, 4), Point(5, 4), 0, start=3)
+
+        self.assertIsNone(trip.arrival)
+        self.assertEqual(trip.position(100).get_point(), (4, 4))
+
+
+class TestTripSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.schedule = TripSchedule()
+        self.drivers = [make_driver(1, 0, 0, 1.0), make_driver(2, 10, 0, 2.0)]
+        for d in self.drivers:
+            d.trip_schedule = self.schedule
+            self.schedule.add_driver(d)
+
+    def assign(self, driver, rid, pickup, dropoff, time):
+        driver.commit_assignment(Request(rid, Point(*pickup), Point(*dropoff), time), time)
+
+    def test_arrivals_in_driver_order(self):
+        a, b = self.drivers
+        self.assign(b, 2, (14, 0), (20, 0), 1)
+        self.assign(a, 1, (2, 0), (3, 0), 1)
+
+        self.assertEqual(self.schedule.advance(1), [])
+        self.assertEqual(self.schedule.advance(2), [a, b])
+        self.assertEqual(a.position.get_point(), (2, 0))
+        self.assertIsNone(a.trip)
+
+    def test_pickup_departs_next_tick(self):
+        a = self.drivers[0]
+        self.assign(a, 1, (1, 0), (4, 0), 1)
+
+        self.assertEqual(self.schedule.advance(1), [a])
+        a.complete_pickup(1)
+        self.assertEqual(a.status, "TO_DROPOFF")
+        self.assertEqual(self.schedule.advance(2), [])
+        self.assertEqual(a.position.x, 2.0)
+        self.assertEqual(self.schedule.advance(3), [])
+        self.assertEqual(self.schedule.advance(4), [a])
+
+    def test_released_driver_stops(self):
+        a = self.drivers[0]
+        self.assign(a, 1, (9, 0), (10, 0), 1)
+        self.schedule.advance(1)
+        self.schedule.advance(2)
+
+        a.current_request.mark_expired(3)
+        a.release_expired_request(3)
+
+        self.assertIsNone(a.trip)
+        self.assertEqual(a.position.x, 2.0)
+        for tick in range(3, 12):
+            self.assertEqual(self.schedule.advance(tick), [])
+        self.assertEqual(a.position.x, 2.0)
+
+    def test_moving_and_remove(self):
+        a, b = self.drivers
+        self.assign(a, 1, (9, 0), (10, 0), 1)
+        self.schedule.advance(1)
+        self.schedule.advance(2)
+
+        self.assertEqual(self.schedule.moving(), [a])
+        self.schedule.remove_driver(a)
+        self.assertEqual(self.schedule.moving(), [])
+        self.assertEqual(a.position.x, 2.0)
+
+    def test_resume(self):
+        a = self.drivers[0]
+        self.assign(a, 1, (9, 0), (10, 0), 1)
+        self.schedule.advance(1)
+        self.schedule.advance(4)
+
+        other = TripSchedule()
+        copy = make_driver(1, a.position.x, 0, 1.0)
+        copy.current_request = a.current_request
+        copy.status = "TO_PICKUP"
+        copy.trip_schedule = other
+        other.add_driver(copy)
+        other.tick = 4
+        other.resume(copy, a.trip.origin, a.trip.start)
+
+        for tick in range(5, 9):
+            self.assertEqual(other.advance(tick), self.schedule.advance(tick))
+            self.assertEqual(copy.position.x, a.position.x)
+        self.assertEqual(other.advance(9), [copy])
+        self.assertEqual(self.schedule.advance(9), [a])
+
+
+if __name__ == '__main__':
+    unittest.main()